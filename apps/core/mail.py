@@ -0,0 +1,300 @@
+import atexit
+import html
+import logging
+import queue
+import re
+import threading
+import time
+from email.mime.image import MIMEImage
+from pathlib import Path
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+LOGO_PATH = Path(settings.BASE_DIR) / 'static' / 'img' / 'mindhelper-logo.png'
+
+NON_TEXT_BLOCK_RE = re.compile(r'<(head|style|script)\b.*?</\1\s*>', re.S | re.I)
+COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+TAG_RE = re.compile(r'<[^>]+>')
+
+_image_cache = {}
+_image_lock = threading.Lock()
+
+
+def inline_image(path, content_id):
+    """
+    Retorna la parte MIME de una imagen embebida (``cid:<content_id>``).
+
+    La imagen se lee y codifica una sola vez por proceso; la caché se
+    invalida si cambia el ``mtime`` del archivo. La parte devuelta se
+    comparte entre mensajes, por lo que no debe modificarse.
+
+    Returns:
+        MIMEImage | None: None si el archivo no existe
+    """
+    path = Path(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    key = (str(path), content_id)
+    cached = _image_cache.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with _image_lock:
+        image = MIMEImage(path.read_bytes())
+        image.add_header('Content-ID', f'<{content_id}>')
+        _image_cache[key] = (mtime, image)
+    return image
+
+
+def html_to_text(html_content):
+    """
+    Versión en texto plano de un correo HTML: descarta ``<head>``, estilos
+    y comentarios, quita etiquetas y elimina líneas vacías.
+    """
+    text = COMMENT_RE.sub('', html_content)
+    text = NON_TEXT_BLOCK_RE.sub('', text)
+    text = html.unescape(TAG_RE.sub('', text))
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def render_email(template_name, context):
+    """
+    Renderiza la plantilla HTML de un correo y deriva su alternativa en
+    texto plano del mismo render. Las plantillas compiladas las reutiliza
+    el cargador en caché de Django.
+
+    Returns:
+        tuple: (html, texto)
+    """
+    html_content = get_template(template_name).render(context)
+    return html_content, html_to_text(html_content)
+
+
+def build_email(subject, template_name, context, to, inline_images=((LOGO_PATH, 'logo'),)):
+    """Construye un ``EmailMultiAlternatives`` con HTML, texto e imágenes embebidas"""
+    html_content, text_content = render_email(template_name, context)
+    email = EmailMultiAlternatives(subject, text_content, settings.DEFAULT_FROM_EMAIL, to)
+    email.attach_alternative(html_content, "text/html")
+    for path, content_id in inline_images:
+        image = inline_image(path, content_id)
+        if image is not None:
+            email.attach(image)
+    return email
+
+
+class MailQueue:
+    """
+    Cola de correo saliente con un pool acotado de workers.
+
+    Cada worker toma los mensajes pendientes por lotes y envía cada lote
+    con una llamada a ``send_messages`` por una única conexión
+    (``get_connection()``) que mantiene abierta mientras haya trabajo. Si
+    un lote falla, sus mensajes se envían uno a uno y se reintentan con
+    backoff exponencial.
+    """
+
+    def __init__(self, workers=2, maxsize=1000, batch_size=50, max_retries=3,
+                 retry_backoff=2.0, idle_timeout=5.0, connection_factory=get_connection):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.connection_factory = connection_factory
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'enqueued': 0,
+            'sent': 0,
+            'failed': 0,
+            'retried': 0,
+            'batches': 0,
+            'connections_opened': 0,
+            'overflow': 0,
+        }
+
+    def enqueue(self, message):
+        """
+        Encola un ``EmailMessage``. Si la cola está llena el mensaje se envía
+        en el hilo actual para no perderlo, con un solo intento: quien
+        encola (una petición) no debe quedar bloqueado en reintentos.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self._count('overflow')
+            logger.warning('Cola de correo llena, enviando en línea')
+            self._send_inline(message)
+            return
+        self._count('enqueued')
+
+    def flush(self, timeout=None):
+        """
+        Espera a que se procesen todos los mensajes encolados.
+
+        Returns:
+            bool: False si se agotó ``timeout`` con mensajes pendientes
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def metrics(self):
+        """Retorna una copia de los contadores y la profundidad de la cola"""
+        with self._metrics_lock:
+            data = dict(self._metrics)
+        data['queue_depth'] = self._queue.qsize()
+        data['workers'] = sum(thread.is_alive() for thread in self._threads)
+        return data
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run,
+                    name=f'mail-queue-{index}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _next_batch(self, timeout):
+        """Bloquea hasta el primer mensaje y completa el lote sin esperar"""
+        batch = [self._queue.get(timeout=timeout)]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        connection = None
+        while True:
+            try:
+                batch = self._next_batch(self.idle_timeout if connection else None)
+            except queue.Empty:
+                # Sin trabajo: se libera la conexión hasta el próximo lote
+                self._close(connection)
+                connection = None
+                continue
+
+            if connection is None:
+                connection = self.connection_factory()
+            try:
+                connection = self._send_batch(connection, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _open(self, connection):
+        # Los backends devuelven True solo cuando abren una conexión nueva
+        if connection.open():
+            self._count('connections_opened')
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            logger.warning('Error cerrando la conexión de correo', exc_info=True)
+
+    def _send_inline(self, message):
+        """Envía un mensaje en el hilo actual con un único intento"""
+        connection = self.connection_factory()
+        try:
+            self._open(connection)
+            connection.send_messages([message])
+            self._count('sent')
+        except Exception:
+            self._count('failed')
+            logger.exception('Error enviando correo a %s', ', '.join(message.to))
+        finally:
+            self._close(connection)
+
+    def _reconnect(self, connection):
+        """Cierra una conexión que falló (puede haber quedado inválida) y abre otra"""
+        self._close(connection)
+        return self.connection_factory()
+
+    def _send_batch(self, connection, batch):
+        """
+        Envía un lote con una sola llamada a ``send_messages`` por
+        ``connection``. Si falla, cada mensaje del lote se envía por separado
+        con sus propios reintentos: un mensaje que el servidor rechaza no
+        arrastra al resto y solo se repiten los que fallan. La entrega es al
+        menos una vez: un mensaje enviado antes del fallo del lote se repite.
+
+        Returns:
+            conexión a usar para el siguiente lote
+        """
+        self._count('batches')
+        if len(batch) > 1:
+            try:
+                self._open(connection)
+                connection.send_messages(batch)
+                self._count('sent', len(batch))
+                return connection
+            except Exception:
+                logger.warning(
+                    'Error enviando un lote de %s correos, se envían uno a uno', len(batch), exc_info=True
+                )
+                connection = self._reconnect(connection)
+        for message in batch:
+            connection = self._send_message(connection, message)
+        return connection
+
+    def _send_message(self, connection, message):
+        """
+        Envía un mensaje por ``connection`` reintentándolo con backoff
+        exponencial.
+
+        Returns:
+            conexión a usar para el siguiente mensaje
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._open(connection)
+                connection.send_messages([message])
+                self._count('sent')
+                break
+            except Exception:
+                connection = self._reconnect(connection)
+                if attempt == self.max_retries:
+                    self._count('failed')
+                    logger.exception('Error enviando correo a %s', ', '.join(message.to))
+                    break
+                self._count('retried')
+                time.sleep(self.retry_backoff * (2 ** attempt))
+        return connection
+
+mail_queue = MailQueue(
+    workers=getattr(settings, 'EMAIL_QUEUE_WORKERS', 2),
+    maxsize=getattr(settings, 'EMAIL_QUEUE_MAXSIZE', 1000),
+    batch_size=getattr(settings, 'EMAIL_QUEUE_BATCH_SIZE', 50),
+    max_retries=getattr(settings, 'EMAIL_QUEUE_MAX_RETRIES', 3),
+    retry_backoff=getattr(settings, 'EMAIL_QUEUE_RETRY_BACKOFF', 2.0),
+)
+
+# Dar a los workers la oportunidad de vaciar la cola al terminar el proceso
+atexit.register(mail_queue.flush, timeout=10)
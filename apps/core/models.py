@@ -8,8 +8,8 @@ class BaseManager(models.Manager):
         return self.filter(is_active=True)
     
     def created_today(self):
-        today = timezone.now().date()
-        return self.filter(created_at__date=today)
+        from apps.tasks.utils import in_day
+        return self.filter(in_day('created_at'))
 
 class TimeStampedModel(models.Model):
     """Modelo base con campos de auditoría"""
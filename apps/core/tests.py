@@ -1,3 +1,165 @@
-from django.test import TestCase
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.mail import MailQueue, html_to_text, inline_image
+
+
+class FlakyBackend(LocmemBackend):
+    """Backend locmem que falla en los primeros ``failures`` envíos"""
+    failures = 0
+
+    def send_messages(self, messages):
+        if FlakyBackend.failures:
+            FlakyBackend.failures -= 1
+            raise ConnectionError('SMTP no disponible')
+        return super().send_messages(messages)
+
+
+class RecordingBackend(LocmemBackend):
+    """Backend locmem que guarda el tamaño de cada llamada a ``send_messages``"""
+    calls = []
+
+    def send_messages(self, messages):
+        RecordingBackend.calls.append(len(messages))
+        return super().send_messages(messages)
+
+
+class RejectingBackend(LocmemBackend):
+    """Backend locmem que rechaza cualquier envío con un destinatario inválido"""
+
+    def send_messages(self, messages):
+        if any('invalido@example.com' in message.to for message in messages):
+            raise ValueError('Destinatario rechazado')
+        return super().send_messages(messages)
+
+
+# Según cómo se importó este módulo (``apps.core.tests`` o ``core.tests``)
+FLAKY_BACKEND = f'{FlakyBackend.__module__}.FlakyBackend'
+RECORDING_BACKEND = f'{RecordingBackend.__module__}.RecordingBackend'
+REJECTING_BACKEND = f'{RejectingBackend.__module__}.RejectingBackend'
+
+
+def build_message(index):
+    return EmailMessage(f'Asunto {index}', 'Cuerpo', 'app@example.com', [f'u{index}@example.com'])
+
+
+class MailQueueTests(SimpleTestCase):
+    def test_sends_all_messages_with_bounded_workers(self):
+        mail_queue = MailQueue(workers=2, batch_size=10, retry_backoff=0)
+        for index in range(25):
+            mail_queue.enqueue(build_message(index))
+
+        self.assertTrue(mail_queue.flush(timeout=5))
+        metrics = mail_queue.metrics()
+
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertEqual(metrics['sent'], 25)
+        self.assertEqual(metrics['failed'], 0)
+        self.assertEqual(metrics['workers'], 2)
+        self.assertEqual(metrics['queue_depth'], 0)
+
+    @override_settings(EMAIL_BACKEND=FLAKY_BACKEND)
+    def test_retries_failed_messages(self):
+        FlakyBackend.failures = 2
+        mail_queue = MailQueue(workers=1, max_retries=3, retry_backoff=0)
+        mail_queue.enqueue(build_message(1))
+
+        self.assertTrue(mail_queue.flush(timeout=5))
+        metrics = mail_queue.metrics()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(metrics['retried'], 2)
+        self.assertEqual(metrics['sent'], 1)
+
+    @override_settings(EMAIL_BACKEND=FLAKY_BACKEND)
+    def test_gives_up_after_max_retries(self):
+        FlakyBackend.failures = 10
+        mail_queue = MailQueue(workers=1, max_retries=2, retry_backoff=0)
+        with self.assertLogs('apps.core.mail', level='ERROR'):
+            mail_queue.enqueue(build_message(1))
+            self.assertTrue(mail_queue.flush(timeout=5))
+        FlakyBackend.failures = 0
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(mail_queue.metrics()['failed'], 1)
+
+    @override_settings(EMAIL_BACKEND=RECORDING_BACKEND)
+    def test_batch_is_sent_with_one_call(self):
+        RecordingBackend.calls = []
+        mail_queue = MailQueue(workers=0)
+        connection = mail_queue._send_batch(mail_queue.connection_factory(), [build_message(i) for i in range(10)])
+        connection.close()
+
+        self.assertEqual(RecordingBackend.calls, [10])
+        self.assertEqual(len(mail.outbox), 10)
+        self.assertEqual(mail_queue.metrics()['sent'], 10)
+
+    @override_settings(EMAIL_BACKEND=REJECTING_BACKEND)
+    def test_rejected_message_does_not_block_its_batch(self):
+        mail_queue = MailQueue(workers=0, max_retries=1, retry_backoff=0)
+        batch = [build_message(i) for i in range(5)]
+        batch[2].to = ['invalido@example.com']
+
+        with self.assertLogs('apps.core.mail') as logs:
+            mail_queue._send_batch(mail_queue.connection_factory(), batch).close()
+
+        self.assertEqual([record.levelname for record in logs.records], ['WARNING', 'ERROR'])
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [['u0@example.com'], ['u1@example.com'], ['u3@example.com'], ['u4@example.com']]
+        )
+        metrics = mail_queue.metrics()
+        self.assertEqual((metrics['sent'], metrics['failed'], metrics['retried']), (4, 1, 1))
+
+    @override_settings(EMAIL_BACKEND=FLAKY_BACKEND)
+    def test_overflow_is_sent_inline_once_without_sleeping(self):
+        # Sin workers y con capacidad 1: el segundo mensaje desborda la cola
+        mail_queue = MailQueue(workers=0, maxsize=1)
+        mail_queue.enqueue(build_message(1))
+
+        FlakyBackend.failures = 1
+        with mock.patch(f'{MailQueue.__module__}.time.sleep') as sleep, self.assertLogs('apps.core.mail') as logs:
+            mail_queue.enqueue(build_message(2))
+            mail_queue.enqueue(build_message(3))
+
+        sleep.assert_not_called()
+        self.assertEqual([record.levelname for record in logs.records], ['WARNING', 'ERROR', 'WARNING'])
+        metrics = mail_queue.metrics()
+        self.assertEqual((metrics['overflow'], metrics['failed'], metrics['sent'], metrics['retried']), (2, 1, 1, 0))
+        self.assertEqual(mail.outbox[0].to, ['u3@example.com'])
+
+
+class EmailRenderingTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.image_path = Path(tmp.name) / 'logo.png'
+        self.image_path.write_bytes(b'\x89PNG\r\n\x1a\n' + b'a' * 16)
+
+    def test_inline_image_is_reused_until_file_changes(self):
+        first = inline_image(self.image_path, 'logo')
+        self.assertIs(inline_image(self.image_path, 'logo'), first)
+        self.assertEqual(first['Content-ID'], '<logo>')
+
+        self.image_path.write_bytes(b'\x89PNG\r\n\x1a\n' + b'b' * 16)
+        stat = self.image_path.stat()
+        os.utime(self.image_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        self.assertIsNot(inline_image(self.image_path, 'logo'), first)
+
+    def test_inline_image_missing_file(self):
+        self.assertIsNone(inline_image(self.image_path.with_name('nada.png'), 'logo'))
+
+    def test_html_to_text_drops_styles_and_tags(self):
+        html_content = (
+            '<html><head><style>.x { color: red; }</style></head>'
+            '<body><!-- comentario --><h1>Hola &amp; adiós</h1>\n\n<p>Tarea</p></body></html>'
+        )
+        self.assertEqual(html_to_text(html_content), 'Hola & adiós\nTarea')
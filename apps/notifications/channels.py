@@ -0,0 +1,180 @@
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from apps.core.mail import build_email
+from apps.notifications.models import PushSubscription
+from apps.pomodoro.events import get_broker
+
+logger = logging.getLogger(__name__)
+
+# Tipos de notificación que además se envían por correo
+EMAIL_NOTIFICATION_TYPES = getattr(settings, 'NOTIFICATION_EMAIL_TYPES', ('task_due', 'task_overdue'))
+# Respuestas del servicio push que indican una suscripción caducada
+GONE_STATUS_CODES = (404, 410)
+
+
+def notification_channel(user_id):
+    """Canal de eventos de las notificaciones de un usuario"""
+    return f'notifications:{user_id}'
+
+
+def notification_payload(notification):
+    """Datos de una notificación que reciben el navegador y el service worker"""
+    return {
+        'id': notification.id,
+        'type': notification.type,
+        'title': notification.title,
+        'body': notification.message,
+        'task_id': notification.task_id,
+        'tag': f'notification-{notification.id}',
+        'scheduled_for': notification.scheduled_for.isoformat() if notification.scheduled_for else None,
+    }
+
+
+class Channel:
+    """
+    Canal de entrega. ``send_batch`` se ejecuta en el pool de workers del
+    canal, así que no debe consultar la base de datos: recibe las
+    notificaciones con ``user`` y ``prefetch`` ya cargados.
+    """
+    name = None
+    # Relaciones que el canal necesita precargadas
+    prefetch = ()
+
+    def accepts(self, notification):
+        return True
+
+    def send_batch(self, notifications):
+        """
+        Entrega un lote de notificaciones.
+
+        Returns:
+            set: ids de las notificaciones que no se pudieron entregar
+        """
+        raise NotImplementedError
+
+    def finish(self):
+        """Se llama en el hilo principal al terminar la pasada"""
+
+
+class InAppChannel(Channel):
+    """Publica la notificación en el broker de eventos para los clientes conectados"""
+    name = 'in_app'
+
+    def send_batch(self, notifications):
+        broker = get_broker()
+        failed = set()
+        for notification in notifications:
+            message = json.dumps({'notification': notification_payload(notification)})
+            try:
+                broker.publish(notification_channel(notification.user_id), message)
+            except Exception:
+                logger.exception('Error publicando la notificación %s', notification.id)
+                failed.add(notification.id)
+        return failed
+
+
+class EmailChannel(Channel):
+    """Envía por correo los tipos de ``EMAIL_NOTIFICATION_TYPES``, un lote por conexión"""
+    name = 'email'
+
+    def accepts(self, notification):
+        return notification.type in EMAIL_NOTIFICATION_TYPES and bool(notification.user.email)
+
+    def build_message(self, notification):
+        context = {
+            'user': notification.user,
+            'notification': notification,
+            'site_url': getattr(settings, 'SITE_URL', ''),
+        }
+        return build_email(notification.title, 'email/notification.html', context, [notification.user.email])
+
+    def send_batch(self, notifications):
+        failed = set()
+        connection = get_connection()
+        connection.open()
+        try:
+            for notification in notifications:
+                try:
+                    connection.send_messages([self.build_message(notification)])
+                except Exception:
+                    logger.exception('Error enviando por correo la notificación %s', notification.id)
+                    failed.add(notification.id)
+        finally:
+            connection.close()
+        return failed
+
+
+class WebPushChannel(Channel):
+    """
+    Envía la notificación a las suscripciones Web Push del usuario (la
+    muestra ``static/js/sw.js``). Requiere ``pywebpush`` y
+    ``WEBPUSH_VAPID_PRIVATE_KEY``; sin ellos el canal no se usa.
+    """
+    name = 'push'
+    prefetch = ('user__push_subscriptions',)
+
+    def __init__(self):
+        self._gone = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_available(cls):
+        if not getattr(settings, 'WEBPUSH_VAPID_PRIVATE_KEY', ''):
+            return False
+        try:
+            import pywebpush  # noqa: F401
+        except ImportError:
+            logger.warning('WEBPUSH_VAPID_PRIVATE_KEY configurado pero pywebpush no está instalado')
+            return False
+        return True
+
+    def accepts(self, notification):
+        return bool(notification.user.push_subscriptions.all())
+
+    def send_batch(self, notifications):
+        from pywebpush import WebPushException, webpush
+
+        email = getattr(settings, 'WEBPUSH_VAPID_CLAIMS_EMAIL', '') or settings.DEFAULT_FROM_EMAIL
+        claims = {'sub': f'mailto:{email}'}
+        failed = set()
+        for notification in notifications:
+            data = json.dumps(notification_payload(notification))
+            delivered = False
+            for subscription in notification.user.push_subscriptions.all():
+                try:
+                    webpush(
+                        subscription.subscription_info(),
+                        data,
+                        vapid_private_key=settings.WEBPUSH_VAPID_PRIVATE_KEY,
+                        vapid_claims=dict(claims),
+                    )
+                    delivered = True
+                except WebPushException as e:
+                    status = getattr(e.response, 'status_code', None)
+                    if status in GONE_STATUS_CODES:
+                        with self._lock:
+                            self._gone.add(subscription.pk)
+                    else:
+                        logger.warning('Error enviando push a %s: %s', subscription.endpoint, e)
+            if not delivered:
+                failed.add(notification.id)
+        return failed
+
+    def finish(self):
+        """Borra las suscripciones que el servicio push dio por caducadas"""
+        if self._gone:
+            PushSubscription.objects.filter(pk__in=self._gone).delete()
+            self._gone = set()
+
+
+def default_channels():
+    """Canales activos según la configuración"""
+    channels = [InAppChannel(), EmailChannel()]
+    if WebPushChannel.is_available():
+        channels.append(WebPushChannel())
+    return channels
@@ -0,0 +1,268 @@
+import logging
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.notifications.channels import InAppChannel, default_channels
+from apps.notifications.inbox import add_unread
+from apps.notifications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_BATCH_SIZE = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+# Notificaciones por tarea enviada al pool de un canal
+NOTIFICATION_CHUNK_SIZE = getattr(settings, 'NOTIFICATION_CHUNK_SIZE', 50)
+# Workers por canal; los canales no listados usan uno
+CHANNEL_WORKERS = getattr(settings, 'NOTIFICATION_CHANNEL_WORKERS', {'in_app': 1, 'email': 4, 'push': 8})
+MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+# Espera antes del primer reintento; se duplica en cada intento
+RETRY_BACKOFF = timedelta(seconds=getattr(settings, 'NOTIFICATION_RETRY_BACKOFF_SECONDS', 60))
+# Tiempo tras el cual una notificación reclamada y no resuelta vuelve a la cola
+CLAIM_LEASE = timedelta(seconds=getattr(settings, 'NOTIFICATION_CLAIM_LEASE_SECONDS', 600))
+# Las notificaciones pendientes más antiguas ya no se envían
+EXPIRE_AFTER = timedelta(hours=getattr(settings, 'NOTIFICATION_EXPIRE_AFTER_HOURS', 24))
+
+
+def due_notifications(now=None):
+    """Ids de las notificaciones pendientes ya vencidas (índice ``(state, scheduled_for)``)"""
+    now = now or timezone.now()
+    return Notification.objects.filter(
+        state=Notification.PENDING,
+        scheduled_for__lte=now
+    ).order_by('scheduled_for').values_list('id', flat=True)
+
+
+def claim_due_notifications(now=None, batch_size=NOTIFICATION_BATCH_SIZE):
+    """
+    Reclama hasta ``batch_size`` notificaciones vencidas pasándolas a
+    ``sending``. Igual que ``claim_due_reminders``, varios despachadores en
+    paralelo nunca reclaman la misma notificación.
+
+    Returns:
+        list: ids de las notificaciones reclamadas por esta llamada
+    """
+    now = now or timezone.now()
+    claimed = {'state': Notification.SENDING, 'claimed_at': now}
+    with transaction.atomic():
+        candidates = due_notifications(now)
+        if connection.features.has_select_for_update_skip_locked:
+            # Las filas bloqueadas por otro despachador se saltan
+            ids = list(candidates.select_for_update(skip_locked=True)[:batch_size])
+            Notification.objects.filter(id__in=ids).update(**claimed)
+        else:
+            # Sin SKIP LOCKED (SQLite) el UPDATE solo toma filas aún pendientes;
+            # si otro despachador se adelantó, se releen las propias
+            ids = list(candidates[:batch_size])
+            updated = Notification.objects.filter(id__in=ids, state=Notification.PENDING).update(**claimed)
+            if updated != len(ids):
+                ids = list(Notification.objects.filter(id__in=ids, **claimed).values_list('id', flat=True))
+    return ids
+
+
+def release_stale_claims(now=None):
+    """
+    Devuelve a la cola las notificaciones reclamadas hace más de
+    ``CLAIM_LEASE`` (el despachador que las tomó murió a medias). La entrega
+    es por tanto al menos una vez.
+
+    Returns:
+        int: notificaciones liberadas
+    """
+    now = now or timezone.now()
+    return Notification.objects.filter(
+        state=Notification.SENDING,
+        claimed_at__lt=now - CLAIM_LEASE
+    ).update(state=Notification.PENDING, claimed_at=None)
+
+
+def expire_stale(now=None):
+    """
+    Marca como expiradas las pendientes vencidas hace más de
+    ``EXPIRE_AFTER``, para no enviar avisos que ya no tienen sentido tras
+    una parada del planificador.
+
+    Returns:
+        int: notificaciones expiradas
+    """
+    now = now or timezone.now()
+    return Notification.objects.filter(
+        state=Notification.PENDING,
+        scheduled_for__lt=now - EXPIRE_AFTER
+    ).update(state=Notification.EXPIRED)
+
+
+def retry_delay(attempts):
+    """Espera antes del intento siguiente a ``attempts`` intentos fallidos"""
+    return RETRY_BACKOFF * (2 ** (attempts - 1))
+
+
+def deliver(notifications, channels, pools, metrics):
+    """
+    Reparte ``notifications`` entre los canales que las aceptan y aún no
+    las entregaron en un intento anterior, en trozos de
+    ``NOTIFICATION_CHUNK_SIZE`` que procesa el pool de cada canal. Si un
+    trozo lanza una excepción, todo él cuenta como fallido en ese canal.
+
+    Returns:
+        dict: {id: (canales que la entregaron, canales que fallaron)}
+    """
+    outcome = {notification.id: (notification.delivered_to, set()) for notification in notifications}
+    futures = []
+    for channel in channels:
+        accepted = [
+            notification for notification in notifications
+            if channel.name not in outcome[notification.id][0] and channel.accepts(notification)
+        ]
+        for start in range(0, len(accepted), NOTIFICATION_CHUNK_SIZE):
+            chunk = accepted[start:start + NOTIFICATION_CHUNK_SIZE]
+            futures.append((channel, chunk, pools[channel.name].submit(channel.send_batch, chunk)))
+
+    for channel, chunk, future in futures:
+        ids = {notification.id for notification in chunk}
+        try:
+            failed = future.result() & ids
+        except Exception:
+            logger.exception('Error entregando %s notificaciones por %s', len(chunk), channel.name)
+            failed = ids
+        for notification_id in ids:
+            delivered, failed_channels = outcome[notification_id]
+            (failed_channels if notification_id in failed else delivered).add(channel.name)
+        counts = metrics['channels'][channel.name]
+        counts['delivered'] += len(ids) - len(failed)
+        counts['failed'] += len(failed)
+    return outcome
+
+
+def resolve(notifications, outcome, metrics):
+    """
+    Cierra un lote reclamado: quedan ``sent`` las notificaciones entregadas
+    por todos los canales que las aceptan. El resto vuelve a la cola con
+    backoff exponencial recordando los canales que ya la entregaron o,
+    agotados los intentos, queda ``failed``. La bandeja no espera a los
+    demás canales: en cuanto ``in_app`` entrega una notificación entra en
+    ella y cuenta como no leída, aunque el correo se siga reintentando.
+    """
+    now = timezone.now()
+    claimed = Notification.objects.filter(state=Notification.SENDING)
+
+    sent, arrived, retries = [], [], defaultdict(list)
+    for notification in notifications:
+        delivered, failed = outcome[notification.id]
+        channels = ','.join(sorted(delivered))
+        if notification.inbox_at is None and (InAppChannel.name in delivered or (delivered and not failed)):
+            arrived.append(notification)
+        if delivered and not failed:
+            sent.append((channels, notification))
+        else:
+            # Un UPDATE por intentos y canales: cada grupo comparte el backoff
+            retries[notification.attempts + 1, channels].append(notification.id)
+
+    with transaction.atomic():
+        if arrived:
+            claimed.filter(id__in=[notification.id for notification in arrived]).update(inbox_at=now)
+            # Entrar en la bandeja es lo que las cuenta como no leídas
+            add_unread(Counter(notification.user_id for notification in arrived))
+
+        by_channels = defaultdict(list)
+        for channels, notification in sent:
+            by_channels[channels].append(notification.id)
+        for channels, ids in by_channels.items():
+            claimed.filter(id__in=ids).update(
+                state=Notification.SENT, sent_at=now, delivered_channels=channels
+            )
+
+        for (attempts, channels), ids in retries.items():
+            if attempts >= MAX_ATTEMPTS:
+                claimed.filter(id__in=ids).update(
+                    state=Notification.FAILED, attempts=attempts, delivered_channels=channels
+                )
+                metrics['failed'] += len(ids)
+            else:
+                claimed.filter(id__in=ids).update(
+                    state=Notification.PENDING,
+                    attempts=attempts,
+                    delivered_channels=channels,
+                    claimed_at=None,
+                    scheduled_for=now + retry_delay(attempts)
+                )
+                metrics['retried'] += len(ids)
+
+    if sent:
+        lags = [
+            (now - notification.scheduled_for).total_seconds()
+            for _, notification in sent if notification.scheduled_for
+        ]
+        metrics['sent'] += len(sent)
+        metrics['lag_total'] += sum(lags)
+        metrics['lag_max'] = max([metrics['lag_max'], *lags])
+
+
+def dispatch_notifications(now=None, batch_size=NOTIFICATION_BATCH_SIZE, channels=None):
+    """
+    Entrega las notificaciones vencidas. Primero libera los reclamos
+    caducados y expira las pendientes demasiado antiguas; después reclama
+    lotes de ``batch_size`` y los reparte por los canales, cada uno con su
+    propio pool de ``CHANNEL_WORKERS`` hilos, de modo que un canal lento
+    (SMTP, servicio push) no frena a los demás.
+
+    Returns:
+        dict: métricas de la pasada (reclamadas, enviadas, reintentos,
+        fallidas, expiradas, throughput, lag y entregas por canal)
+    """
+    started = time.monotonic()
+    channels = default_channels() if channels is None else channels
+    metrics = {
+        'claimed': 0,
+        'sent': 0,
+        'retried': 0,
+        'failed': 0,
+        'released': release_stale_claims(now),
+        'expired': expire_stale(now),
+        'lag_total': 0.0,
+        'lag_max': 0.0,
+        'channels': {channel.name: {'delivered': 0, 'failed': 0} for channel in channels},
+    }
+
+    prefetch = [name for channel in channels for name in channel.prefetch]
+    pools = {
+        channel.name: ThreadPoolExecutor(
+            max_workers=CHANNEL_WORKERS.get(channel.name, 1),
+            thread_name_prefix=f'notifications-{channel.name}'
+        )
+        for channel in channels
+    }
+    try:
+        while True:
+            ids = claim_due_notifications(now=now, batch_size=batch_size)
+            if not ids:
+                break
+            metrics['claimed'] += len(ids)
+            notifications = list(
+                Notification.objects.filter(id__in=ids).select_related('user').prefetch_related(*prefetch)
+            )
+            resolve(notifications, deliver(notifications, channels, pools, metrics), metrics)
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+        for channel in channels:
+            channel.finish()
+
+    elapsed = time.monotonic() - started
+    lag_total = metrics.pop('lag_total')
+    metrics.update({
+        'elapsed': elapsed,
+        'throughput': metrics['sent'] / elapsed if elapsed else 0.0,
+        'lag_avg': lag_total / metrics['sent'] if metrics['sent'] else 0.0,
+    })
+    if metrics['claimed'] or metrics['expired'] or metrics['released']:
+        logger.info(
+            'Notificaciones: %(claimed)s reclamadas, %(sent)s enviadas, %(retried)s reintentos, '
+            '%(failed)s fallidas, %(expired)s expiradas; %(throughput).1f/s, lag medio %(lag_avg).1fs, '
+            'lag máximo %(lag_max).1fs', metrics
+        )
+    return metrics
@@ -0,0 +1,135 @@
+import base64
+import json
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from apps.notifications.models import Notification
+
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+FEED_FIELDS = ('id', 'type', 'title', 'message', 'task_id', 'inbox_at', 'read_at')
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no es válido"""
+
+
+def encode_cursor(inbox_at, pk):
+    """Cursor opaco a partir de la última notificación entregada"""
+    payload = json.dumps([inbox_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (inbox_at, id) de la última notificación de la página anterior
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        inbox_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(inbox_at), int(pk)
+    except (TypeError, ValueError):
+        raise InvalidCursor('Cursor inválido')
+
+
+def inbox(user_id):
+    """
+    Notificaciones que el usuario ve en la bandeja: las que ya entregó el
+    canal ``in_app``, aunque el correo siga pendiente o haya fallado.
+    """
+    return Notification.objects.filter(user_id=user_id, inbox_at__isnull=False)
+
+
+def feed(user_id, cursor=None, limit=FEED_PAGE_SIZE, unread_only=False):
+    """
+    Página de la bandeja de un usuario, de la más reciente a la más
+    antigua. Pagina por keyset sobre ``(inbox_at, id)`` con el índice
+    ``(user, inbox_at, id)``: cada página es un rango del índice, sin
+    OFFSET, por profunda que sea.
+
+    Returns:
+        dict: notificaciones de la página y cursor de la siguiente (o None)
+    """
+    notifications = inbox(user_id)
+    if unread_only:
+        notifications = notifications.filter(read_at__isnull=True)
+    if cursor:
+        inbox_at, pk = decode_cursor(cursor)
+        notifications = notifications.filter(Q(inbox_at__lt=inbox_at) | Q(inbox_at=inbox_at, id__lt=pk))
+
+    rows = list(notifications.order_by('-inbox_at', '-id').values(*FEED_FIELDS)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['inbox_at'], rows[-1]['id'])
+    return {'results': rows, 'next_cursor': next_cursor}
+
+
+def adjust_unread(user_id, delta):
+    """Suma ``delta`` al contador de no leídas del usuario, sin bajar de 0"""
+    get_user_model().objects.filter(pk=user_id).update(
+        unread_notifications=Greatest(F('unread_notifications') + delta, Value(0))
+    )
+
+
+def add_unread(counts):
+    """
+    Suma a cada usuario sus notificaciones recién entregadas con un único
+    UPDATE.
+
+    Args:
+        counts: {user_id: notificaciones entregadas}
+    """
+    if not counts:
+        return
+    get_user_model().objects.filter(pk__in=counts).update(
+        unread_notifications=F('unread_notifications') + Case(
+            *[When(pk=user_id, then=Value(count)) for user_id, count in counts.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+    )
+
+
+def mark_read(user_id, ids=None, now=None):
+    """
+    Marca como leídas las notificaciones ``ids`` del usuario (todas si es
+    None) con un único UPDATE y descuenta las que de verdad cambiaron del
+    contador, en la misma transacción.
+
+    Returns:
+        int: notificaciones marcadas
+    """
+    now = now or timezone.now()
+    unread = inbox(user_id).filter(read_at__isnull=True)
+    if ids is not None:
+        unread = unread.filter(id__in=ids)
+    with transaction.atomic():
+        updated = unread.update(read_at=now)
+        if updated:
+            adjust_unread(user_id, -updated)
+    return updated
+
+
+def recount_unread(user_ids=None):
+    """
+    Recalcula el contador desde la tabla de notificaciones con un UPDATE
+    por subconsulta. Solo hace falta si el contador se desvió (p. ej. tras
+    editar notificaciones a mano).
+
+    Returns:
+        int: usuarios actualizados
+    """
+    users = get_user_model().objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    unread = inbox(OuterRef('pk')).filter(read_at__isnull=True).order_by().values('user_id').annotate(
+        count=Count('id')
+    ).values('count')
+    return users.update(unread_notifications=Coalesce(Subquery(unread), 0))
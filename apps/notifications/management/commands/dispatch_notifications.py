@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.dispatch import NOTIFICATION_BATCH_SIZE, dispatch_notifications
+
+
+class Command(BaseCommand):
+    help = 'Entrega las notificaciones programadas por los canales in-app, correo y push'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=NOTIFICATION_BATCH_SIZE,
+            help='Número de notificaciones reclamadas por lote'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Seguir consultando la cola en lugar de hacer una sola pasada'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Segundos de espera entre pasadas con --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            metrics = dispatch_notifications(batch_size=options['batch_size'])
+            if metrics['claimed'] or metrics['expired']:
+                self.stdout.write(
+                    f"{metrics['sent']} enviadas, {metrics['retried']} reintentos, "
+                    f"{metrics['failed']} fallidas, {metrics['expired']} expiradas "
+                    f"({metrics['throughput']:.1f}/s, lag medio {metrics['lag_avg']:.1f}s)"
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -23,4 +23,55 @@ class Notification(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
-    scheduled_for = models.DateTimeField(null=True)
\ No newline at end of file
+    scheduled_for = models.DateTimeField(null=True)
+
+    # Entrega (apps.notifications.dispatch)
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    EXPIRED = 'expired'
+    STATES = [
+        (PENDING, 'Pendiente'),
+        (SENDING, 'Enviando'),
+        (SENT, 'Enviada'),
+        (FAILED, 'Fallida'),
+        (EXPIRED, 'Expirada'),
+    ]
+    state = models.CharField(max_length=10, choices=STATES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Canales que ya la entregaron, separados por comas: los reintentos solo
+    # repiten los que fallaron
+    delivered_channels = models.CharField(max_length=100, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Momento en que entró en la bandeja: en cuanto la entrega el canal
+    # ``in_app``, aunque otros canales sigan reintentando
+    inbox_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def delivered_to(self):
+        """Nombres de los canales que ya entregaron la notificación"""
+        return set(filter(None, self.delivered_channels.split(',')))
+
+    class Meta:
+        indexes = [
+            # El estado va primero: las pendientes vencidas son un rango
+            # contiguo del índice que termina en ``now``
+            models.Index(fields=['state', 'scheduled_for']),
+            # Bandeja del usuario paginada por keyset (apps.notifications.inbox)
+            models.Index(fields=['user', 'inbox_at', 'id']),
+        ]
+
+
+class PushSubscription(models.Model):
+    """Suscripción Web Push de un navegador (la usa ``static/js/sw.js``)"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='push_subscriptions')
+    endpoint = models.URLField(max_length=500, unique=True)
+    p256dh = models.CharField(max_length=200)
+    auth = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def subscription_info(self):
+        """Formato que espera ``pywebpush.webpush``"""
+        return {'endpoint': self.endpoint, 'keys': {'p256dh': self.p256dh, 'auth': self.auth}}
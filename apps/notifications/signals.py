@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from apps.notifications.inbox import adjust_unread
+from apps.notifications.models import Notification
+
+
+@receiver(post_delete, sender=Notification)
+def discount_deleted_unread(sender, instance, **kwargs):
+    """Descuenta del contador una notificación entregada y sin leer que se borra"""
+    if instance.inbox_at is not None and instance.read_at is None:
+        adjust_unread(instance.user_id, -1)
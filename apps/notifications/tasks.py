@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from apps.notifications.dispatch import dispatch_notifications
+
+
+@shared_task(ignore_result=True)
+def send_due_notifications():
+    """Tarea periódica (Celery beat) que entrega las notificaciones vencidas"""
+    return dispatch_notifications()
@@ -1,3 +1,197 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.notifications.channels import Channel, EmailChannel, InAppChannel
+from apps.notifications.dispatch import MAX_ATTEMPTS, claim_due_notifications, dispatch_notifications
+from apps.notifications.inbox import feed, inbox, mark_read, recount_unread
+from apps.notifications.models import Notification
+from apps.security.models import User
+
+
+class FailingChannel(Channel):
+    name = 'failing'
+
+    def send_batch(self, notifications):
+        raise ConnectionError('canal caído')
+
+
+class RecordingChannel(InAppChannel):
+    def __init__(self):
+        self.sent = []
+
+    def send_batch(self, notifications):
+        self.sent.extend(notification.id for notification in notifications)
+        return set()
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP caído')
+
+
+# Según cómo se importó este módulo (``apps.notifications.tests`` o ``notifications.tests``)
+FAILING_EMAIL_BACKEND = f'{FailingEmailBackend.__module__}.FailingEmailBackend'
+
+
+class NotificationDispatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.now = timezone.now()
+
+    def create_notification(self, minutes_ago=1, type='task_due', **kwargs):
+        return Notification.objects.create(
+            user=self.user,
+            type=type,
+            title='Tarea próxima a vencer',
+            message='La tarea vence pronto.',
+            scheduled_for=self.now - timedelta(minutes=minutes_ago),
+            **kwargs
+        )
+
+    def test_dispatches_due_notifications_once(self):
+        due = self.create_notification()
+        in_app_only = self.create_notification(type='pomodoro_break')
+        future = self.create_notification(minutes_ago=-10)
+        stale = self.create_notification(minutes_ago=60 * 48)
+
+        metrics = dispatch_notifications(channels=[InAppChannel(), EmailChannel()], batch_size=1)
+
+        self.assertEqual(metrics['claimed'], 2)
+        self.assertEqual(metrics['sent'], 2)
+        self.assertEqual(metrics['expired'], 1)
+        self.assertEqual(metrics['channels']['email'], {'delivered': 1, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ana@example.com'])
+
+        states = dict(Notification.objects.values_list('id', 'state'))
+        self.assertEqual(states[due.id], Notification.SENT)
+        self.assertEqual(states[in_app_only.id], Notification.SENT)
+        self.assertEqual(states[future.id], Notification.PENDING)
+        self.assertEqual(states[stale.id], Notification.EXPIRED)
+
+        self.assertEqual(dispatch_notifications(channels=[InAppChannel()])['claimed'], 0)
+        self.assertEqual(claim_due_notifications(), [])
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        notification = self.create_notification()
+
+        with self.assertLogs('apps.notifications.dispatch', 'ERROR'):
+            metrics = dispatch_notifications(channels=[FailingChannel()])
+        notification.refresh_from_db()
+        self.assertEqual(metrics['retried'], 1)
+        self.assertEqual(notification.state, Notification.PENDING)
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.scheduled_for, timezone.now())
+
+        Notification.objects.filter(pk=notification.pk).update(
+            attempts=MAX_ATTEMPTS - 1, scheduled_for=self.now
+        )
+        with self.assertLogs('apps.notifications.dispatch', 'ERROR'):
+            metrics = dispatch_notifications(channels=[FailingChannel()])
+        notification.refresh_from_db()
+        self.assertEqual(metrics['failed'], 1)
+        self.assertEqual(notification.state, Notification.FAILED)
+
+
+    def test_email_failure_is_retried_without_repeating_in_app(self):
+        notification = self.create_notification()
+        in_app = RecordingChannel()
+
+        with self.settings(EMAIL_BACKEND=FAILING_EMAIL_BACKEND):
+            with self.assertLogs('apps.notifications.channels', 'ERROR'):
+                metrics = dispatch_notifications(channels=[in_app, EmailChannel()])
+        notification.refresh_from_db()
+        self.assertEqual(metrics['sent'], 0)
+        self.assertEqual(metrics['retried'], 1)
+        self.assertEqual(notification.state, Notification.PENDING)
+        self.assertEqual(notification.delivered_to, {'in_app'})
+
+        Notification.objects.filter(pk=notification.pk).update(scheduled_for=self.now)
+        metrics = dispatch_notifications(channels=[in_app, EmailChannel()])
+        notification.refresh_from_db()
+        self.assertEqual(metrics['sent'], 1)
+        self.assertEqual(notification.state, Notification.SENT)
+        self.assertEqual(notification.delivered_to, {'in_app', 'email'})
+        self.assertEqual(in_app.sent, [notification.id])
+        self.assertEqual(len(mail.outbox), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.unread_notifications, 1)
+
+    def test_in_app_delivery_reaches_inbox_when_email_keeps_failing(self):
+        notification = self.create_notification()
+
+        with self.settings(EMAIL_BACKEND=FAILING_EMAIL_BACKEND):
+            for _ in range(MAX_ATTEMPTS):
+                with self.assertLogs('apps.notifications.channels', 'ERROR'):
+                    dispatch_notifications(channels=[InAppChannel(), EmailChannel()])
+                Notification.objects.filter(pk=notification.pk).update(scheduled_for=self.now)
+        notification.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(notification.state, Notification.FAILED)
+        self.assertEqual(list(inbox(self.user.pk)), [notification])
+        self.assertEqual(self.user.unread_notifications, 1)
+        self.assertEqual([row['id'] for row in feed(self.user.pk)['results']], [notification.id])
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notifications:unread_count'))
+        self.assertEqual(response.json(), {'unread_count': 1})
+
+
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        now = timezone.now()
+        Notification.objects.bulk_create([
+            Notification(
+                user=self.user,
+                type='pomodoro_break',
+                title=f'Aviso {index}',
+                message='Es hora de tomar un descanso.',
+                scheduled_for=now - timedelta(minutes=index)
+            )
+            for index in range(5)
+        ])
+        dispatch_notifications(channels=[InAppChannel()])
+        self.user.refresh_from_db()
+
+    def test_counter_follows_delivery_read_and_delete(self):
+        self.assertEqual(self.user.unread_notifications, 5)
+
+        first_page = feed(self.user.pk, limit=3)
+        second_page = feed(self.user.pk, cursor=first_page['next_cursor'], limit=3)
+        self.assertEqual(len(first_page['results']), 3)
+        self.assertEqual(len(second_page['results']), 2)
+        self.assertIsNone(second_page['next_cursor'])
+        ids = [row['id'] for row in first_page['results'] + second_page['results']]
+        self.assertEqual(len(set(ids)), 5)
+
+        self.assertEqual(mark_read(self.user.pk, ids[:2]), 2)
+        self.assertEqual(mark_read(self.user.pk, ids[:2]), 0)
+        Notification.objects.filter(pk=ids[-1]).delete()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.unread_notifications, 2)
+
+        User.objects.filter(pk=self.user.pk).update(unread_notifications=40)
+        recount_unread([self.user.pk])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.unread_notifications, 2)
+
+    def test_badge_and_mark_all_read_views(self):
+        self.client.force_login(self.user)
+        # Sesión, usuario y actualización de la sesión: ninguna sobre las notificaciones
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('notifications:unread_count'))
+        self.assertEqual(response.json(), {'unread_count': 5})
+
+        response = self.client.post(
+            reverse('notifications:notification_read'), {'all': True}, content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'updated': 5, 'unread_count': 0})
 
-# Create your tests here.
+        response = self.client.get(reverse('notifications:notification_feed'), {'unread': '1'})
+        self.assertEqual(response.json()['results'], [])
@@ -0,0 +1,24 @@
+from django.urls import path
+
+from apps.notifications.views import (
+    NotificationEventsView,
+    NotificationFeedView,
+    NotificationReadView,
+    PushSubscriptionView,
+    UnreadCountView,
+)
+
+app_name = 'notifications'
+
+urlpatterns = [
+    # Bandeja paginada por cursor y marcado como leídas
+    path('', NotificationFeedView.as_view(), name='notification_feed'),
+    path('read/', NotificationReadView.as_view(), name='notification_read'),
+    path('unread-count/', UnreadCountView.as_view(), name='unread_count'),
+
+    # Canal SSE con las notificaciones entregadas (requiere ASGI)
+    path('events/', NotificationEventsView.as_view(), name='notification_events'),
+
+    # Suscripción Web Push del navegador
+    path('push/subscription/', PushSubscriptionView.as_view(), name='push_subscription'),
+]
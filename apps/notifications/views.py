@@ -1,3 +1,137 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+
+from apps.notifications.channels import notification_channel
+from apps.notifications.inbox import FEED_MAX_PAGE_SIZE, FEED_PAGE_SIZE, InvalidCursor, feed, mark_read
+from apps.notifications.models import PushSubscription
+from apps.pomodoro.events import get_broker, stream_unavailable
+
+
+class NotificationFeedView(LoginRequiredMixin, View):
+    """
+    Bandeja del usuario paginada por cursor:
+    ``?cursor=<next_cursor>&limit=N&unread=1``. El contador de no leídas
+    sale del propio usuario, sin contar filas.
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(max(int(request.GET.get('limit', FEED_PAGE_SIZE)), 1), FEED_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = FEED_PAGE_SIZE
+        try:
+            data = feed(
+                request.user.pk,
+                cursor=request.GET.get('cursor'),
+                limit=limit,
+                unread_only=request.GET.get('unread') == '1'
+            )
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        data['unread_count'] = request.user.unread_notifications
+        return JsonResponse(data, encoder=DjangoJSONEncoder)
+
+
+class NotificationReadView(LoginRequiredMixin, View):
+    """
+    Marca como leídas las notificaciones ``{"ids": [...]}`` o, con
+    ``{"all": true}``, toda la bandeja, en un único UPDATE.
+    """
+
+    def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body or '{}')
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'JSON inválido'}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({'error': 'JSON inválido'}, status=400)
+
+        if data.get('all'):
+            ids = None
+        else:
+            ids = data.get('ids')
+            if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+                return JsonResponse({'error': 'Se requiere una lista de ids'}, status=400)
+
+        updated = mark_read(request.user.pk, ids)
+        request.user.refresh_from_db(fields=['unread_notifications'])
+        return JsonResponse({'updated': updated, 'unread_count': request.user.unread_notifications})
+
+
+class UnreadCountView(LoginRequiredMixin, View):
+    """Contador de no leídas para el badge de la barra de navegación"""
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({'unread_count': request.user.unread_notifications})
+
+
+class PushSubscriptionView(LoginRequiredMixin, View):
+    """
+    Alta (POST) y baja (DELETE) de la suscripción Web Push del navegador.
+    El cuerpo es el JSON de ``PushSubscription.toJSON()``.
+    """
+
+    def parse(self, request):
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return None
+        return data if isinstance(data, dict) and data.get('endpoint') else None
+
+    def post(self, request, *args, **kwargs):
+        data = self.parse(request)
+        keys = (data or {}).get('keys') or {}
+        if not data or not keys.get('p256dh') or not keys.get('auth'):
+            return JsonResponse({'error': 'Suscripción no válida'}, status=400)
+
+        # Un endpoint pertenece a un navegador: si cambia de usuario se reasigna
+        _, created = PushSubscription.objects.update_or_create(
+            endpoint=data['endpoint'],
+            defaults={'user': request.user, 'p256dh': keys['p256dh'], 'auth': keys['auth']}
+        )
+        return JsonResponse({'status': 'success'}, status=201 if created else 200)
+
+    def delete(self, request, *args, **kwargs):
+        data = self.parse(request)
+        if not data:
+            return JsonResponse({'error': 'Suscripción no válida'}, status=400)
+        PushSubscription.objects.filter(user=request.user, endpoint=data['endpoint']).delete()
+        return JsonResponse({'status': 'success'})
+
+
+class NotificationEventsView(View):
+    """
+    Canal SSE con las notificaciones que entrega ``InAppChannel``. Como
+    ``PomodoroEventsView``, debe servirse con un servidor ASGI.
+    """
+    heartbeat = 15
+
+    async def get(self, request, *args, **kwargs):
+        unavailable = stream_unavailable(request)
+        if unavailable:
+            return unavailable
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+
+        subscription = await get_broker().subscribe(notification_channel(user.pk))
+        response = StreamingHttpResponse(self.stream(subscription), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, subscription):
+        try:
+            while True:
+                message = await subscription.get(timeout=self.heartbeat)
+                if message is None:
+                    # Comentario SSE para que los proxies no cierren la conexión
+                    yield ': ping\n\n'
+                else:
+                    yield f'event: notification\ndata: {message}\n\n'
+        finally:
+            await subscription.close()
@@ -0,0 +1,143 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from apps.pomodoro.models import FINISHED_SESSION_STATUSES, PomodoroDailyStats, PomodoroSession
+
+# Días de cada rango de la API de analíticas
+RANGES = {
+    'week': 7,
+    'month': 30,
+    'year': 365,
+}
+SERIES_FIELDS = ('sessions', 'pomodoros', 'focus_minutes', 'pauses', 'interruptions', 'total_pause_seconds')
+BACKFILL_BATCH_SIZE = 500
+
+_completed_pomodoro = Q(status='completed', session_type='pomodoro')
+# Equivalente en SQL de ``session_totals`` para reconstruir la tabla
+DAILY_AGGREGATES = {
+    'sessions': Count('id'),
+    'pomodoros': Count('id', filter=_completed_pomodoro),
+    'focus_minutes': Coalesce(Sum('actual_duration', filter=_completed_pomodoro), 0),
+    'pauses': Coalesce(Sum('pause_count'), 0),
+    'interruptions': Coalesce(Sum('interruption_count'), 0),
+    'total_pause_seconds': Coalesce(Sum('total_pause_duration'), 0),
+}
+
+
+def session_totals(session):
+    """Lo que suma una sesión terminada a su día en ``PomodoroDailyStats``"""
+    completed_pomodoro = session.status == 'completed' and session.session_type == 'pomodoro'
+    return {
+        'sessions': 1,
+        'pomodoros': int(completed_pomodoro),
+        'focus_minutes': (session.actual_duration or 0) if completed_pomodoro else 0,
+        'pauses': session.pause_count,
+        'interruptions': session.interruption_count,
+        'total_pause_seconds': session.total_pause_duration,
+    }
+
+
+def add_to_daily_stats(user_id, date, totals):
+    """Suma ``totals`` a la fila del día con un UPDATE ``F() + n``, creándola si falta"""
+    rows = PomodoroDailyStats.objects.filter(user_id=user_id, date=date)
+    updates = {name: F(name) + value for name, value in totals.items()}
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            PomodoroDailyStats.objects.create(user_id=user_id, date=date, **totals)
+    except IntegrityError:
+        # Otra sesión del mismo día creó la fila entre el UPDATE y el INSERT
+        rows.update(**updates)
+
+
+def record_finished_session(session, now=None):
+    """
+    Suma una sesión terminada a las estadísticas diarias de su usuario (el
+    día local de ``started_at``). Idempotente por sesión: ``aggregated_at``
+    se reclama con un UPDATE condicionado en la misma transacción.
+
+    Returns:
+        bool: True si esta llamada sumó la sesión
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        claimed = PomodoroSession.objects.filter(
+            pk=session.pk, aggregated_at__isnull=True
+        ).update(aggregated_at=now)
+        if not claimed:
+            return False
+        add_to_daily_stats(session.user_id, timezone.localdate(session.started_at), session_totals(session))
+    session.aggregated_at = now
+    return True
+
+
+def rebuild_daily_stats(user_ids=None, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Reconstruye ``PomodoroDailyStats`` desde las sesiones terminadas, por
+    lotes de ``batch_size`` usuarios. Cada lote es una transacción: marca
+    sus sesiones como agregadas, borra sus filas y las vuelve a crear con
+    una consulta agrupada por usuario y día.
+
+    Returns:
+        int: filas diarias creadas
+    """
+    users = get_user_model().objects.order_by('id').values_list('id', flat=True)
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+
+    created = 0
+    last_id = 0
+    while True:
+        batch = list(users.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return created
+        last_id = batch[-1]
+
+        with transaction.atomic():
+            finished = PomodoroSession.objects.filter(user_id__in=batch, status__in=FINISHED_SESSION_STATUSES)
+            finished.filter(aggregated_at__isnull=True).update(aggregated_at=timezone.now())
+            rows = finished.annotate(date=TruncDate('started_at')).values(
+                'user_id', 'date'
+            ).annotate(**DAILY_AGGREGATES).order_by()
+
+            PomodoroDailyStats.objects.filter(user_id__in=batch).delete()
+            created += len(PomodoroDailyStats.objects.bulk_create(
+                [PomodoroDailyStats(**row) for row in rows], batch_size=1000
+            ))
+
+
+def daily_series(user, days, end=None):
+    """
+    Serie diaria de los últimos ``days`` días hasta ``end`` (hoy por
+    defecto), leída de ``PomodoroDailyStats``: una fila por día con
+    actividad, sin recorrer las sesiones. Los días sin actividad van a 0.
+
+    Returns:
+        dict: inicio, fin, serie y totales del rango
+    """
+    end = end or timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    rows = {
+        row['date']: row
+        for row in PomodoroDailyStats.objects.filter(
+            user=user, date__gte=start, date__lte=end
+        ).values('date', *SERIES_FIELDS)
+    }
+
+    empty = dict.fromkeys(SERIES_FIELDS, 0)
+    totals = dict(empty)
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day, {'date': day, **empty})
+        for name in SERIES_FIELDS:
+            totals[name] += row[name]
+        series.append(row)
+
+    return {'start': start, 'end': end, 'series': series, 'totals': totals}
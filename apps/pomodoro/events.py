@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def stream_unavailable(request):
+    """
+    Respuesta de error para un canal SSE pedido fuera de ASGI, o None si se
+    puede abrir. Bajo WSGI Django consume el iterador asíncrono entero antes
+    de enviar nada: la conexión no recibiría ningún evento y retendría un
+    worker indefinidamente. El cliente recurre entonces a la consulta
+    periódica.
+    """
+    if isinstance(request, ASGIRequest):
+        return None
+    return JsonResponse({'error': 'El canal de eventos requiere un servidor ASGI'}, status=503)
+
+
+def session_channel(user_id):
+    """Canal de eventos de las sesiones Pomodoro de un usuario"""
+    return f'pomodoro:{user_id}'
+
+
+class InProcessSubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, message):
+        # ``publish`` se llama desde hilos de vistas síncronas
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    async def get(self, timeout=None):
+        """Siguiente mensaje, o None si se agota ``timeout``"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Reparto de eventos dentro del proceso. Suficiente con un único proceso
+    ASGI y en tests; con varios workers hace falta ``RedisBroker``.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    async def subscribe(self, channel):
+        subscription = InProcessSubscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            channel = self._subscriptions.get(subscription.channel)
+            if channel is not None:
+                channel.discard(subscription)
+                if not channel:
+                    del self._subscriptions[subscription.channel]
+
+
+class RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout=None):
+        """Siguiente mensaje, o None si se agota ``timeout``"""
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        data = message['data']
+        return data.decode() if isinstance(data, bytes) else data
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """Reparto de eventos entre procesos mediante Redis pub/sub"""
+
+    def __init__(self, url=None):
+        self.url = url or settings.REDIS_URL
+        self._client = None
+
+    def publish(self, channel, message):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(channel, message)
+
+    async def subscribe(self, channel):
+        import redis.asyncio
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        return RedisSubscription(client, pubsub)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Broker configurado en ``POMODORO_EVENTS_BROKER`` (ruta a la clase)"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'POMODORO_EVENTS_BROKER', 'apps.pomodoro.events.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish_session_state(user_id, data):
+    """
+    Publica el estado de una sesión (``get_session_data``) a los clientes
+    suscritos del usuario una vez confirmada la transacción en curso.
+    """
+    message = json.dumps({'session': data}, cls=DjangoJSONEncoder)
+
+    def publish():
+        try:
+            get_broker().publish(session_channel(user_id), message)
+        except Exception:
+            logger.exception('Error publicando el estado de la sesión Pomodoro')
+
+    transaction.on_commit(publish)
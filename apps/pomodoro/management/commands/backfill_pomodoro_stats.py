@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.pomodoro.analytics import BACKFILL_BATCH_SIZE, rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye las estadísticas diarias de Pomodoro a partir de las sesiones terminadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Id del usuario a reconstruir (por defecto todos)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BACKFILL_BATCH_SIZE,
+            help='Número de usuarios procesados por lote'
+        )
+
+    def handle(self, *args, **options):
+        created = rebuild_daily_stats(user_ids=options['user_ids'], batch_size=options['batch_size'])
+        self.stdout.write(f'{created} días de estadísticas reconstruidos')
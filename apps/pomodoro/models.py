@@ -1,9 +1,30 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
-from apps.tasks.models import Task, TaskEvent
+from apps.tasks.models import Task
+
+SETTINGS_CACHE_KEY = 'pomodoro-settings:{}'
+SETTINGS_CACHE_TIMEOUT = getattr(settings, 'POMODORO_SETTINGS_CACHE_TIMEOUT', 3600)
+
+
+class PomodoroSettingsManager(models.Manager):
+    def for_user(self, user_id, defaults=None):
+        """
+        Configuración de un usuario, cacheada por usuario. Se crea con
+        ``defaults`` si aún no existe; ``save`` y ``delete`` invalidan la caché.
+        """
+        key = SETTINGS_CACHE_KEY.format(user_id)
+        values = cache.get(key)
+        if values is not None:
+            return self.model.from_db(self.db, list(values), list(values.values()))
+
+        instance, _ = self.get_or_create(user_id=user_id, defaults=defaults or {})
+        cache.set(key, instance.cache_values(), SETTINGS_CACHE_TIMEOUT)
+        return instance
+
 
 class PomodoroSettings(models.Model):
     """Configuración personalizada de Pomodoro para cada usuario"""
@@ -37,6 +58,8 @@ class PomodoroSettings(models.Model):
         help_text="Iniciar pomodoros automáticamente después de un descanso"
     )
 
+    objects = PomodoroSettingsManager()
+
     class Meta:
         verbose_name = "Configuración Pomodoro"
         verbose_name_plural = "Configuraciones Pomodoro"
@@ -45,6 +68,44 @@ class PomodoroSettings(models.Model):
     def __str__(self):
         return f"Configuración Pomodoro de {self.user.username}"
 
+    def cache_values(self):
+        """Valores de las columnas, sin objetos relacionados, para la caché"""
+        return {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+
+    def invalidate_cache(self):
+        key = SETTINGS_CACHE_KEY.format(self.user_id)
+        cache.delete(key)
+        # Una lectura concurrente pudo cachear el valor anterior antes del commit
+        transaction.on_commit(lambda: cache.delete(key))
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidate_cache()
+
+    def delete(self, *args, **kwargs):
+        self.invalidate_cache()
+        return super().delete(*args, **kwargs)
+
+# Estados en los que una sesión cuenta como activa
+ACTIVE_SESSION_STATUSES = ['in_progress', 'paused']
+# Estados finales: la sesión ya suma a PomodoroDailyStats
+FINISHED_SESSION_STATUSES = ['completed', 'interrupted', 'cancelled']
+
+
+class ServiceMarkerField(models.DateTimeField):
+    """
+    Marca que solo escriben los UPDATE de un servicio (apps.tasks.counters,
+    apps.pomodoro.analytics). En el UPDATE de ``Model.save`` la columna se
+    asigna a sí misma, así que una instancia leída antes de que el servicio
+    reclamara la sesión no vuelve a dejarla vacía.
+    """
+
+    def pre_save(self, model_instance, add):
+        if add:
+            return super().pre_save(model_instance, add)
+        return models.F(self.attname)
+
+
 class PomodoroSession(models.Model):
     SESSION_TYPES = [
         ('pomodoro', 'Pomodoro'),
@@ -76,6 +137,10 @@ class PomodoroSession(models.Model):
     
     interruption_count = models.IntegerField(default=0)
     notes = models.TextField(blank=True)
+    # Momento en que la sesión sumó su pomodoro a la tarea (ver apps.tasks.counters)
+    counted_at = ServiceMarkerField(null=True, blank=True, editable=False)
+    # Momento en que la sesión sumó a PomodoroDailyStats (ver apps.pomodoro.analytics)
+    aggregated_at = ServiceMarkerField(null=True, blank=True, editable=False)
 
     # Nuevo campo para tracking de audio
     background_audio_enabled = models.BooleanField(default=False)
@@ -84,32 +149,44 @@ class PomodoroSession(models.Model):
         ordering = ['-started_at']
         indexes = [
             models.Index(fields=['user', 'status', 'started_at']),
+            # Sesiones del día de un usuario sin filtrar por estado
+            models.Index(fields=['user', 'started_at'], name='pomodoro_user_started_idx'),
             models.Index(fields=['task', 'session_type'])
         ]
-
-    def clean(self):
-        if self.status == 'in_progress' and PomodoroSession.objects.filter(
-            user=self.user,
-            status='in_progress'
-        ).exclude(pk=self.pk).exists():
-            raise ValidationError('Ya existe una sesión activa para este usuario')
+        constraints = [
+            # Una sola sesión activa por usuario, garantizada por la base de
+            # datos aunque dos peticiones inicien sesión a la vez
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(status__in=ACTIVE_SESSION_STATUSES),
+                name='unique_active_pomodoro_session',
+                violation_error_message='Ya existe una sesión activa para este usuario'
+            )
+        ]
 
     def save(self, *args, **kwargs):
-        self.clean()
-        if self.status in ['completed', 'interrupted', 'cancelled'] and not self.ended_at:
-            self.ended_at = timezone.now()
-            if self.started_at:
+        if self.status in FINISHED_SESSION_STATUSES:
+            if not self.ended_at:
+                self.ended_at = timezone.now()
+            # complete() y cancel() fijan ended_at antes de guardar
+            if self.actual_duration is None and self.started_at:
                 # Calcular duración real considerando pausas
                 total_duration = (self.ended_at - self.started_at).total_seconds()
-                self.actual_duration = int((total_duration - self.total_pause_duration) / 60)
-                
-                # Actualizar contador de pomodoros completados si aplica
-                if self.status == 'completed' and self.session_type == 'pomodoro':
-                    self.task.completed_pomodoros += 1
-                    self.task.save()
+                self.actual_duration = max(int((total_duration - self.total_pause_duration) / 60), 0)
         
         super().save(*args, **kwargs)
+        
+        # Actualizar contador de pomodoros completados si aplica
+        if self.status == 'completed' and self.session_type == 'pomodoro' and self.counted_at is None:
+            from apps.tasks.counters import count_session_pomodoro
+            count_session_pomodoro(self)
+        
+        # Sumar la sesión terminada a las estadísticas diarias del usuario
+        if self.status in FINISHED_SESSION_STATUSES and self.aggregated_at is None:
+            from apps.pomodoro.analytics import record_finished_session
+            record_finished_session(self)
 
+    @transaction.atomic
     def pause(self):
         """Pausar la sesión actual y actualizar el estado de la tarea"""
         if self.status != 'in_progress':
@@ -123,6 +200,7 @@ class PomodoroSession(models.Model):
         # Notify task about the pause
         self.task.handle_session_pause(self)
 
+    @transaction.atomic
     def interrupt(self):
         """Registrar una interrupción en la sesión y notificar a la tarea"""
         if self.status not in ['in_progress', 'paused']:
@@ -134,6 +212,7 @@ class PomodoroSession(models.Model):
         # Notify task about the interruption
         self.task.handle_session_interruption(self)
 
+    @transaction.atomic
     def cancel(self):
         """Cancelar la sesión actual y actualizar el estado de la tarea"""
         if self.status not in ['in_progress', 'paused']:
@@ -160,19 +239,21 @@ class PomodoroSession(models.Model):
             # Si no hemos alcanzado los pomodoros estimados, volver a pending
             if completed_pomodoros < self.task.estimated_pomodoros:
                 self.task.status = 'pending'
-                self.task.save(update_fields=['status'])
+                self.task.save(update_fields=['status', 'updated_at'])
         
         self.status = 'cancelled'
         self.ended_at = timezone.now()
         self.save()
         
-        # Registrar el evento
-        TaskEvent.objects.create(
-            task=self.task,
-            event_type='session_cancelled',
-            description=f'Sesión cancelada después de {self.actual_duration or 0} minutos'
+        # Registrar el evento (se inserta al confirmar la transacción)
+        from apps.tasks.recorder import record_task_event
+        record_task_event(
+            self.task,
+            'session_cancelled',
+            f'Sesión cancelada después de {self.actual_duration or 0} minutos'
         )
     
+    @transaction.atomic
     def complete(self):
         """Completar la sesión y actualizar el estado de la tarea"""
         if self.status not in ['in_progress', 'paused']:
@@ -185,17 +266,7 @@ class PomodoroSession(models.Model):
         self.status = 'completed'
         self.ended_at = timezone.now()
         
-        # Actualizar el contador de pomodoros completados
-        if self.session_type == 'pomodoro':
-            self.task.completed_pomodoros += 1
-            
-            # Verificar si hemos alcanzado el estimado
-            if self.task.completed_pomodoros >= self.task.estimated_pomodoros:
-                self.task.status = 'completed'
-                self.task.completed_at = timezone.now()
-            
-            self.task.save(update_fields=['completed_pomodoros', 'status', 'completed_at'])
-        
+        # save() suma el pomodoro a la tarea y la completa al llegar al estimado
         self.save()
 
     def calculate_next_session_type(self):
@@ -203,14 +274,38 @@ class PomodoroSession(models.Model):
         if self.session_type != 'pomodoro':
             return 'pomodoro'
         
-        completed_pomodoros = PomodoroSession.objects.filter(
-            user=self.user,
-            session_type='pomodoro',
-            status='completed',
-            started_at__date=timezone.now().date()
-        ).count()
+        # Contador diario que mantiene apps.pomodoro.analytics al completar
+        # cada sesión: una búsqueda por (user, date) en lugar de contar sesiones
+        completed_pomodoros = PomodoroDailyStats.objects.filter(
+            user_id=self.user_id,
+            date=timezone.localdate()
+        ).values_list('pomodoros', flat=True).first() or 0
         
-        settings = self.user.pomodorosettings
+        settings = PomodoroSettings.objects.for_user(self.user_id)
         if completed_pomodoros % settings.pomodoros_until_long_break == 0:
             return 'long_break'
-        return 'short_break'
\ No newline at end of file
+        return 'short_break'
+
+
+class PomodoroDailyStats(models.Model):
+    """
+    Agregado diario de las sesiones terminadas de un usuario. Se mantiene
+    al terminar cada sesión (``apps.pomodoro.analytics``) y se reconstruye
+    con ``backfill_pomodoro_stats``.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='pomodoro_daily_stats')
+    date = models.DateField()
+    sessions = models.PositiveIntegerField(default=0)
+    pomodoros = models.PositiveIntegerField(default=0, help_text='Pomodoros completados')
+    focus_minutes = models.PositiveIntegerField(default=0, help_text='Minutos de pomodoros completados')
+    pauses = models.PositiveIntegerField(default=0)
+    interruptions = models.PositiveIntegerField(default=0)
+    total_pause_seconds = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_pomodoro_daily_stats')
+        ]
+
+    def __str__(self):
+        return f"Estadísticas Pomodoro de {self.user_id} ({self.date})"
@@ -1,3 +1,336 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.backends.utils import CursorWrapper
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.pomodoro.analytics import SERIES_FIELDS
+from apps.pomodoro.events import InProcessBroker, session_channel
+from apps.pomodoro.models import PomodoroDailyStats, PomodoroSession, PomodoroSettings
+from apps.pomodoro.views.api_pomodoro import PomodoroEventsView
+from apps.security.models import User
+from apps.tasks.models import Task
+
+
+class PomodoroDashboardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        PomodoroSettings.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def create_sessions(self, tasks):
+        for task in tasks:
+            for status in ('completed', 'completed', 'interrupted'):
+                PomodoroSession.objects.create(
+                    user=self.user,
+                    task=task,
+                    session_type='pomodoro',
+                    duration=25,
+                    status=status,
+                    pause_count=1,
+                    interruption_count=1 if status == 'interrupted' else 0
+                )
+
+    def get_dashboard(self, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(reverse('pomodoro:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_query_count_does_not_depend_on_tasks(self):
+        tasks = [Task.objects.create(title=f'Tarea {i}', user=self.user, estimated_pomodoros=4) for i in range(2)]
+        self.create_sessions(tasks)
+        # sesión y usuario, configuración, sesión activa, tareas, historial,
+        # el guardado de la sesión (SESSION_SAVE_EVERY_REQUEST) y las 3
+        # consultas de apps.tasks.stats (las sesiones nuevas invalidan la caché)
+        self.get_dashboard(12)
+
+        tasks += [Task.objects.create(title=f'Tarea {i}', user=self.user, estimated_pomodoros=4) for i in range(2, 10)]
+        self.create_sessions(tasks[2:])
+        # La configuración ya sale de la caché
+        response = self.get_dashboard(11)
+
+        stats = response.context['stats']
+        self.assertEqual(stats['completed_pomodoros'], 20)
+        self.assertEqual(stats['interruption_count'], 10)
+        self.assertEqual(stats['pause_count'], 30)
+        self.assertEqual(len(response.context['session_history']), 10)
+        self.assertEqual(len(response.context['today_sessions']), 30)
+
+        # Sin cambios, las estadísticas también salen de la caché
+        self.get_dashboard(8)
+
+
+class PomodoroEventsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        PomodoroSettings.objects.create(user=self.user)
+        self.task = Task.objects.create(title='Tarea', user=self.user, estimated_pomodoros=2)
+
+    async def test_in_process_broker_fans_out_across_threads(self):
+        broker = InProcessBroker()
+        first = await broker.subscribe('canal')
+        second = await broker.subscribe('canal')
+
+        publisher = threading.Thread(target=broker.publish, args=('canal', 'hola'))
+        publisher.start()
+        publisher.join()
+
+        self.assertEqual(await first.get(timeout=1), 'hola')
+        self.assertEqual(await second.get(timeout=1), 'hola')
+        self.assertIsNone(await first.get(timeout=0.01))
+
+        await first.close()
+        await second.close()
+        self.assertFalse(broker._subscriptions)
+
+    def test_actions_publish_session_state(self):
+        self.client.force_login(self.user)
+        session = PomodoroSession.objects.create(
+            user=self.user, task=self.task, session_type='pomodoro', duration=25
+        )
+        broker = mock.Mock()
+
+        with mock.patch('apps.pomodoro.events.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('pomodoro:pomodoro_api'),
+                    json.dumps({'action': 'pause', 'session_id': session.id}),
+                    content_type='application/json'
+                )
+
+        self.assertEqual(response.status_code, 200)
+        channel, message = broker.publish.call_args.args
+        self.assertEqual(channel, session_channel(self.user.pk))
+        self.assertEqual(json.loads(message)['session']['status'], 'paused')
+
+    def test_streams_refuse_wsgi_requests(self):
+        # Bajo WSGI la respuesta nunca enviaría nada y retendría un worker
+        self.client.force_login(self.user)
+        for name in ('pomodoro:pomodoro_events', 'notifications:notification_events'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 503)
+                self.assertNotIsInstance(response, StreamingHttpResponse)
+
+    async def test_stream_pushes_changes_without_queries(self):
+        broker = InProcessBroker()
+        await self.async_client.aforce_login(self.user)
+
+        with mock.patch('apps.pomodoro.views.api_pomodoro.get_broker', return_value=broker), \
+                mock.patch.object(PomodoroEventsView, 'heartbeat', 0.05):
+            response = await self.async_client.get(reverse('pomodoro:pomodoro_events'))
+            events = aiter(response.streaming_content)
+
+            initial = await anext(events)
+            self.assertIn(b'"session": null', initial)
+
+            # Entre cambios de estado no se toca la base de datos
+            no_queries = mock.patch.object(
+                CursorWrapper, 'execute', side_effect=AssertionError('consulta inesperada')
+            )
+            with no_queries:
+                broker.publish(session_channel(self.user.pk), json.dumps({'session': {'status': 'paused'}}))
+                pushed = await asyncio.wait_for(anext(events), timeout=1)
+                heartbeat = await anext(events)
+
+            # Desconexión del cliente: el servidor ASGI cancela la respuesta
+            pending = asyncio.ensure_future(anext(events))
+            await asyncio.sleep(0)
+            pending.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await pending
+
+        self.assertEqual(pushed, b'event: session\ndata: {"session": {"status": "paused"}}\n\n')
+        self.assertEqual(heartbeat, b': ping\n\n')
+        self.assertFalse(broker._subscriptions)
+
+
+class ActiveSessionConstraintTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        PomodoroSettings.objects.create(user=self.user)
+        self.task = Task.objects.create(title='Tarea', user=self.user, estimated_pomodoros=4)
+
+    def start(self, client=None):
+        return (client or self.client).post(
+            reverse('pomodoro:pomodoro_api'),
+            json.dumps({'action': 'start', 'task_id': self.task.id}),
+            content_type='application/json'
+        )
+
+    def test_constraint_rejects_second_active_session(self):
+        PomodoroSession.objects.create(user=self.user, task=self.task, session_type='pomodoro', duration=25)
+        with self.assertRaises(IntegrityError):
+            PomodoroSession.objects.create(
+                user=self.user, task=self.task, session_type='pomodoro', duration=25, status='paused'
+            )
+
+    def test_save_does_not_query_for_active_sessions(self):
+        session = PomodoroSession(user=self.user, task=self.task, session_type='pomodoro', duration=25)
+        with self.assertNumQueries(1):
+            session.save()
+
+    def test_check_then_insert_race_returns_conflict(self):
+        self.client.force_login(self.user)
+        # Ambas peticiones pasan la comprobación previa, como si llegaran a la vez
+        with mock.patch('apps.pomodoro.views.api_pomodoro.PomodoroAPIView.get_active_session', return_value=None):
+            first = self.start()
+            second = self.start()
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(second.json()['error'], 'Ya existe una sesión activa')
+
+    def test_parallel_starts_create_a_single_session(self):
+        workers = 8
+        barrier = threading.Barrier(workers)
+        responses = []
+
+        def start():
+            client = Client()
+            client.force_login(self.user)
+            barrier.wait()
+            try:
+                responses.append(self.start(client).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=start) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(responses), [200] + [400] * (workers - 1))
+        self.assertEqual(
+            PomodoroSession.objects.filter(user=self.user, status__in=['in_progress', 'paused']).count(),
+            1
+        )
+
+
+class PomodoroAnalyticsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        PomodoroSettings.objects.create(user=self.user)
+        self.task = Task.objects.create(title='Tarea', user=self.user, estimated_pomodoros=10)
+
+    def finish(self, action, pauses=0, interruptions=0):
+        session = PomodoroSession.objects.create(
+            user=self.user, task=self.task, session_type='pomodoro', duration=25
+        )
+        PomodoroSession.objects.filter(pk=session.pk).update(
+            started_at=timezone.now() - timedelta(minutes=26),
+            pause_count=pauses,
+            interruption_count=interruptions
+        )
+        session.refresh_from_db()
+        getattr(session, action)()
+        return session
+
+    def test_finished_sessions_update_daily_stats_once(self):
+        session = self.finish('complete', pauses=2)
+        self.finish('cancel', interruptions=1)
+        session.save()
+
+        stats = PomodoroDailyStats.objects.get(user=self.user, date=timezone.localdate())
+        self.assertEqual(
+            (stats.sessions, stats.pomodoros, stats.focus_minutes, stats.pauses, stats.interruptions),
+            (2, 1, 26, 2, 1)
+        )
+
+    def test_plain_saves_keep_service_markers(self):
+        stale = PomodoroSession.objects.create(
+            user=self.user, task=self.task, session_type='pomodoro', duration=25
+        )
+        session = PomodoroSession.objects.get(pk=stale.pk)
+        session.complete()
+
+        # Una instancia leída antes de terminar la sesión no borra las marcas
+        stale.notes = 'Sin distracciones'
+        stale.save()
+        markers = PomodoroSession.objects.values_list('counted_at', 'aggregated_at').get(pk=session.pk)
+        self.assertEqual(markers, (session.counted_at, session.aggregated_at))
+
+        # Instancia diferida: un único UPDATE, sin leer los campos que faltan
+        deferred = PomodoroSession.objects.only('user', 'status', 'notes').get(pk=session.pk)
+        deferred.notes = 'Revisada'
+        with CaptureQueriesContext(connection) as queries:
+            deferred.save()
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['UPDATE'])
+
+        # Guardar tras borrar con un queryset vuelve a insertar la fila
+        PomodoroSession.objects.filter(pk=session.pk).delete()
+        session.save()
+        self.assertTrue(PomodoroSession.objects.filter(pk=session.pk, status='completed').exists())
+
+    def test_backfill_matches_incremental_stats_and_api(self):
+        for action in ('complete', 'complete', 'cancel'):
+            self.finish(action)
+        incremental = list(PomodoroDailyStats.objects.values(*SERIES_FIELDS))
+
+        call_command('backfill_pomodoro_stats', stdout=io.StringIO())
+        self.assertEqual(list(PomodoroDailyStats.objects.values(*SERIES_FIELDS)), incremental)
+
+        self.client.force_login(self.user)
+        # sesión y usuario, una sola consulta de estadísticas y el guardado
+        # de la sesión (SESSION_SAVE_EVERY_REQUEST)
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('pomodoro:pomodoro_analytics'), {'range': 'month'})
+        data = response.json()
+        self.assertEqual(len(data['series']), 30)
+        self.assertEqual(data['series'][-1]['pomodoros'], 2)
+        self.assertEqual(data['totals']['focus_minutes'], 52)
+
+
+class PomodoroSettingsCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.task = Task.objects.create(title='Tarea', user=self.user, estimated_pomodoros=10)
+        self.client.force_login(self.user)
+
+    def complete_session(self, session=None):
+        session = session or PomodoroSession.objects.create(
+            user=self.user, task=self.task, session_type='pomodoro', duration=25
+        )
+        return self.client.post(
+            reverse('pomodoro:pomodoro_api'),
+            json.dumps({'action': 'complete', 'session_id': session.id}),
+            content_type='application/json'
+        )
+
+    def test_settings_are_cached_until_saved(self):
+        settings = PomodoroSettings.objects.for_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(PomodoroSettings.objects.for_user(self.user.pk).pk, settings.pk)
+
+        settings.pomodoros_until_long_break = 2
+        settings.save()
+        self.assertEqual(PomodoroSettings.objects.for_user(self.user.pk).pomodoros_until_long_break, 2)
+
+    def test_complete_costs_constant_queries(self):
+        PomodoroSettings.objects.for_user(self.user.pk, defaults={'pomodoros_until_long_break': 3})
+        self.complete_session()
+
+        next_types = []
+        for _ in range(4):
+            session = PomodoroSession.objects.create(
+                user=self.user, task=self.task, session_type='pomodoro', duration=25
+            )
+            # sesión, usuario, sesión Pomodoro con su tarea, las escrituras de
+            # la sesión, su contador (UPDATE y relectura) y su día, el
+            # contador diario, y el guardado de la sesión de Django
+            with self.assertNumQueries(19):
+                next_types.append(self.complete_session(session).json()['next_session_type'])
+
+        self.assertEqual(next_types, ['short_break', 'long_break', 'short_break', 'short_break'])
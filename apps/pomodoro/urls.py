@@ -1,5 +1,11 @@
 from django.urls import path
-from apps.pomodoro.views.api_pomodoro import PomodoroAPIView, PomodoroSessionView, PomodoroSettingsView
+from apps.pomodoro.views.api_pomodoro import (
+    PomodoroAPIView,
+    PomodoroAnalyticsView,
+    PomodoroEventsView,
+    PomodoroSessionView,
+    PomodoroSettingsView,
+)
 
 app_name = 'pomodoro'
 
@@ -9,6 +15,12 @@ urlpatterns = [
     # API para operaciones AJAX
     path('api/', PomodoroAPIView.as_view(), name='pomodoro_api'),
     
+    # Canal SSE con los cambios de estado de la sesión (requiere ASGI)
+    path('events/', PomodoroEventsView.as_view(), name='pomodoro_events'),
+    
+    # Series diarias de estadísticas (semana, mes, año)
+    path('analytics/', PomodoroAnalyticsView.as_view(), name='pomodoro_analytics'),
+    
     # Configuración del Pomodoro
     path('settings/', PomodoroSettingsView.as_view(), name='pomodoro_settings'),
 ]
\ No newline at end of file
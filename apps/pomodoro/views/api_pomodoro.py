@@ -1,17 +1,26 @@
 from django.views import View
 from django.views.generic import TemplateView
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.db import transaction
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 import json
 from datetime import timedelta
 
-from apps.pomodoro.models import PomodoroSession, PomodoroSettings
-from apps.tasks.models import Task, TaskEvent
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.pomodoro.analytics import RANGES, daily_series
+from apps.pomodoro.events import get_broker, publish_session_state, session_channel, stream_unavailable
+from apps.pomodoro.models import ACTIVE_SESSION_STATUSES, PomodoroSession, PomodoroSettings
+from apps.tasks.models import Task
+from apps.tasks.recorder import record_task_event
+from apps.tasks.stats import get_user_stats
+from apps.tasks.utils import day_window
 
 class PomodoroAPIView(LoginRequiredMixin, View):
     """Vista API mejorada para manejar operaciones AJAX de sesiones Pomodoro"""
@@ -20,9 +29,16 @@ class PomodoroAPIView(LoginRequiredMixin, View):
         """Obtener la sesión activa del usuario si existe"""
         return PomodoroSession.objects.filter(
             user=user,
-            status__in=['in_progress', 'paused']
+            status__in=ACTIVE_SESSION_STATUSES
         ).first()
     
+    def active_session_conflict(self, active_session):
+        """Respuesta cuando el usuario ya tiene una sesión activa"""
+        return JsonResponse({
+            'error': 'Ya existe una sesión activa',
+            'session_data': self.get_session_data(active_session) if active_session else None
+        }, status=400)
+
     def calculate_session_duration(self, session_type, settings):
         """Calcular la duración según el tipo de sesión y configuración"""
         duration_map = {
@@ -42,12 +58,10 @@ class PomodoroAPIView(LoginRequiredMixin, View):
         # Verificar si hay una sesión activa
         active_session = self.get_active_session(request.user)
         if active_session:
-            return JsonResponse({
-                'error': 'Ya existe una sesión activa',
-                'session_data': self.get_session_data(active_session)
-            }, status=400)
+            return self.active_session_conflict(active_session)
         
-        task = get_object_or_404(Task, id=task_id, user=request.user)
+        # Bloquear la fila de la tarea hasta el final de la transacción
+        task = get_object_or_404(Task.objects.select_for_update(), id=task_id, user=request.user)
         
         # Verificar si la tarea ya completó sus pomodoros estimados
         if session_type == 'pomodoro' and task.completed_pomodoros >= task.estimated_pomodoros:
@@ -56,22 +70,28 @@ class PomodoroAPIView(LoginRequiredMixin, View):
                 'completed': True
             }, status=400)
         
-        settings = request.user.pomodorosettings
+        settings = PomodoroSettings.objects.for_user(request.user.pk)
         duration = self.calculate_session_duration(session_type, settings)
         
-        session = PomodoroSession.objects.create(
-            user=request.user,
-            task=task,
-            session_type=session_type,
-            duration=duration,
-            status='in_progress',
-            background_audio_enabled=enable_audio
-        )
+        try:
+            # El savepoint permite seguir usando la transacción si otra
+            # petición creó la sesión activa entre la comprobación y el INSERT
+            with transaction.atomic():
+                session = PomodoroSession.objects.create(
+                    user=request.user,
+                    task=task,
+                    session_type=session_type,
+                    duration=duration,
+                    status='in_progress',
+                    background_audio_enabled=enable_audio
+                )
+        except IntegrityError:
+            return self.active_session_conflict(self.get_active_session(request.user))
         
         # Actualizar estado de la tarea
         if session_type == 'pomodoro' and task.status == 'pending':
             task.status = 'in_progress'
-            task.save(update_fields=['status'])
+            task.save(update_fields=['status', 'updated_at'])
         
         return JsonResponse(self.get_session_data(session))
 
@@ -88,11 +108,7 @@ class PomodoroAPIView(LoginRequiredMixin, View):
         session.last_pause_start = None
         session.save()
         
-        TaskEvent.objects.create(
-            task=session.task,
-            event_type='session_resumed',
-            description='Sesión reanudada'
-        )
+        record_task_event(session.task, 'session_resumed', 'Sesión reanudada')
         
         return JsonResponse(self.get_session_data(session))
 
@@ -137,53 +153,138 @@ class PomodoroAPIView(LoginRequiredMixin, View):
             session_id = data.get('session_id')
             
             if action == 'start':
-                return self.handle_start_session(request, data)
+                response = self.handle_start_session(request, data)
+                if response.status_code != 200:
+                    return response
+                return self.publish(request, response)
             
             # Para las demás acciones, necesitamos una sesión existente
             session = get_object_or_404(
-                PomodoroSession, 
+                PomodoroSession.objects.select_related('task'),
                 id=session_id, 
                 user=request.user
             )
             
             if action == 'pause':
                 session.pause()
-                return JsonResponse(self.get_session_data(session))
+                response_data = self.get_session_data(session)
                 
             elif action == 'resume':
-                return self.handle_resume_session(session)
+                return self.publish(request, self.handle_resume_session(session))
                 
             elif action == 'complete':
                 session.complete()
                 next_session_type = session.calculate_next_session_type()
                 response_data = self.get_session_data(session)
                 response_data['next_session_type'] = next_session_type
-                return JsonResponse(response_data)
                 
             elif action == 'cancel':
-                print("cancelamiento")
                 session.cancel()
-                return JsonResponse(self.get_session_data(session))
+                response_data = self.get_session_data(session)
                 
             elif action == 'interrupt':
                 session.interrupt()
-                return JsonResponse(self.get_session_data(session))
+                response_data = self.get_session_data(session)
+            
+            else:
+                return JsonResponse({'error': 'Acción no válida'}, status=400)
             
-            return JsonResponse({'error': 'Acción no válida'}, status=400)
+            publish_session_state(request.user.pk, response_data)
+            return JsonResponse(response_data)
             
         except ValidationError as e:
             return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': 'Error interno del servidor'}, status=500)
 
+    def publish(self, request, response):
+        """Publica en el canal de eventos el estado devuelto por ``response``"""
+        publish_session_state(request.user.pk, json.loads(response.content))
+        return response
+
+
+class PomodoroAnalyticsView(LoginRequiredMixin, View):
+    """
+    Serie diaria de tiempo de foco, pomodoros, pausas e interrupciones del
+    usuario para ``?range=week|month|year``, servida desde
+    ``PomodoroDailyStats`` (una fila por día, no por sesión).
+    """
+
+    def get(self, request, *args, **kwargs):
+        range_name = request.GET.get('range', 'week')
+        if range_name not in RANGES:
+            return JsonResponse({'error': 'Rango no válido'}, status=400)
+
+        data = daily_series(request.user, RANGES[range_name])
+        data['range'] = range_name
+        return JsonResponse(data, encoder=DjangoJSONEncoder)
+
+
+class PomodoroEventsView(View):
+    """
+    Canal SSE con el estado de la sesión Pomodoro del usuario. Envía el
+    estado actual al conectar y después solo los cambios publicados por
+    ``PomodoroAPIView`` (iniciar, pausar, reanudar, completar, cancelar,
+    interrumpir), sin consultar la base de datos entre cambios.
+
+    Cada conexión abierta mantiene vivo un generador, por lo que debe
+    servirse con un servidor ASGI.
+    """
+    heartbeat = 15
+
+    async def get(self, request, *args, **kwargs):
+        unavailable = stream_unavailable(request)
+        if unavailable:
+            return unavailable
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+
+        # Suscribirse antes de leer el estado para no perder cambios intermedios
+        subscription = await get_broker().subscribe(session_channel(user.pk))
+        try:
+            initial = await sync_to_async(self.get_initial_state)(user)
+        except Exception:
+            await subscription.close()
+            raise
+
+        response = StreamingHttpResponse(
+            self.stream(subscription, initial),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def get_initial_state(self, user):
+        session = PomodoroSession.objects.filter(
+            user=user,
+            status__in=['in_progress', 'paused']
+        ).select_related('task').first()
+        data = PomodoroAPIView().get_session_data(session) if session else None
+        return json.dumps({'session': data}, cls=DjangoJSONEncoder)
+
+    async def stream(self, subscription, initial):
+        try:
+            yield f'event: session\ndata: {initial}\n\n'
+            while True:
+                message = await subscription.get(timeout=self.heartbeat)
+                if message is None:
+                    # Comentario SSE para que los proxies no cierren la conexión
+                    yield ': ping\n\n'
+                else:
+                    yield f'event: session\ndata: {message}\n\n'
+        finally:
+            await subscription.close()
+
 class PomodoroSessionView(LoginRequiredMixin, TemplateView):
     """Vista mejorada para la interfaz de usuario del Pomodoro"""
     template_name = 'pomodoro/dashboard.html'
     
     def get_or_create_settings(self, user):
         """Get existing settings or create default ones"""
-        settings, created = PomodoroSettings.objects.get_or_create(
-            user=user,
+        return PomodoroSettings.objects.for_user(
+            user.pk,
             defaults={
                 'pomodoro_duration': 25,
                 'short_break_duration': 5,
@@ -193,12 +294,11 @@ class PomodoroSessionView(LoginRequiredMixin, TemplateView):
                 'auto_start_pomodoros': False
             }
         )
-        return settings
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
-        today = timezone.now().date()
+        today_start, tomorrow_start = day_window()
         
         settings = self.get_or_create_settings(user)
         
@@ -213,62 +313,59 @@ class PomodoroSessionView(LoginRequiredMixin, TemplateView):
             remaining_time = timedelta(minutes=active_session.duration) - elapsed_time
             context['remaining_minutes'] = max(int(remaining_time.total_seconds() / 60), 0)
         
-        # Obtener tareas pendientes priorizadas
-        pending_tasks = Task.objects.filter(
+        # Sesiones del día: una sola consulta para estadísticas e historial,
+        # con rangos sobre started_at para usar el índice (user, started_at)
+        today_sessions = PomodoroSession.objects.filter(
+            user=user,
+            started_at__gte=today_start,
+            started_at__lt=tomorrow_start
+        )
+        completed_today = Q(
+            pomodorosession__started_at__gte=today_start,
+            pomodorosession__started_at__lt=tomorrow_start,
+            pomodorosession__status='completed'
+        )
+
+        # Obtener tareas pendientes priorizadas con su tiempo de hoy agrupado
+        pending_tasks = list(Task.objects.filter(
             user=user,
             status__in=['pending', 'in_progress']
         ).exclude(
-            due_date__lt=today
-        ).select_related('category').order_by(
+            due_date__lt=today_start
+        ).select_related('category').annotate(
+            today_focus_time=Coalesce(
+                Sum('pomodorosession__actual_duration', filter=completed_today), 0
+            )
+        ).order_by(
             '-priority',
             'due_date',
             'created_at'
-        )[:10]
-        
-        # Obtener estadísticas del día
-        today_sessions = PomodoroSession.objects.filter(
-            user=user,
-            started_at__date=today
-        )
-        
-        completed_sessions = today_sessions.filter(
-            status='completed',
-            session_type='pomodoro'
-        )
-        
-        # Calcular estadísticas
-        stats = {
-            'completed_pomodoros': completed_sessions.count(),
-            'total_focus_time': sum(
-                session.actual_duration or 0 
-                for session in completed_sessions
-            ),
-            'interruption_count': today_sessions.filter(
-                interruption_count__gt=0
-            ).count(),
-            'pause_count': sum(
-                session.pause_count or 0
-                for session in today_sessions
-            )
-        }
-        
+        )[:10])
+
+        # Estadísticas del día desde la caché por usuario; tras completar una
+        # sesión el panel debe reflejarla, así que no se aceptan obsoletas
+        stats = get_user_stats(user, allow_stale=False)['pomodoro']
+
         # Obtener historial de sesiones organizadas por tarea
-        session_history = []
-        for task in pending_tasks:
-            task_sessions = today_sessions.filter(task=task).order_by('-started_at')
-            if task_sessions.exists():
-                session_history.append({
-                    'task': task,
-                    'sessions': task_sessions,
-                    'total_time': sum(
-                        session.actual_duration or 0 
-                        for session in task_sessions.filter(status='completed')
-                    )
-                })
+        sessions = list(today_sessions.select_related('task').order_by('-started_at'))
+        sessions_by_task = {}
+        for session in sessions:
+            sessions_by_task.setdefault(session.task_id, []).append(session)
+
+        session_history = [
+            {
+                'task': task,
+                'sessions': sessions_by_task[task.id],
+                'total_time': task.today_focus_time
+            }
+            for task in pending_tasks
+            if task.id in sessions_by_task
+        ]
         
         context.update({
             'active_session': active_session,
             'pending_tasks': pending_tasks,
+            'today_sessions': sessions,
             'session_history': session_history,
             'stats': stats,
             'settings': settings
@@ -283,11 +380,11 @@ class PomodoroSettingsView(LoginRequiredMixin, View):
     template_name = 'tasks/pomodoro_settings.html'
     
     def get(self, request, *args, **kwargs):
-        settings = request.user.pomodorosettings
+        settings = PomodoroSettings.objects.for_user(request.user.pk)
         return render(request, self.template_name, {'settings': settings})
     
     def post(self, request, *args, **kwargs):
-        settings = request.user.pomodorosettings
+        settings = PomodoroSettings.objects.for_user(request.user.pk)
         try:
             settings.pomodoro_duration = int(request.POST.get('pomodoro_duration'))
             settings.short_break_duration = int(request.POST.get('short_break_duration'))
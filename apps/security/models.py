@@ -1,11 +1,13 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as AuthUserManager
 from django.db import models
 import uuid
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.conf import settings
 
-class UserManager(models.Manager):
+from apps.tasks.assistance import OVERDUE_THRESHOLD, annotate_assistance, assess_tasks
+
+class UserManager(AuthUserManager):
     def get_active_users_with_pending_tasks(self):
         """Retorna usuarios activos con tareas pendientes que requieren atención"""
         return self.filter(
@@ -14,21 +16,15 @@ class UserManager(models.Manager):
             tasks__due_date__lte=timezone.now() + timezone.timedelta(days=1)
         ).distinct()
 
-    def get_users_needing_assistance(self):
-        """Identifica usuarios que pueden necesitar ayuda adicional"""
-        return self.filter(
-            is_active=True,
-            tasks__status='pending',
-            tasks__due_date__lt=timezone.now()
-        ).annotate(
-            overdue_tasks_count=models.Count(
-                'tasks',
-                filter=models.Q(
-                    tasks__status='pending',
-                    tasks__due_date__lt=timezone.now()
-                )
-            )
-        ).filter(overdue_tasks_count__gte=3)
+    def get_users_needing_assistance(self, now=None):
+        """
+        Identifica usuarios que pueden necesitar ayuda adicional. Cada
+        usuario queda anotado con los contadores de
+        ``apps.tasks.assistance`` (una sola consulta agrupada).
+        """
+        return annotate_assistance(
+            self.filter(is_active=True), now
+        ).filter(overdue_tasks__gte=OVERDUE_THRESHOLD)
 
 class User(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -149,6 +145,15 @@ class User(AbstractUser):
         null=True
     )
     
+    # Último envío de los resúmenes por correo (ver apps.tasks.digests)
+    last_daily_digest_at = models.DateTimeField(null=True, blank=True)
+    last_weekly_digest_at = models.DateTimeField(null=True, blank=True)
+
+    # Notificaciones entregadas sin leer (ver apps.notifications.inbox)
+    unread_notifications = models.PositiveIntegerField(default=0)
+
+    objects = UserManager()
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ['username']
     
@@ -191,21 +196,23 @@ class User(AbstractUser):
     
     def get_daily_task_summary(self):
         """Retorna un resumen de las tareas del día"""
-        today = timezone.now().date()
-        return {
-            'pending_tasks': self.tasks.filter(
+        from apps.tasks.utils import in_day
+        now = timezone.now()
+        today = timezone.localdate(now)
+        return self.tasks.aggregate(
+            pending_tasks=models.Count('id', filter=models.Q(
+                in_day('due_date', today),
+                status='pending'
+            )),
+            completed_tasks=models.Count('id', filter=models.Q(
+                in_day('completed_at', today),
+                status='completed'
+            )),
+            overdue_tasks=models.Count('id', filter=models.Q(
                 status='pending',
-                due_date__date=today
-            ).count(),
-            'completed_tasks': self.tasks.filter(
-                status='completed',
-                completed_at__date=today
-            ).count(),
-            'overdue_tasks': self.tasks.filter(
-                status='pending',
-                due_date__lt=timezone.now()
-            ).count()
-        }
+                due_date__lt=now
+            ))
+        )
 
     def get_accessibility_settings(self):
         """Retorna configuración de accesibilidad del usuario"""
@@ -232,8 +239,8 @@ class User(AbstractUser):
 
     def needs_assistance(self):
         """Determina si el usuario necesita asistencia adicional"""
-        overdue_tasks = self.tasks.filter(
-            status='pending',
-            due_date__lt=timezone.now()
-        ).count()
-        return overdue_tasks >= 3
\ No newline at end of file
+        return self.get_assistance()['needs_assistance']
+
+    def get_assistance(self):
+        """Evaluación completa de asistencia (contadores y razones) en una consulta"""
+        return assess_tasks(self.tasks.all())
@@ -1,3 +1,50 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.security.models import User
+from apps.tasks.assistance import evaluate_assistance
+from apps.tasks.models import Task
+
+
+class AssistanceEvaluationTests(TestCase):
+    def create_user(self, index, overdue=0, high_priority=0, completed=0):
+        user = User.objects.create(username=f'usuario{index}', email=f'usuario{index}@example.com')
+        past = timezone.now() - timedelta(days=1)
+        for i in range(overdue):
+            Task.objects.create(
+                title='Vencida', user=user, due_date=past,
+                priority=3 if i < high_priority else 2
+            )
+        for _ in range(completed):
+            Task.objects.create(title='Hecha', user=user, status='completed')
+        return user
+
+    def test_single_user_assessment_is_one_query(self):
+        user = self.create_user(1, overdue=3, high_priority=1, completed=1)
+
+        with self.assertNumQueries(1):
+            assistance = user.get_assistance()
+
+        self.assertTrue(assistance['needs_assistance'])
+        self.assertEqual(assistance['overdue_tasks'], 3)
+        self.assertEqual(assistance['high_priority_overdue'], 1)
+        self.assertEqual(assistance['task_completion_rate'], 25.0)
+        self.assertEqual(assistance['assistance_reasons'], [
+            'Tareas de alta prioridad vencidas',
+            'Múltiples tareas vencidas',
+            'Baja tasa de completitud de tareas',
+        ])
+
+    def test_batch_scoring_is_one_query(self):
+        needy = [self.create_user(i, overdue=3 + i) for i in range(5)]
+        for i in range(5, 10):
+            self.create_user(i, overdue=1, completed=2)
+
+        with self.assertNumQueries(1):
+            users = list(User.objects.get_users_needing_assistance())
 
-# Create your tests here.
+        self.assertCountEqual(users, needy)
+        for user in users:
+            self.assertTrue(evaluate_assistance(user)['needs_assistance'])
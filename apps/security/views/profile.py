@@ -3,13 +3,13 @@ from django.views.generic import UpdateView, DetailView, View, ListView
 from django.urls import reverse_lazy
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.utils import timezone
 from django.contrib import messages
 from django.core.exceptions import ValidationError
-from django.db.models import Q, Count, Sum
+from django.db.models import Q
 import json
 
 from apps.security.models import User
+from apps.tasks.stats import DAILY_SUMMARY_FIELDS, get_user_stats
 
 class UserProfileView(LoginRequiredMixin, DetailView):
     """Vista detallada del perfil de usuario con todas sus configuraciones y estadísticas"""
@@ -23,8 +23,9 @@ class UserProfileView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         user = self.object
         
-        # Obtener resumen de tareas
-        context['task_summary'] = user.get_daily_task_summary()
+        # Obtener resumen de tareas (caché de estadísticas)
+        stats = get_user_stats(user)
+        context['task_summary'] = {field: stats[field] for field in DAILY_SUMMARY_FIELDS}
         
         # Obtener configuraciones de accesibilidad
         context['accessibility_settings'] = user.get_accessibility_settings()
@@ -148,30 +149,15 @@ class TaskPreferencesView(LoginRequiredMixin, View):
 class DailyTaskSummaryView(LoginRequiredMixin, View):
     """Vista mejorada para obtener resumen detallado de tareas diarias"""
     def get(self, request):
-        user = request.user
-        today = timezone.now().date()
+        stats = get_user_stats(request.user)
         
         # Obtener resumen básico
-        summary = user.get_daily_task_summary()
+        summary = {field: stats[field] for field in DAILY_SUMMARY_FIELDS}
         
         # Añadir información adicional
-        tasks_by_priority = user.tasks.filter(
-            due_date__date=today
-        ).values('priority').annotate(
-            count=Count('id')
-        )
-        
         summary.update({
-            'tasks_by_priority': {
-                item['priority']: item['count'] 
-                for item in tasks_by_priority
-            },
-            'completed_pomodoros': user.tasks.filter(
-                status='completed',
-                completed_at__date=today
-            ).aggregate(
-                total=Sum('completed_pomodoros')
-            )['total'] or 0
+            'tasks_by_priority': stats['tasks_by_priority'],
+            'completed_pomodoros': stats['completed_pomodoros']
         })
         
         return JsonResponse(summary)
@@ -179,53 +165,8 @@ class DailyTaskSummaryView(LoginRequiredMixin, View):
 class UserNeedsAssistanceView(LoginRequiredMixin, View):
     """Vista mejorada para verificar necesidades de asistencia del usuario"""
     def get(self, request):
-        user = request.user
-        overdue_tasks = user.tasks.filter(
-            status='pending',
-            due_date__lt=timezone.now()
-        )
-        
-        high_priority_overdue = overdue_tasks.filter(priority=3).count()
-        needs_assistance = user.needs_assistance()
-        
-        response_data = {
-            'needs_assistance': needs_assistance,
-            'overdue_tasks': overdue_tasks.count(),
-            'high_priority_overdue': high_priority_overdue,
-            'task_completion_rate': self._calculate_completion_rate(user),
-            'assistance_reasons': self._get_assistance_reasons(user)
-        }
-        
-        return JsonResponse(response_data)
-    
-    def _calculate_completion_rate(self, user):
-        """Calcula la tasa de completitud de tareas del usuario"""
-        total_tasks = user.tasks.count()
-        if total_tasks == 0:
-            return 100
-        
-        completed_tasks = user.tasks.filter(status='completed').count()
-        return round((completed_tasks / total_tasks) * 100, 2)
-    
-    def _get_assistance_reasons(self, user):
-        """Determina las razones por las que el usuario podría necesitar asistencia"""
-        reasons = []
-        overdue_tasks = user.tasks.filter(
-            status='pending',
-            due_date__lt=timezone.now()
-        )
-        
-        if overdue_tasks.filter(priority=3).exists():
-            reasons.append('Tareas de alta prioridad vencidas')
-        
-        if overdue_tasks.count() >= 3:
-            reasons.append('Múltiples tareas vencidas')
-        
-        completion_rate = self._calculate_completion_rate(user)
-        if completion_rate < 50:
-            reasons.append('Baja tasa de completitud de tareas')
-            
-        return reasons
+        # Evaluación de apps.tasks.assistance, guardada en la caché de estadísticas
+        return JsonResponse(get_user_stats(request.user)['assistance'])
 
 class UserAjaxUpdateView(LoginRequiredMixin, View):
     """Vista mejorada para actualización AJAX del perfil de usuario"""
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.tasks'
+
+    def ready(self):
+        from apps.tasks import signals  # noqa: F401
+        from apps.tasks.search import ensure_index
+
+        connection_created.connect(ensure_index, dispatch_uid='tasks_fts_index')
@@ -0,0 +1,83 @@
+from django.db.models import Count, Q
+from django.utils import timezone
+
+# Umbrales de la evaluación de asistencia
+OVERDUE_THRESHOLD = 3
+LOW_COMPLETION_RATE = 50
+HIGH_PRIORITY = 3
+
+
+def assistance_counters(now=None, prefix=''):
+    """
+    Expresiones ``Count(filter=Q(...))`` de la evaluación de asistencia.
+
+    Args:
+        now: instante de referencia para las tareas vencidas
+        prefix: ruta hasta las tareas (``'tasks__'`` al anotar usuarios)
+
+    Returns:
+        dict: {nombre: expresión} para ``aggregate`` o ``annotate``
+    """
+    now = now or timezone.now()
+    overdue = Q(**{f'{prefix}status': 'pending', f'{prefix}due_date__lt': now})
+    return {
+        'overdue_tasks': Count(f'{prefix}id', filter=overdue),
+        'high_priority_overdue': Count(
+            f'{prefix}id', filter=overdue & Q(**{f'{prefix}priority': HIGH_PRIORITY})
+        ),
+        'total_tasks': Count(f'{prefix}id'),
+        'completed_total': Count(f'{prefix}id', filter=Q(**{f'{prefix}status': 'completed'})),
+    }
+
+
+def completion_rate(counts):
+    """Porcentaje de tareas completadas (100 si no hay tareas)"""
+    if not counts['total_tasks']:
+        return 100
+    return round(counts['completed_total'] / counts['total_tasks'] * 100, 2)
+
+
+def evaluate_assistance(counts):
+    """
+    Evalúa la necesidad de asistencia a partir de los contadores de
+    ``assistance_counters`` (un dict o un usuario anotado).
+
+    Returns:
+        dict: indicador, contadores, tasa de completitud y razones
+    """
+    if not isinstance(counts, dict):
+        counts = {name: getattr(counts, name) for name in ASSISTANCE_FIELDS}
+
+    rate = completion_rate(counts)
+    reasons = []
+    if counts['high_priority_overdue']:
+        reasons.append('Tareas de alta prioridad vencidas')
+    if counts['overdue_tasks'] >= OVERDUE_THRESHOLD:
+        reasons.append('Múltiples tareas vencidas')
+    if rate < LOW_COMPLETION_RATE:
+        reasons.append('Baja tasa de completitud de tareas')
+
+    return {
+        'needs_assistance': counts['overdue_tasks'] >= OVERDUE_THRESHOLD,
+        'overdue_tasks': counts['overdue_tasks'],
+        'high_priority_overdue': counts['high_priority_overdue'],
+        'task_completion_rate': rate,
+        'assistance_reasons': reasons,
+    }
+
+
+ASSISTANCE_FIELDS = tuple(assistance_counters())
+
+
+def assess_tasks(tasks, now=None):
+    """Evalúa un queryset de tareas (las de un usuario) en un solo ``aggregate``"""
+    return evaluate_assistance(tasks.aggregate(**assistance_counters(now)))
+
+
+def annotate_assistance(users, now=None):
+    """
+    Anota cada usuario de ``users`` con los contadores de asistencia en una
+    sola consulta agrupada, para evaluar miles de usuarios a la vez con
+    ``evaluate_assistance``.
+    """
+    return users.annotate(**assistance_counters(now, prefix='tasks__'))
@@ -0,0 +1,283 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.mail import build_email, mail_queue
+from apps.notifications.models import Notification
+from apps.tasks.models import Task, TaskCategory
+from apps.tasks.search import index_tasks
+from apps.tasks.stats import invalidate_user_stats
+from apps.tasks.tree import place_roots
+from apps.tasks.utils import build_task_notification
+
+MAX_OPERATIONS = getattr(settings, 'TASK_BULK_MAX_OPERATIONS', 500)
+# Filas por sentencia en bulk_create/bulk_update
+BULK_BATCH_SIZE = 500
+
+# Campos que aceptan ``create`` y ``update``
+EDITABLE_FIELDS = ('title', 'description', 'category', 'priority', 'status', 'due_date', 'estimated_pomodoros')
+TITLE_MAX_LENGTH = Task._meta.get_field('title').max_length
+PRIORITIES = dict(Task.PRIORITY_CHOICES)
+STATUSES = dict(Task.STATUS_CHOICES)
+
+
+class OperationError(Exception):
+    """Operación inválida del lote; su mensaje va en el resultado del elemento"""
+
+
+def parse_operations(data):
+    """
+    Valida el cuerpo ``{"operations": [...]}``.
+
+    Raises:
+        ValueError: sin lista de operaciones o con más de ``MAX_OPERATIONS``
+    """
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('Se requiere una lista de operaciones')
+    if len(operations) > MAX_OPERATIONS:
+        raise ValueError(f'El lote no puede superar {MAX_OPERATIONS} operaciones')
+    return operations
+
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def clean_status(value):
+    if not isinstance(value, str) or value not in STATUSES:
+        raise OperationError('Estado inválido')
+    return value
+
+
+def parse_due_date(value):
+    """Fecha ISO (``AAAA-MM-DDTHH:MM`` como los formularios); sin zona se toma la local"""
+    if value in (None, ''):
+        return None
+    try:
+        due_date = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise OperationError('Fecha de vencimiento inválida')
+    return timezone.make_aware(due_date) if timezone.is_naive(due_date) else due_date
+
+
+def clean_fields(data, categories, creating=False):
+    """
+    Valida los campos de un ``create`` o ``update``. Las categorías se
+    resuelven contra ``categories``, leídas antes para todo el lote.
+
+    Returns:
+        dict: {campo: valor} listo para asignar a la tarea
+    """
+    if not isinstance(data, dict):
+        raise OperationError('Se requiere un objeto data')
+    unknown = set(data) - set(EDITABLE_FIELDS)
+    if unknown:
+        raise OperationError(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+
+    values = {}
+    if creating or 'title' in data:
+        title = data.get('title')
+        if not isinstance(title, str) or not title.strip():
+            raise OperationError('El título es obligatorio')
+        if len(title) > TITLE_MAX_LENGTH:
+            raise OperationError(f'El título no puede superar {TITLE_MAX_LENGTH} caracteres')
+        values['title'] = title.strip()
+    if 'description' in data:
+        if not isinstance(data['description'], (str, type(None))):
+            raise OperationError('Descripción inválida')
+        values['description'] = data['description'] or ''
+    if 'category' in data:
+        if data['category'] in (None, ''):
+            values['category'] = None
+        elif is_int(data['category']) and data['category'] in categories:
+            values['category'] = categories[data['category']]
+        else:
+            raise OperationError('Categoría no encontrada')
+    if 'priority' in data:
+        if not is_int(data['priority']) or data['priority'] not in PRIORITIES:
+            raise OperationError('Prioridad inválida')
+        values['priority'] = data['priority']
+    if 'status' in data:
+        values['status'] = clean_status(data['status'])
+    if 'due_date' in data:
+        values['due_date'] = parse_due_date(data['due_date'])
+    if 'estimated_pomodoros' in data:
+        estimated = data['estimated_pomodoros']
+        if not is_int(estimated) or estimated < 1:
+            raise OperationError('El número de pomodoros debe ser al menos 1')
+        values['estimated_pomodoros'] = estimated
+    return values
+
+
+class BulkOperations:
+    """
+    Aplica un lote de operaciones sobre las tareas de ``user``:
+
+    - ``{"op": "create", "data": {...}}``
+    - ``{"op": "update", "id": N, "data": {...}}``
+    - ``{"op": "status", "id": N, "status": "..."}``
+    - ``{"op": "delete", "id": N}``
+
+    Las tareas y categorías referenciadas se leen con una consulta cada una,
+    filtradas por el dueño. Las operaciones se resuelven en memoria en orden
+    y se escriben juntas en una transacción: un ``bulk_create``, un
+    ``bulk_update`` y un DELETE. Una operación inválida solo falla ella.
+    Los efectos secundarios también van en bloque: los avisos de
+    vencimiento se recrean con un DELETE y un ``bulk_create``, el índice de
+    búsqueda con una sentencia y el usuario recibe un solo correo.
+    """
+
+    def __init__(self, user, operations, now=None):
+        self.user = user
+        self.operations = operations
+        self.now = now or timezone.now()
+        self.results = []
+        self.created = []
+        self.changed = {}
+        self.deleted = {}
+        self.fields = set()
+
+    def load(self):
+        """Tareas y categorías del lote que pertenecen al usuario"""
+        task_ids, category_ids = set(), set()
+        for operation in self.operations:
+            if not isinstance(operation, dict):
+                continue
+            if is_int(operation.get('id')):
+                task_ids.add(operation['id'])
+            data = operation.get('data')
+            if isinstance(data, dict) and is_int(data.get('category')):
+                category_ids.add(data['category'])
+        self.tasks = Task.objects.filter(user=self.user).in_bulk(task_ids) if task_ids else {}
+        self.categories = (
+            TaskCategory.objects.filter(user=self.user).in_bulk(category_ids) if category_ids else {}
+        )
+
+    def get_task(self, operation):
+        task_id = operation.get('id')
+        if not is_int(task_id):
+            raise OperationError('Se requiere el id de la tarea')
+        if task_id in self.deleted:
+            raise OperationError('La tarea se elimina en este mismo lote')
+        task = self.changed.get(task_id) or self.tasks.get(task_id)
+        if task is None:
+            raise OperationError('Tarea no encontrada')
+        return task
+
+    def assign(self, task, values):
+        for field, value in values.items():
+            setattr(task, field, value)
+        if values.get('status') == 'completed':
+            task.completed_at = self.now
+            self.fields.add('completed_at')
+        self.fields.update(values)
+
+    def resolve(self, operation):
+        """Aplica en memoria una operación y retorna su resultado"""
+        if not isinstance(operation, dict):
+            raise OperationError('Operación inválida')
+        op = operation.get('op')
+        if op == 'create':
+            task = Task(user=self.user, **clean_fields(operation.get('data'), self.categories, creating=True))
+            if task.status == 'completed':
+                task.completed_at = self.now
+            self.created.append(task)
+            # El id se conoce tras el bulk_create
+            return {'op': op, 'task': task}
+        if op == 'update':
+            task = self.get_task(operation)
+            self.assign(task, clean_fields(operation.get('data'), self.categories))
+        elif op == 'status':
+            task = self.get_task(operation)
+            self.assign(task, {'status': clean_status(operation.get('status'))})
+        elif op == 'delete':
+            task = self.get_task(operation)
+            self.changed.pop(task.pk, None)
+            self.deleted[task.pk] = task
+        else:
+            raise OperationError('Operación desconocida')
+        if op != 'delete':
+            self.changed[task.pk] = task
+        return {'op': op, 'id': task.pk}
+
+    def run(self):
+        """
+        Returns:
+            list: un resultado por operación (``status`` ok o error)
+        """
+        self.load()
+        for index, operation in enumerate(self.operations):
+            try:
+                result = {'index': index, 'status': 'ok', **self.resolve(operation)}
+            except OperationError as e:
+                result = {'index': index, 'status': 'error', 'error': str(e)}
+            self.results.append(result)
+
+        with transaction.atomic():
+            self.write()
+            transaction.on_commit(self.notify)
+
+        for result in self.results:
+            task = result.pop('task', None)
+            if task is not None:
+                result['id'] = task.pk
+        return self.results
+
+    def write(self):
+        if self.created:
+            Task.objects.bulk_create(self.created, batch_size=BULK_BATCH_SIZE)
+            place_roots([task.pk for task in self.created])
+
+        changed = list(self.changed.values())
+        if changed:
+            # bulk_update no aplica auto_now: updated_at alimenta los ETag del calendario
+            fields = self.fields | {'updated_at'}
+            for task in changed:
+                task.updated_at = self.now
+                # Como Task.save: el planificador debe volver a tomar la tarea
+                if task.reminded_at and task._reminder_schedule_changed():
+                    task.reminded_at = None
+                    fields.add('reminded_at')
+            Task.objects.bulk_update(changed, fields, batch_size=BULK_BATCH_SIZE)
+
+        if self.deleted:
+            Task.objects.filter(pk__in=self.deleted).delete()
+
+        self.schedule_due_notifications(changed)
+        index_tasks(self.created + [
+            task for task in changed if task.has_changed('title') or task.has_changed('description')
+        ])
+        for task in self.created + changed:
+            task._snapshot_tracked_fields()
+
+    def schedule_due_notifications(self, changed):
+        """Recrea los avisos ``task_due`` de las tareas cuyo vencimiento cambió"""
+        moved = [task for task in changed if task.has_changed('due_date')]
+        if moved:
+            Notification.objects.filter(task__in=moved, type='task_due').delete()
+        Notification.objects.bulk_create([
+            build_task_notification(self.user, task, 'task_due', scheduled_for=task.due_date)
+            for task in self.created + moved if task.due_date
+        ], batch_size=BULK_BATCH_SIZE)
+
+    def notify(self):
+        """Tras confirmar: estadísticas del usuario y un único correo con el resumen"""
+        invalidate_user_stats(self.user.pk)
+        if not self.user.email or not (self.created or self.changed or self.deleted):
+            return
+        context = {
+            'user': self.user,
+            'created': self.created,
+            'updated': list(self.changed.values()),
+            'deleted': len(self.deleted),
+        }
+        email = build_email('Tus tareas se actualizaron', 'email/tasks_bulk.html', context, [self.user.email])
+        mail_queue.enqueue(email)
+
+
+def apply_operations(user, operations, now=None):
+    """Aplica un lote de operaciones (ver ``BulkOperations``)"""
+    return BulkOperations(user, operations, now).run()
@@ -0,0 +1,78 @@
+import hashlib
+from datetime import date, timedelta
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from apps.tasks.models import Task
+from apps.tasks.serializers import serialize_row, task_values
+from apps.tasks.utils import start_of_day
+
+# Máximo de días por petición: un mes con las semanas que lo rodean en la
+# cuadrícula, con margen
+MAX_RANGE_DAYS = 62
+# Cambiarla invalida los ETag emitidos con una proyección anterior
+PROJECTION_VERSION = 1
+
+
+def parse_range(start, end):
+    """
+    Valida el rango ``[start, end)`` recibido como fechas ISO.
+
+    Returns:
+        tuple: (inicio, fin) como ``date``
+
+    Raises:
+        ValueError: fechas ausentes o inválidas, o rango vacío o demasiado largo
+    """
+    if not start or not end:
+        raise ValueError('Se requieren start y end (AAAA-MM-DD)')
+    start, end = date.fromisoformat(start), date.fromisoformat(end)
+    if end <= start:
+        raise ValueError('end debe ser posterior a start')
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f'El rango no puede superar {MAX_RANGE_DAYS} días')
+    return start, end
+
+
+def month_range(day):
+    """Primer día del mes de ``day`` y primer día del mes siguiente"""
+    start = day.replace(day=1)
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+def range_tasks(user_id, start, end):
+    """Tareas que vencen en los días locales ``[start, end)``, como rango sobre ``due_date``"""
+    return Task.objects.filter(
+        user_id=user_id,
+        due_date__gte=start_of_day(start),
+        due_date__lt=start_of_day(end)
+    )
+
+
+def range_etag(user_id, start, end):
+    """
+    ETag del rango: cambia si se crea, edita, mueve o borra una de sus
+    tareas (``updated_at`` máximo y número de tareas). Es una sola consulta
+    agregada, sin leer las filas.
+    """
+    state = range_tasks(user_id, start, end).aggregate(last=Max('updated_at'), count=Count('id'))
+    last = state['last'].isoformat() if state['last'] else ''
+    key = f"{PROJECTION_VERSION}:{user_id}:{start}:{end}:{last}:{state['count']}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def calendar_range(user_id, start, end):
+    """
+    Proyección compacta de las tareas del rango agrupadas por día local de
+    vencimiento.
+
+    Returns:
+        dict: inicio, fin y {día ISO: [tareas]} (solo días con tareas)
+    """
+    days = {}
+    rows = task_values(range_tasks(user_id, start, end), 'calendar').order_by('due_date', 'id')
+    for row in rows:
+        day = timezone.localdate(row['due_date']).isoformat()
+        days.setdefault(day, []).append(serialize_row(row, 'calendar'))
+    return {'start': start.isoformat(), 'end': end.isoformat(), 'days': days}
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest, Least
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+from apps.pomodoro.models import PomodoroSession
+from apps.tasks.models import Task
+from apps.tasks.stats import invalidate_user_stats
+
+# Columnas de la tarea devueltas tras modificar el contador
+COUNTER_FIELDS = ('completed_pomodoros', 'estimated_pomodoros', 'status', 'completed_at', 'user_id')
+
+
+def adjust_completed_pomodoros(task_id, delta, now=None, clamp_to_estimate=False, complete_task=False):
+    """
+    Suma ``delta`` a ``completed_pomodoros`` con un único UPDATE
+    (``F('completed_pomodoros') + delta``), sin leer antes el valor en Python,
+    así que los cambios concurrentes nunca se pisan. El resultado se acota a
+    0 y, con ``clamp_to_estimate``, a ``estimated_pomodoros``. Los valores
+    resultantes se releen en la misma transacción: el UPDATE mantiene la
+    fila bloqueada hasta el commit, así que son los que dejó esta llamada.
+
+    Con ``complete_task`` la misma sentencia marca la tarea como completada
+    al alcanzar el estimado.
+
+    Returns:
+        dict: valores de ``COUNTER_FIELDS`` tras el cambio, o None si la
+        tarea no existe
+    """
+    now = now or timezone.now()
+    value = F('completed_pomodoros') + delta
+    if clamp_to_estimate:
+        value = Least(value, F('estimated_pomodoros'))
+    value = Greatest(value, Value(0))
+
+    updates = {}
+    if complete_task:
+        # Van antes que el contador: MySQL evalúa las asignaciones en orden y
+        # las siguientes verían ya el valor nuevo
+        reached = GreaterThanOrEqual(value, F('estimated_pomodoros'))
+        updates['completed_at'] = Case(
+            When(Q(reached) & ~Q(status='completed'), then=Value(now)),
+            default=F('completed_at')
+        )
+        updates['status'] = Case(When(reached, then=Value('completed')), default=F('status'))
+    updates['completed_pomodoros'] = value
+    updates['updated_at'] = now
+
+    task = Task.objects.filter(pk=task_id)
+    with transaction.atomic(savepoint=False):
+        if not task.update(**updates):
+            return None
+        values = task.values(*COUNTER_FIELDS).get()
+    # ``update`` no emite post_save
+    invalidate_user_stats(values['user_id'])
+    return values
+
+
+def count_session_pomodoro(session, now=None):
+    """
+    Suma a su tarea el pomodoro de una sesión completada.
+
+    Es idempotente por sesión: ``counted_at`` se reclama con un UPDATE
+    condicionado en la misma transacción que el incremento, de modo que
+    guardar o completar varias veces la misma sesión, incluso desde
+    peticiones simultáneas, solo suma una vez.
+
+    Returns:
+        bool: True si esta llamada sumó el pomodoro
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        claimed = PomodoroSession.objects.filter(
+            pk=session.pk, counted_at__isnull=True
+        ).update(counted_at=now)
+        if not claimed:
+            return False
+        values = adjust_completed_pomodoros(session.task_id, 1, now=now, complete_task=True)
+
+    session.counted_at = now
+    if values and PomodoroSession.task.is_cached(session):
+        task = session.task
+        for field in ('completed_pomodoros', 'status', 'completed_at'):
+            setattr(task, field, values[field])
+        task._snapshot_tracked_fields(['completed_pomodoros', 'status'])
+    return True
@@ -0,0 +1,276 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from apps.core.mail import build_email
+from apps.tasks.models import Task
+from apps.tasks.reminders import ACTIVE_STATUSES
+from apps.tasks.utils import day_window, start_of_day
+
+logger = logging.getLogger(__name__)
+
+DAILY = 'daily'
+WEEKLY = 'weekly'
+
+# ``notification_frequency`` que recibe cada resumen
+DIGEST_FREQUENCIES = {
+    DAILY: ['high', 'medium'],
+    WEEKLY: ['low'],
+}
+DIGEST_SENT_FIELDS = {
+    DAILY: 'last_daily_digest_at',
+    WEEKLY: 'last_weekly_digest_at',
+}
+DIGEST_TEMPLATES = {
+    DAILY: 'email/daily_task_summary.html',
+    WEEKLY: 'email/weekly_task_summary.html',
+}
+
+DIGEST_BATCH_SIZE = getattr(settings, 'TASK_DIGEST_BATCH_SIZE', 500)
+# Máximo de tareas por sección del correo
+DIGEST_MAX_TASKS = getattr(settings, 'TASK_DIGEST_MAX_TASKS', 10)
+# Día de la semana del resumen semanal (0 = lunes)
+WEEKLY_DIGEST_WEEKDAY = getattr(settings, 'TASK_WEEKLY_DIGEST_WEEKDAY', 0)
+
+TASK_COLUMNS = (
+    'id', 'user_id', 'title', 'description', 'priority', 'status',
+    'due_date', 'completed_at', 'completed_pomodoros', 'estimated_pomodoros',
+)
+USER_COLUMNS = ('id', 'email', 'username', 'first_name')
+
+
+def digest_period(kind, now=None):
+    """
+    Calcula el día de envío de un resumen y el umbral de hora preferida.
+
+    El resumen diario sale hoy; el semanal, el último ``WEEKLY_DIGEST_WEEKDAY``.
+    Solo el propio día de envío exige haber llegado a
+    ``preferred_notification_time``: si el planificador se detuvo, los
+    resúmenes atrasados salen en la siguiente pasada.
+
+    Returns:
+        tuple: (día de envío, hora límite o None)
+    """
+    local_now = timezone.localtime(now or timezone.now())
+    today = local_now.date()
+    if kind == DAILY:
+        send_day = today
+    else:
+        send_day = today - timedelta(days=(today.weekday() - WEEKLY_DIGEST_WEEKDAY) % 7)
+    return send_day, local_now.time() if send_day == today else None
+
+
+def due_digest_users(kind, now=None):
+    """Usuarios que aún no recibieron el resumen ``kind`` del periodo actual"""
+    send_day, preferred_before = digest_period(kind, now)
+    sent_field = DIGEST_SENT_FIELDS[kind]
+    users = get_user_model().objects.filter(
+        Q(**{f'{sent_field}__isnull': True}) | Q(**{f'{sent_field}__lt': start_of_day(send_day)}),
+        is_active=True,
+        notification_frequency__in=DIGEST_FREQUENCIES[kind],
+    ).exclude(email='')
+    if preferred_before is not None:
+        users = users.filter(preferred_notification_time__lte=preferred_before)
+    return users.order_by('id')
+
+
+def claim_digest_users(kind, now=None, batch_size=DIGEST_BATCH_SIZE):
+    """
+    Reclama hasta ``batch_size`` usuarios marcando la fecha de envío del
+    resumen, igual que ``claim_due_reminders``: un usuario reclamado deja de
+    aparecer en ``due_digest_users``.
+
+    Returns:
+        list: ids de los usuarios reclamados por esta llamada
+    """
+    now = now or timezone.now()
+    sent_field = DIGEST_SENT_FIELDS[kind]
+    User = get_user_model()
+    with transaction.atomic():
+        candidates = due_digest_users(kind, now)
+        ids = list(candidates.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        updated = candidates.filter(id__in=ids).update(**{sent_field: now})
+        if updated != len(ids):
+            ids = list(User.objects.filter(
+                id__in=ids, **{sent_field: now}
+            ).values_list('id', flat=True))
+    return ids
+
+
+def release_digest_users(kind, user_ids):
+    """Devuelve a la cola usuarios cuyo resumen no se pudo enviar"""
+    get_user_model().objects.filter(id__in=user_ids).update(**{DIGEST_SENT_FIELDS[kind]: None})
+
+
+def tasks_by_user(queryset, user_ids, order_by, limit=DIGEST_MAX_TASKS):
+    """
+    Primeras ``limit`` tareas de cada usuario en una sola consulta,
+    numeradas con ``ROW_NUMBER() OVER (PARTITION BY user_id)``.
+
+    Returns:
+        dict: {user_id: [Task, ...]}
+    """
+    rows = queryset.filter(user_id__in=user_ids).only(*TASK_COLUMNS).annotate(
+        digest_row=Window(RowNumber(), partition_by=[F('user_id')], order_by=order_by)
+    ).filter(digest_row__lte=limit).order_by('user_id', 'digest_row')
+
+    grouped = {}
+    for task in rows:
+        grouped.setdefault(task.user_id, []).append(task)
+    return grouped
+
+
+def daily_counters(user_ids, now):
+    """
+    Contadores de ``User.get_daily_task_summary`` para todos los usuarios
+    del lote en una sola consulta agrupada.
+    """
+    today_start, tomorrow_start = day_window(timezone.localdate(now))
+    rows = Task.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        pending_tasks=Count('id', filter=Q(
+            status='pending', due_date__gte=today_start, due_date__lt=tomorrow_start
+        )),
+        completed_tasks=Count('id', filter=Q(
+            status='completed', completed_at__gte=today_start, completed_at__lt=tomorrow_start
+        )),
+        overdue_tasks=Count('id', filter=Q(status='pending', due_date__lt=now)),
+    ).order_by()
+    return {row.pop('user_id'): row for row in rows}
+
+
+def daily_contexts(users, now):
+    """Contextos del resumen diario: tareas de hoy, de la semana y contadores"""
+    user_ids = [user.pk for user in users]
+    today = timezone.localdate(now)
+    today_start, tomorrow_start = day_window(today)
+    active = Task.objects.filter(status__in=ACTIVE_STATUSES)
+
+    today_tasks = tasks_by_user(
+        active.filter(due_date__gte=today_start, due_date__lt=tomorrow_start),
+        user_ids, [F('due_date').asc(), F('id').asc()]
+    )
+    week_tasks = tasks_by_user(
+        active.filter(due_date__gte=tomorrow_start, due_date__lt=tomorrow_start + timedelta(days=7)),
+        user_ids, [F('due_date').asc(), F('id').asc()]
+    )
+    counters = daily_counters(user_ids, now)
+    empty = {'pending_tasks': 0, 'completed_tasks': 0, 'overdue_tasks': 0}
+
+    return [
+        (user, {
+            'today_date': today,
+            'today_tasks': today_tasks.get(user.pk, []),
+            'week_tasks': week_tasks.get(user.pk, []),
+            'summary': counters.get(user.pk, empty),
+        })
+        for user in users
+    ]
+
+
+def weekly_contexts(users, now):
+    """Contextos del resumen semanal: completadas en los últimos 7 días y pendientes"""
+    user_ids = [user.pk for user in users]
+    week_end = timezone.localdate(now)
+    week_start = week_end - timedelta(days=7)
+
+    completed_tasks = tasks_by_user(
+        Task.objects.filter(status='completed', completed_at__gte=start_of_day(week_start), completed_at__lt=now),
+        user_ids, [F('completed_at').desc(), F('id').desc()]
+    )
+    pending_tasks = tasks_by_user(
+        Task.objects.filter(status__in=ACTIVE_STATUSES),
+        user_ids, [F('due_date').asc(nulls_last=True), F('id').asc()]
+    )
+
+    counters = {
+        row.pop('user_id'): row
+        for row in Task.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            completed_tasks=Count('id', filter=Q(
+                status='completed', completed_at__gte=start_of_day(week_start), completed_at__lt=now
+            )),
+            pending_tasks=Count('id', filter=Q(status__in=ACTIVE_STATUSES)),
+        ).order_by()
+    }
+    empty = {'completed_tasks': 0, 'pending_tasks': 0}
+
+    return [
+        (user, {
+            'week_start': week_start,
+            'week_end': week_end,
+            'completed_tasks': completed_tasks.get(user.pk, []),
+            'pending_tasks': pending_tasks.get(user.pk, []),
+            'summary': counters.get(user.pk, empty),
+        })
+        for user in users
+    ]
+
+
+DIGEST_CONTEXTS = {
+    DAILY: daily_contexts,
+    WEEKLY: weekly_contexts,
+}
+DIGEST_SUBJECTS = {
+    DAILY: 'Tu resumen diario de tareas',
+    WEEKLY: 'Tu resumen semanal de tareas',
+}
+
+
+def build_digest_emails(kind, users, now):
+    """Renderiza los correos de resumen de un lote de usuarios"""
+    site_url = getattr(settings, 'SITE_URL', '')
+    messages = []
+    for user, context in DIGEST_CONTEXTS[kind](users, now):
+        context.update({'user': user, 'site_url': site_url})
+        messages.append(build_email(
+            DIGEST_SUBJECTS[kind],
+            DIGEST_TEMPLATES[kind],
+            context,
+            [user.email]
+        ))
+    return messages
+
+
+def dispatch_digests(kind, now=None, batch_size=DIGEST_BATCH_SIZE, connection=None):
+    """
+    Envía el resumen ``kind`` a todos los usuarios pendientes, por lotes de
+    ``batch_size``. Cada lote se resuelve con unas pocas consultas agrupadas
+    (usuarios, tareas y contadores), se renderiza y se envía por una única
+    conexión de correo reutilizada durante toda la pasada. Solo un lote vive
+    en memoria a la vez.
+
+    Returns:
+        int: número de resúmenes enviados
+    """
+    now = now or timezone.now()
+    connection = connection or get_connection()
+    User = get_user_model()
+    sent = 0
+    # Abrir explícitamente evita que el backend abra y cierre una conexión
+    # por cada llamada a ``send_messages``
+    connection.open()
+    try:
+        while True:
+            user_ids = claim_digest_users(kind, now=now, batch_size=batch_size)
+            if not user_ids:
+                return sent
+
+            users = list(User.objects.filter(id__in=user_ids).only(*USER_COLUMNS).order_by('id'))
+            try:
+                messages = build_digest_emails(kind, users, now)
+                connection.send_messages(messages)
+            except Exception:
+                logger.exception('Error enviando %s resúmenes (%s)', len(user_ids), kind)
+                release_digest_users(kind, user_ids)
+                return sent
+            sent += len(messages)
+    finally:
+        connection.close()
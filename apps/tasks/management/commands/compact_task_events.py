@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.tasks.retention import COMPACTION_BATCH_SIZE, RETENTION_DAYS, compact_task_events
+
+
+class Command(BaseCommand):
+    help = 'Compacta los eventos de tareas antiguos en conteos diarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=RETENTION_DAYS,
+            help='Días de eventos que se conservan sin compactar'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=COMPACTION_BATCH_SIZE,
+            help='Número de eventos compactados por lote'
+        )
+
+    def handle(self, *args, **options):
+        result = compact_task_events(retention_days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(
+            f"{result['compacted']} eventos compactados, {result['purged']} conteos diarios purgados"
+        )
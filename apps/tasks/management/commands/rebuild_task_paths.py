@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.tasks.tree import rebuild_paths
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las rutas materializadas de los árboles de subtareas'
+
+    def handle(self, *args, **options):
+        total = rebuild_paths()
+        self.stdout.write(self.style.SUCCESS(f'Rutas recalculadas para {total} tareas'))
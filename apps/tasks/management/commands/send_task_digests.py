@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.tasks.digests import DAILY, DIGEST_BATCH_SIZE, WEEKLY, dispatch_digests
+
+
+class Command(BaseCommand):
+    help = 'Envía los resúmenes diarios y semanales de tareas pendientes de envío'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind',
+            choices=[DAILY, WEEKLY],
+            action='append',
+            help='Tipo de resumen a enviar (por defecto ambos)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DIGEST_BATCH_SIZE,
+            help='Número de usuarios procesados por lote'
+        )
+
+    def handle(self, *args, **options):
+        for kind in options['kind'] or [DAILY, WEEKLY]:
+            sent = dispatch_digests(kind, batch_size=options['batch_size'])
+            self.stdout.write(f'{sent} resúmenes ({kind}) enviados')
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.tasks.reminders import REMINDER_BATCH_SIZE, dispatch_due_reminders
+
+
+class Command(BaseCommand):
+    help = 'Envía los recordatorios de tareas pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=REMINDER_BATCH_SIZE,
+            help='Número de recordatorios reclamados por lote'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Seguir consultando la cola en lugar de hacer una sola pasada'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=30,
+            help='Segundos de espera entre pasadas con --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = dispatch_due_reminders(batch_size=options['batch_size'])
+            if sent:
+                self.stdout.write(f'{sent} recordatorios enviados')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
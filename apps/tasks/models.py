@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 
@@ -12,6 +12,20 @@ class TaskCategory(models.Model):
     class Meta:
         verbose_name_plural = "Task Categories"
 
+class MaterializedPathField(models.CharField):
+    """
+    Ruta materializada de una tarea. Solo la escriben los UPDATE de
+    apps.tasks.tree: en el UPDATE de ``Model.save`` la columna se asigna a
+    sí misma, así que una instancia leída antes de mover un ancestro no
+    restaura su ruta anterior.
+    """
+
+    def pre_save(self, model_instance, add):
+        if add:
+            return super().pre_save(model_instance, add)
+        return models.F(self.attname)
+
+
 class Task(models.Model):
     PRIORITY_CHOICES = [
         (1, 'Baja'),
@@ -31,6 +45,8 @@ class Task(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tasks')
     category = models.ForeignKey(TaskCategory, on_delete=models.SET_NULL, null=True)
     parent_task = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True)
+    # Ruta materializada de ids ("12/57/301/"), mantenida por ``save`` (ver apps.tasks.tree)
+    path = MaterializedPathField(max_length=1024, blank=True, default='', editable=False)
     priority = models.IntegerField(choices=PRIORITY_CHOICES, default=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     due_date = models.DateTimeField(null=True, blank=True)
@@ -42,24 +58,120 @@ class Task(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     reminded_at = models.DateTimeField(null=True, blank=True)
     
-    def save(self, *args, **kwargs):
-        # Verificar si es una nueva tarea o si se modificó reminder_time
-        is_new = self._state.adding
-        if not is_new:
-            old_task = Task.objects.get(pk=self.pk)
-            reminder_time_changed = old_task.reminder_time != self.reminder_time
+    # Campos cuyo valor original se conserva al cargar desde la base de datos:
+    # todos menos los que escriben Django (``updated_at``, ``created_at``) o
+    # apps.tasks.tree (``path``)
+    TRACKED_FIELDS = (
+        'reminder_time', 'due_date', 'status', 'completed_pomodoros',
+        'title', 'description', 'user_id', 'parent_task_id',
+        'category_id', 'priority', 'estimated_pomodoros', 'completed_at', 'reminded_at',
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value
+            for name, value in zip(field_names, values)
+            if name in cls.TRACKED_FIELDS and value is not models.DEFERRED
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_tracked_fields(fields)
+
+    def _snapshot_tracked_fields(self, fields=None):
+        """Toma los valores actuales como originales tras leer o guardar"""
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for name in self.TRACKED_FIELDS:
+            if (fields is None or name in fields) and name in self.__dict__:
+                loaded[name] = self.__dict__[name]
+
+    def has_changed(self, field):
+        """
+        Indica si ``field`` cambió desde que se cargó la instancia. Si no se
+        conoce el valor original (campo diferido o instancia creada a mano)
+        se asume que cambió.
+        """
+        loaded = self.__dict__.get('_loaded_values', {})
+        if field not in loaded:
+            return True
+        return loaded[field] != getattr(self, field)
+
+    def get_dirty_fields(self):
+        """Retorna los campos rastreados que cambiaron desde la carga"""
+        return [name for name in self.TRACKED_FIELDS if self.has_changed(name)]
+
+    def save(self, *args, skip_if_unchanged=False, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if skip_if_unchanged and self._is_unchanged(update_fields, kwargs):
+            # Nada que escribir: sin UPDATE ni señales, el updated_at (y los
+            # ETag) se conservan. Solo para quien sabe que la fila sigue
+            # existiendo: una borrada no se vuelve a insertar
+            return
+
+        if self.pk is None:
+            # Guardada otra vez tras ``delete()``: la fila nueva aún no tiene ruta
+            self.path = ''
+
+        deferred = self.get_deferred_fields()
+        if update_fields is None and deferred and self.pk is not None:
+            # Como Model.save con campos diferidos: solo se escriben los
+            # cargados, y las comprobaciones siguientes no leen el resto
+            update_fields = kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+            ]
+
+        # Si cambió reminder_time o due_date, el planificador de recordatorios
+        # (apps.tasks.reminders) debe volver a tomar la tarea. Un reminded_at
+        # diferido se limpia sin leerlo
+        reminded = 'reminded_at' in deferred or self.reminded_at
+        if not self._state.adding and reminded and self._reminder_schedule_changed(update_fields):
+            self.reminded_at = None
+            if update_fields is not None:
+                update_fields = kwargs['update_fields'] = {*update_fields, 'reminded_at'}
+
+        if self._parent_changed(update_fields):
+            from apps.tasks.tree import parent_path, place
+
+            # La ruta depende del id, así que se asigna tras guardar
+            with transaction.atomic():
+                parent = parent_path(self)
+                super().save(*args, **kwargs)
+                place(self, parent)
         else:
-            reminder_time_changed = False
+            super().save(*args, **kwargs)
+        self._snapshot_tracked_fields(update_fields)
+
+    def _is_unchanged(self, update_fields, kwargs):
+        """
+        Indica si un ``save()`` completo de una tarea ya guardada no cambiaría
+        nada: se conocen los valores originales de todos los campos
+        rastreados y ninguno cambió.
+        """
+        if self._state.adding or self.pk is None or update_fields is not None:
+            return False
+        if kwargs.get('force_insert') or kwargs.get('force_update'):
+            return False
+        return not self.get_dirty_fields()
 
-        super().save(*args, **kwargs)
+    def _parent_changed(self, update_fields=None):
+        """Indica si hay que asignar o recalcular la ruta materializada"""
+        if self._state.adding or self.pk is None:
+            return True
+        if update_fields is not None and not {'parent_task', 'parent_task_id'} & set(update_fields):
+            return False
+        return self.has_changed('parent_task_id')
 
-        # Programar recordatorio si es necesario
-        if (is_new or reminder_time_changed) and self.reminder_time and self.reminder_time > timezone.now():
-            from apps.tasks.views.task_view import send_task_reminder
-            send_task_reminder.apply_async(
-                args=[self.id],
-                eta=self.reminder_time
-            )
+    def _reminder_schedule_changed(self, update_fields=None):
+        """Indica si se modificaron los campos que determinan el recordatorio"""
+        return any(
+            self.has_changed(field)
+            for field in ('reminder_time', 'due_date')
+            if update_fields is None or field in update_fields
+        )
         
     def handle_session_pause(self, session):
         """
@@ -68,17 +180,16 @@ class Task(models.Model):
         Args:
             session: PomodoroSession instance that was paused
         """
+        from apps.tasks.recorder import record_task_event
+
         # Only update task status if this is an active task
         if self.status == 'in_progress':
-            # Keep track of the pause in task metadata
-            self.updated_at = timezone.now()
-            self.save(update_fields=['updated_at'])
-            
-            # You might want to create a TaskEvent to track this pause
-            TaskEvent.objects.create(
-                task=self,
-                event_type='session_paused',
-                description=f'Sesión de pomodoro pausada después de {session.actual_duration or 0} minutos'
+            # Solo el evento, al confirmar: pausar no cambia ningún campo de
+            # la tarea, así que su updated_at (y los ETag) no se tocan
+            record_task_event(
+                self,
+                'session_paused',
+                f'Sesión de pomodoro pausada después de {session.actual_duration or 0} minutos'
             )
 
     def handle_session_cancellation(self, session):
@@ -94,15 +205,17 @@ class Task(models.Model):
         ).exclude(id=session.id).exists()
         
         if not active_sessions and self.status == 'in_progress':
+            from apps.tasks.recorder import record_task_event
+
             self.status = 'pending'
             self.updated_at = timezone.now()
             self.save(update_fields=['status', 'updated_at'])
             
             # Create a task event to track this cancellation
-            TaskEvent.objects.create(
-                task=self,
-                event_type='session_cancelled',
-                description=f'Sesión de pomodoro cancelada después de {session.actual_duration or 0} minutos'
+            record_task_event(
+                self,
+                'session_cancelled',
+                f'Sesión de pomodoro cancelada después de {session.actual_duration or 0} minutos'
             )
 
     def handle_session_interruption(self, session):
@@ -112,20 +225,22 @@ class Task(models.Model):
         Args:
             session: PomodoroSession instance that was interrupted
         """
-        self.updated_at = timezone.now()
-        self.save(update_fields=['updated_at'])
-        
+        from apps.tasks.recorder import record_task_event
+
         # Create a task event to track this interruption
-        TaskEvent.objects.create(
-            task=self,
-            event_type='session_interrupted',
-            description=f'Sesión de pomodoro interrumpida'
-        )
+        record_task_event(self, 'session_interrupted', 'Sesión de pomodoro interrumpida')
     
     class Meta:
         indexes = [
             # ... (índices existentes) ...
             models.Index(fields=['status', 'due_date', 'reminded_at']),
+            models.Index(fields=['status', 'reminder_time', 'reminded_at']),
+            # Accesos por usuario (ver QueryPlanTests): calendario, vencidas y
+            # tareas del día por fecha; listados por estado y antigüedad
+            models.Index(fields=['user', 'due_date'], name='task_user_due_date_idx'),
+            models.Index(fields=['user', 'status', 'created_at'], name='task_user_status_created_idx'),
+            # Subárboles por rango de ruta (apps.tasks.tree)
+            models.Index(fields=['user', 'path'], name='task_user_path_idx'),
         ]
 
 class TaskEvent(models.Model):
@@ -145,7 +260,66 @@ class TaskEvent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        ordering = ['-created_at']
+        # Sin ordering por defecto: el historial ordena explícitamente y la
+        # compactación (apps.tasks.retention) recorre lotes sin ordenar
+        indexes = [
+            models.Index(fields=['task', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+
+
+class TaskEventRollup(models.Model):
+    """Conteo diario de eventos de una tarea, compactado desde ``TaskEvent``"""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='event_rollups')
+    day = models.DateField()
+    event_type = models.CharField(max_length=50, choices=TaskEvent.EVENT_TYPES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'day', 'event_type'], name='unique_task_event_rollup')
+        ]
         indexes = [
-            models.Index(fields=['task', 'event_type', 'created_at'])
+            models.Index(fields=['day']),
         ]
+
+
+class FullTextMatch(models.Lookup):
+    """``campo MATCH expresión`` sobre una tabla virtual FTS5"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class FullTextField(models.TextField):
+    """Columna oculta con el nombre de la tabla FTS5, usada para ``MATCH``"""
+
+
+FullTextField.register_lookup(FullTextMatch)
+
+
+class TaskSearchEntry(models.Model):
+    """
+    Fila del índice FTS5 de tareas (tabla virtual ``tasks_task_fts``).
+    La tabla se crea y mantiene desde ``apps.tasks.search``.
+    """
+    task = models.OneToOneField(
+        Task,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_entry'
+    )
+    owner = models.CharField(max_length=32)
+    title = models.TextField()
+    description = models.TextField()
+    document = FullTextField(db_column='tasks_task_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'tasks_task_fts'
@@ -0,0 +1,96 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import F, Q
+
+# Campos por los que se permite ordenar el listado y sobre los que se
+# construye el cursor. El ``id`` siempre actúa como desempate.
+KEYSET_FIELDS = {
+    'created_at': datetime,
+    'updated_at': datetime,
+    'due_date': datetime,
+    'priority': int,
+    'title': str,
+    # Anotación de ``apps.tasks.search.search_tasks`` (bm25, menor es mejor)
+    'relevance': float,
+}
+NULLABLE_FIELDS = {'due_date'}
+DEFAULT_ORDER = '-created_at'
+RELEVANCE_ORDER = 'relevance'
+
+
+class InvalidCursor(ValueError):
+    """El cursor recibido no es válido para el ordenamiento solicitado"""
+
+
+def parse_order(order_by, default=DEFAULT_ORDER):
+    """
+    Normaliza el parámetro ``order_by`` a una tupla ``(campo, descendente)``.
+    Los valores desconocidos vuelven al ordenamiento ``default``. La
+    relevancia solo es válida cuando se pasa como ``default`` (hay búsqueda).
+    """
+    order_by = order_by or default
+    descending = order_by.startswith('-')
+    field = order_by.lstrip('-')
+    if field not in KEYSET_FIELDS or (field == 'relevance' and default != RELEVANCE_ORDER):
+        return parse_order(default)
+    return field, descending
+
+
+def order_expressions(field, descending):
+    """Expresiones de ``order_by`` estables (campo + id) para el keyset"""
+    if field in NULLABLE_FIELDS:
+        column = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+    else:
+        column = f'-{field}' if descending else field
+    return [column, '-id' if descending else 'id']
+
+
+def encode_cursor(field, descending, value, pk):
+    """Genera un cursor opaco a partir de la última fila entregada"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([field, descending, value, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field, descending):
+    """
+    Decodifica un cursor y valida que corresponda al ordenamiento actual.
+
+    Returns:
+        tuple: (valor del campo, id) de la última fila de la página anterior
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_field, cursor_desc, value, pk = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_field != field or cursor_desc != descending:
+            raise InvalidCursor('El cursor no corresponde al ordenamiento solicitado')
+        caster = KEYSET_FIELDS[field]
+        if value is not None:
+            value = datetime.fromisoformat(value) if caster is datetime else caster(value)
+        return value, int(pk)
+    except InvalidCursor:
+        raise
+    except (TypeError, ValueError, KeyError):
+        raise InvalidCursor('Cursor inválido')
+
+
+def apply_keyset(queryset, field, descending, value, pk):
+    """
+    Filtra ``queryset`` para devolver solo las filas posteriores a
+    ``(value, pk)`` según el ordenamiento de ``order_expressions``.
+    """
+    after = 'lt' if descending else 'gt'
+    tie = Q(**{field: value, f'id__{after}': pk})
+
+    if field in NULLABLE_FIELDS:
+        # Los nulos van siempre al final: dentro de ellos solo desempata el id
+        if value is None:
+            return queryset.filter(**{f'{field}__isnull': True, f'id__{after}': pk})
+        return queryset.filter(
+            Q(**{f'{field}__{after}': value}) | tie | Q(**{f'{field}__isnull': True})
+        )
+
+    return queryset.filter(Q(**{f'{field}__{after}': value}) | tie)
@@ -0,0 +1,96 @@
+import threading
+import weakref
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from apps.tasks.models import Task, TaskEvent
+from apps.tasks.stats import invalidate_user_stats
+
+_local = threading.local()
+
+
+class EventBuffer:
+    """
+    ``TaskEvent`` pendientes de una transacción y tareas cuyo ``updated_at``
+    hay que tocar. Se vuelcan juntos al confirmarse la transacción.
+    """
+
+    def __init__(self, using, key=None):
+        self.using = using
+        self.key = key
+        self.events = []
+        self.touched = set()
+        self.owners = set()
+        # True mientras ``flush`` espera al commit en ``on_commit``
+        self.registered = False
+
+    def register(self):
+        """Programa ``flush`` para el commit de la transacción en curso"""
+        transaction.on_commit(self.flush, using=self.using)
+        self.registered = True
+
+    def add(self, task, event_type, description, touch=False):
+        self.events.append(TaskEvent(task=task, event_type=event_type, description=description))
+        if touch:
+            self.touched.add(task.pk)
+        self.owners.add(task.user_id)
+
+    def flush(self):
+        """Un ``bulk_create`` con los eventos y un UPDATE con las tareas tocadas"""
+        self.registered = False
+        _buffers().pop(self.key, None)
+        if not self.events:
+            return
+        with transaction.atomic(using=self.using):
+            TaskEvent.objects.using(self.using).bulk_create(self.events)
+            if self.touched:
+                Task.objects.using(self.using).filter(pk__in=self.touched).update(updated_at=timezone.now())
+        # ``bulk_create`` y ``update`` no emiten post_save
+        for user_id in self.owners:
+            invalidate_user_stats(user_id)
+
+
+def _buffers():
+    """
+    Buffers de las transacciones en curso del hilo. Las entradas son
+    débiles: la única referencia fuerte a un buffer es su ``flush`` en
+    ``on_commit``, así que cuando un rollback descarta el callback el buffer
+    desaparece también de aquí.
+    """
+    if not hasattr(_local, 'buffers'):
+        _local.buffers = weakref.WeakValueDictionary()
+    return _local.buffers
+
+
+def current_buffer(using=DEFAULT_DB_ALIAS):
+    """
+    Buffer de la transacción en curso. Se asocia a la pila de savepoints
+    activa: si un savepoint se revierte, Django descarta su ``on_commit`` y
+    con él los eventos registrados dentro.
+    """
+    connection = connections[using]
+    key = (using, tuple(connection.savepoint_ids))
+    buffer = _buffers().get(key)
+    if buffer is None or not buffer.registered:
+        buffer = _buffers()[key] = EventBuffer(using, key)
+        buffer.register()
+    return buffer
+
+
+def record_task_event(task, event_type, description, touch=False, using=DEFAULT_DB_ALIAS):
+    """
+    Registra un ``TaskEvent`` de ``task``; con ``touch`` además actualiza
+    ``updated_at`` de la tarea.
+
+    Dentro de una transacción los eventos se acumulan y se escriben al
+    confirmarla: un único ``bulk_create`` y un único UPDATE para todas las
+    tareas tocadas, sea cual sea el número de eventos. Fuera de una
+    transacción se escriben en el momento.
+    """
+    if not connections[using].in_atomic_block:
+        buffer = EventBuffer(using)
+        buffer.add(task, event_type, description, touch)
+        buffer.flush()
+        return
+    current_buffer(using).add(task, event_type, description, touch)
@@ -0,0 +1,136 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.core.mail import build_email
+from apps.tasks.models import Task
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ['pending', 'in_progress']
+REMINDER_BATCH_SIZE = getattr(settings, 'TASK_REMINDER_BATCH_SIZE', 500)
+REMINDER_LEAD_TIME = timedelta(hours=getattr(settings, 'TASK_REMINDER_LEAD_HOURS', 24))
+
+
+def due_reminders(now=None):
+    """
+    Consultas de tareas con recordatorio pendiente. Cada una recorre un
+    índice ``(status, <fecha>, reminded_at)``:
+
+    - sin ``reminder_time``: la tarea vence dentro de ``REMINDER_LEAD_TIME``
+    - con ``reminder_time``: la hora del recordatorio ya llegó
+
+    Las tareas de usuarios sin correo no se reclaman: no hay a quién
+    enviarles el recordatorio.
+
+    Returns:
+        list: querysets de ids ordenados por su fecha de disparo
+    """
+    now = now or timezone.now()
+    pending = Task.objects.filter(status__in=ACTIVE_STATUSES, reminded_at__isnull=True).exclude(user__email='')
+    return [
+        pending.filter(
+            reminder_time__isnull=True,
+            due_date__gte=now,
+            due_date__lte=now + REMINDER_LEAD_TIME
+        ).order_by('due_date').values_list('id', flat=True),
+        pending.filter(
+            reminder_time__gte=now - REMINDER_LEAD_TIME,
+            reminder_time__lte=now
+        ).order_by('reminder_time').values_list('id', flat=True),
+    ]
+
+
+def claim_due_reminders(now=None, batch_size=REMINDER_BATCH_SIZE):
+    """
+    Reclama hasta ``batch_size`` recordatorios marcando ``reminded_at``.
+    Una tarea reclamada no vuelve a aparecer en ``due_reminders``, por lo
+    que varios planificadores en paralelo nunca envían el mismo recordatorio.
+
+    Returns:
+        list: ids de las tareas reclamadas por esta llamada
+    """
+    now = now or timezone.now()
+    claimed = []
+    with transaction.atomic():
+        for candidates in due_reminders(now):
+            remaining = batch_size - len(claimed)
+            if remaining <= 0:
+                break
+            if connection.features.has_select_for_update_skip_locked:
+                # Las filas bloqueadas por otro planificador se saltan
+                ids = list(candidates.select_for_update(skip_locked=True)[:remaining])
+                Task.objects.filter(id__in=ids).update(reminded_at=now)
+            else:
+                # Sin SKIP LOCKED (SQLite) el UPDATE solo toma filas aún libres;
+                # si otro planificador se adelantó, se releen las propias
+                ids = list(candidates[:remaining])
+                updated = Task.objects.filter(
+                    id__in=ids, reminded_at__isnull=True
+                ).update(reminded_at=now)
+                if updated != len(ids):
+                    ids = list(Task.objects.filter(
+                        id__in=ids, reminded_at=now
+                    ).values_list('id', flat=True))
+            claimed.extend(ids)
+    return claimed
+
+
+def release_reminders(task_ids):
+    """Devuelve a la cola recordatorios reclamados que no se pudieron enviar"""
+    Task.objects.filter(id__in=task_ids).update(reminded_at=None)
+
+
+def build_reminder_email(task, now=None):
+    """Construye el correo de recordatorio de una tarea"""
+    now = now or timezone.now()
+    hours_remaining = (task.due_date - now).total_seconds() / 3600 if task.due_date else 0
+    context = {
+        'user': task.user,
+        'task': task,
+        'hours_remaining': max(hours_remaining, 0),
+        'site_url': getattr(settings, 'SITE_URL', ''),
+    }
+    return build_email(
+        f'Recordatorio de tarea: {task.title}',
+        'email/task_due_reminder.html',
+        context,
+        [task.user.email]
+    )
+
+
+def send_reminder_emails(tasks):
+    """
+    Sender por defecto: envía los recordatorios de un lote por una sola
+    conexión SMTP.
+    """
+    get_connection().send_messages([build_reminder_email(task) for task in tasks])
+
+
+def dispatch_due_reminders(sender=send_reminder_emails, now=None, batch_size=REMINDER_BATCH_SIZE):
+    """
+    Reclama recordatorios vencidos por lotes y los entrega a ``sender``,
+    un callable que recibe la lista de tareas del lote. Si el sender falla,
+    el lote se libera para reintentarlo en la siguiente pasada.
+
+    Returns:
+        int: número de recordatorios entregados
+    """
+    sent = 0
+    while True:
+        task_ids = claim_due_reminders(now=now, batch_size=batch_size)
+        if not task_ids:
+            return sent
+
+        tasks = list(Task.objects.filter(id__in=task_ids).select_related('user', 'category'))
+        try:
+            sender(tasks)
+        except Exception:
+            logger.exception('Error enviando %s recordatorios de tareas', len(task_ids))
+            release_reminders(task_ids)
+            return sent
+        sent += len(tasks)
@@ -0,0 +1,168 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.tasks.models import TaskEvent, TaskEventRollup
+from apps.tasks.utils import start_of_day
+
+logger = logging.getLogger(__name__)
+
+# Días de eventos que se conservan en crudo
+RETENTION_DAYS = getattr(settings, 'TASK_EVENT_RETENTION_DAYS', 90)
+# Días de conteos diarios que se conservan (None para no purgarlos)
+ROLLUP_RETENTION_DAYS = getattr(settings, 'TASK_EVENT_ROLLUP_RETENTION_DAYS', 730)
+COMPACTION_BATCH_SIZE = getattr(settings, 'TASK_EVENT_COMPACTION_BATCH_SIZE', 5000)
+
+
+def retention_cutoff(now=None, retention_days=RETENTION_DAYS):
+    """
+    Inicio del primer día que se conserva en crudo. Se alinea al inicio del
+    día local para que cada día quede entero en una de las dos tablas.
+    """
+    return start_of_day(timezone.localdate(now) - timedelta(days=retention_days))
+
+
+def daily_counts(events):
+    """
+    Conteos de ``events`` agrupados por tarea, día local y tipo.
+
+    Returns:
+        dict: {(task_id, día, event_type): conteo}
+    """
+    rows = events.annotate(day=TruncDate('created_at')).values(
+        'task_id', 'day', 'event_type'
+    ).annotate(count=Count('id')).order_by()
+    return {(row['task_id'], row['day'], row['event_type']): row['count'] for row in rows}
+
+
+def merge_into_rollup(counts):
+    """
+    Suma ``counts`` a las filas de ``TaskEventRollup``, creando las que
+    falten. Si otra compactación crea alguna de esas filas entre la lectura
+    y el INSERT, la restricción única lo rechaza y los conteos nuevos se
+    vuelven a sumar, esta vez a las filas ya existentes.
+    """
+    task_ids = {task_id for task_id, _, _ in counts}
+    days = {day for _, day, _ in counts}
+    existing = {
+        (rollup.task_id, rollup.day, rollup.event_type): rollup
+        for rollup in TaskEventRollup.objects.select_for_update().filter(task_id__in=task_ids, day__in=days)
+    }
+
+    updated, created = [], []
+    for key, count in counts.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            task_id, day, event_type = key
+            created.append(TaskEventRollup(task_id=task_id, day=day, event_type=event_type, count=count))
+        else:
+            rollup.count += count
+            updated.append(rollup)
+
+    TaskEventRollup.objects.bulk_update(updated, ['count'])
+    if not created:
+        return
+    try:
+        with transaction.atomic():
+            TaskEventRollup.objects.bulk_create(created)
+    except IntegrityError:
+        merge_into_rollup({
+            (rollup.task_id, rollup.day, rollup.event_type): rollup.count for rollup in created
+        })
+
+
+def compact_batch(cutoff, batch_size=COMPACTION_BATCH_SIZE):
+    """
+    Compacta hasta ``batch_size`` eventos anteriores a ``cutoff``: suma sus
+    conteos al rollup y los borra, todo en una transacción.
+
+    Returns:
+        int: eventos compactados
+    """
+    with transaction.atomic():
+        candidates = TaskEvent.objects.filter(created_at__lt=cutoff).order_by().values_list('id', flat=True)
+        if connection.features.has_select_for_update_skip_locked:
+            # Dos compactaciones en paralelo no toman los mismos eventos
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates[:batch_size])
+        if not ids:
+            return 0
+
+        batch = TaskEvent.objects.filter(id__in=ids)
+        merge_into_rollup(daily_counts(batch))
+        # Sin relaciones dependientes ni receptores de borrado, ``delete()``
+        # es un único DELETE que no carga el lote
+        batch.delete()
+    return len(ids)
+
+
+def compact_task_events(now=None, retention_days=RETENTION_DAYS, batch_size=COMPACTION_BATCH_SIZE):
+    """
+    Compacta por lotes los eventos con más de ``retention_days`` días y
+    purga los conteos diarios con más de ``ROLLUP_RETENTION_DAYS``. Cada
+    lote es una transacción corta, así que la tabla de eventos no queda
+    bloqueada durante toda la pasada.
+
+    Returns:
+        dict: eventos compactados y conteos diarios purgados
+    """
+    cutoff = retention_cutoff(now, retention_days)
+    compacted = 0
+    while True:
+        count = compact_batch(cutoff, batch_size)
+        compacted += count
+        if count < batch_size:
+            break
+
+    purged = 0
+    if ROLLUP_RETENTION_DAYS is not None:
+        oldest_day = timezone.localdate(now) - timedelta(days=ROLLUP_RETENTION_DAYS)
+        # Sin señales ni relaciones dependientes, ``delete()`` ya es un único DELETE
+        purged, _ = TaskEventRollup.objects.filter(day__lt=oldest_day).delete()
+
+    logger.info('%s eventos de tareas compactados, %s conteos diarios purgados', compacted, purged)
+    return {'compacted': compacted, 'purged': purged}
+
+
+def task_event_history(task_id, start=None, end=None):
+    """
+    Conteos diarios de eventos de una tarea entre ``start`` y ``end``
+    (fechas, ambos incluidos), sumando el rollup y los eventos aún en crudo.
+    Un día a medio compactar aparece una sola vez con el total correcto.
+
+    Returns:
+        list: [{'day', 'event_type', 'count'}] ordenados por día y tipo
+    """
+    rollups = TaskEventRollup.objects.filter(task_id=task_id)
+    events = TaskEvent.objects.filter(task_id=task_id)
+    if start is not None:
+        rollups = rollups.filter(day__gte=start)
+        events = events.filter(created_at__gte=start_of_day(start))
+    if end is not None:
+        rollups = rollups.filter(day__lte=end)
+        events = events.filter(created_at__lt=start_of_day(end + timedelta(days=1)))
+
+    totals = {}
+    for day, event_type, count in rollups.values_list('day', 'event_type', 'count'):
+        totals[day, event_type] = totals.get((day, event_type), 0) + count
+    for (_, day, event_type), count in daily_counts(events).items():
+        totals[day, event_type] = totals.get((day, event_type), 0) + count
+
+    return [
+        {'day': day, 'event_type': event_type, 'count': count}
+        for (day, event_type), count in sorted(totals.items())
+    ]
+
+
+def recent_task_events(task_id, limit=50):
+    """Últimos eventos en crudo de una tarea (índice ``(task, created_at)``)"""
+    return list(
+        TaskEvent.objects.filter(task_id=task_id)
+        .order_by('-created_at', '-id')
+        .values('event_type', 'description', 'created_at')[:limit]
+    )
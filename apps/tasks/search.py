@@ -0,0 +1,127 @@
+import re
+
+from django.db import DatabaseError, connections
+from django.db.models import F, FloatField, Q, Value
+
+FTS_TABLE = 'tasks_task_fts'
+
+CREATE_FTS_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "owner, title, description, "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available(using='default'):
+    """Indica si la base de datos soporta el índice FTS5 de tareas"""
+    connection = connections[using]
+    return connection.vendor == 'sqlite' and getattr(connection, 'task_fts_ready', False)
+
+
+def ensure_index(sender=None, connection=None, **kwargs):
+    """
+    Crea la tabla virtual FTS5 si no existe. Se conecta a
+    ``connection_created`` para que cada conexión SQLite la tenga disponible.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_FTS_TABLE)
+        connection.task_fts_ready = True
+    except DatabaseError:
+        # SQLite compilado sin FTS5: se usa la búsqueda por LIKE
+        connection.task_fts_ready = False
+
+
+def build_match_expression(user_id, text):
+    """
+    Convierte el texto del buscador en una expresión MATCH de FTS5 con
+    coincidencia por prefijo de cada término, restringida al usuario.
+
+    Returns:
+        str | None: expresión MATCH, o None si el texto no tiene términos
+    """
+    terms = TOKEN_RE.findall(text)
+    if not terms:
+        return None
+    phrases = ' '.join(f'"{term}"*' for term in terms)
+    return f'owner:{user_id.hex} AND {{title description}}: ({phrases})'
+
+
+def search_tasks(queryset, user, text, using='default'):
+    """
+    Filtra ``queryset`` a las tareas de ``user`` que coinciden con ``text``
+    y anota ``relevance`` (bm25, menor es mejor).
+
+    Si FTS5 no está disponible se recurre a ``icontains`` y ``relevance``
+    vale 0 para todas las filas.
+    """
+    if not fts_available(using):
+        return queryset.filter(
+            Q(title__icontains=text) |
+            Q(description__icontains=text)
+        ).annotate(relevance=Value(0.0, output_field=FloatField()))
+
+    expression = build_match_expression(user.pk, text)
+    if expression is None:
+        return queryset.annotate(relevance=Value(0.0, output_field=FloatField()))
+
+    # INNER JOIN con la tabla FTS5: el ranking se calcula una sola vez por fila
+    return queryset.filter(
+        search_entry__document__match=expression
+    ).annotate(relevance=F('search_entry__rank'))
+
+
+def index_task(task, using='default'):
+    """Inserta o reemplaza la entrada de ``task`` en el índice"""
+    if not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {FTS_TABLE}(rowid, owner, title, description) '
+            'VALUES (%s, %s, %s, %s)',
+            [task.pk, task.user_id.hex, task.title, task.description or '']
+        )
+
+
+def index_tasks(tasks, using='default'):
+    """Inserta o reemplaza las entradas de varias tareas con una sola sentencia preparada"""
+    if not tasks or not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {FTS_TABLE}(rowid, owner, title, description) '
+            'VALUES (%s, %s, %s, %s)',
+            [(task.pk, task.user_id.hex, task.title, task.description or '') for task in tasks]
+        )
+
+
+def unindex_task(task_id, using='default'):
+    """Elimina la entrada de una tarea del índice"""
+    if not fts_available(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [task_id])
+
+
+def rebuild_index(using='default'):
+    """
+    Reconstruye el índice completo desde ``tasks_task`` en una sola sentencia
+    y lo compacta al terminar.
+
+    Returns:
+        int: número de tareas indexadas
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        cursor.execute(CREATE_FTS_TABLE)
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, owner, title, description) '
+            'SELECT id, user_id, title, description FROM tasks_task'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
@@ -0,0 +1,142 @@
+from apps.tasks.models import Task
+
+# Tablas de etiquetas construidas una sola vez al importar el módulo
+PRIORITY_LABELS = dict(Task.PRIORITY_CHOICES)
+STATUS_LABELS = dict(Task.STATUS_CHOICES)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _category(row):
+    return {
+        'id': row['category_id'],
+        'name': row['category__name'],
+        'color': row['category__color'],
+    }
+
+
+def _list_row(row):
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'description': row['description'],
+        'category': _category(row),
+        'priority': PRIORITY_LABELS.get(row['priority']),
+        'status': STATUS_LABELS.get(row['status']),
+        'due_date': _iso(row['due_date']),
+        'reminder_time': _iso(row['reminder_time']),
+        'estimated_pomodoros': row['estimated_pomodoros'],
+        'completed_pomodoros': row['completed_pomodoros'],
+        'created_at': row['created_at'].isoformat(),
+        'updated_at': row['updated_at'].isoformat(),
+        'completed_at': _iso(row['completed_at']),
+    }
+
+
+def _detail_row(row):
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'description': row['description'],
+        'category': _category(row),
+        'priority': row['priority'],
+        'status': row['status'],
+        'due_date': _iso(row['due_date']),
+        'estimated_pomodoros': row['estimated_pomodoros'],
+        'completed_pomodoros': row['completed_pomodoros'],
+    }
+
+
+def _summary_row(row):
+    due_date = row['due_date']
+    return {
+        'title': row['title'],
+        'description': row['description'],
+        'category': row['category__name'] or 'Sin categoría',
+        'priority': PRIORITY_LABELS.get(row['priority'], row['priority']),
+        'status': row['status'],
+        'due_date': due_date.strftime('%Y-%m-%d %H:%M:%S') if due_date else None,
+        'estimated_pomodoros': row['estimated_pomodoros'],
+    }
+
+
+def _calendar_row(row):
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'category': row['category_id'],
+        'priority': row['priority'],
+        'status': row['status'],
+        'due_date': _iso(row['due_date']),
+        'reminder_time': _iso(row['reminder_time']),
+    }
+
+
+# Conjunto de campos -> (columnas para ``.values()``, función de serialización)
+FIELD_SETS = {
+    'list': (
+        (
+            'id', 'title', 'description', 'category_id', 'category__name', 'category__color',
+            'priority', 'status', 'due_date', 'reminder_time', 'estimated_pomodoros',
+            'completed_pomodoros', 'created_at', 'updated_at', 'completed_at',
+        ),
+        _list_row,
+    ),
+    'detail': (
+        (
+            'id', 'title', 'description', 'category_id', 'category__name', 'category__color',
+            'priority', 'status', 'due_date', 'estimated_pomodoros', 'completed_pomodoros',
+        ),
+        _detail_row,
+    ),
+    'summary': (
+        (
+            'title', 'description', 'category__name', 'priority', 'status', 'due_date',
+            'estimated_pomodoros',
+        ),
+        _summary_row,
+    ),
+    # Proyección por día de ``apps.tasks.calendar`` (la descripción no se muestra)
+    'calendar': (
+        ('id', 'title', 'category_id', 'priority', 'status', 'due_date', 'reminder_time'),
+        _calendar_row,
+    ),
+}
+
+
+def task_values(queryset, field_set='list'):
+    """
+    Limita ``queryset`` a las columnas que necesita ``field_set`` y devuelve
+    diccionarios en lugar de instancias del modelo.
+    """
+    columns, _ = FIELD_SETS[field_set]
+    return queryset.values(*columns)
+
+
+def serialize_row(row, field_set='list'):
+    """Serializa una fila obtenida con ``task_values``"""
+    return FIELD_SETS[field_set][1](row)
+
+
+def serialize_rows(rows, field_set='list'):
+    """Serializa un iterable de filas obtenido con ``task_values``"""
+    to_dict = FIELD_SETS[field_set][1]
+    return [to_dict(row) for row in rows]
+
+
+def serialize_task(task, field_set='list'):
+    """
+    Serializa una instancia ya cargada de ``Task`` con el mismo formato que
+    sus filas equivalentes.
+    """
+    columns, to_dict = FIELD_SETS[field_set]
+    category = task.category if task.category_id else None
+    row = {}
+    for column in columns:
+        if column.startswith('category__'):
+            row[column] = getattr(category, column[len('category__'):]) if category else None
+        else:
+            row[column] = getattr(task, column)
+    return to_dict(row)
@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.pomodoro.models import PomodoroSession
+from apps.tasks.models import Task, TaskEvent
+from apps.tasks.search import index_task, unindex_task
+from apps.tasks.stats import invalidate_user_stats
+
+SEARCH_FIELDS = {'title', 'description', 'user', 'user_id'}
+
+
+@receiver(post_save, sender=Task)
+def sync_task_search_index(sender, instance, created=False, update_fields=None, using='default', **kwargs):
+    """Mantiene el índice de búsqueda al crear o editar una tarea"""
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    fields = ('title', 'description', 'user_id')
+    if update_fields is not None:
+        # Solo los campos guardados: los demás pueden estar diferidos
+        fields = [field for field in fields if {field, field.removesuffix('_id')} & set(update_fields)]
+    if not created and not any(instance.has_changed(field) for field in fields):
+        return
+    index_task(instance, using=using)
+
+
+@receiver(post_delete, sender=Task)
+def remove_task_from_search_index(sender, instance, using='default', **kwargs):
+    """Quita la tarea eliminada del índice de búsqueda"""
+    unindex_task(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=PomodoroSession)
+@receiver(post_delete, sender=PomodoroSession)
+def invalidate_owner_stats(sender, instance, **kwargs):
+    """Invalida las estadísticas cacheadas del dueño de la tarea o sesión"""
+    invalidate_user_stats(instance.user_id)
+    if isinstance(instance, Task) and instance.has_changed('user_id'):
+        # Tarea reasignada: también cambian los contadores del dueño anterior
+        previous_owner = getattr(instance, '_loaded_values', {}).get('user_id')
+        if previous_owner:
+            invalidate_user_stats(previous_owner)
+
+
+@receiver(post_save, sender=TaskEvent)
+def invalidate_event_owner_stats(sender, instance, **kwargs):
+    """
+    Invalida las estadísticas del dueño de la tarea del evento. No escucha
+    post_delete: los eventos solo se borran en cascada con su tarea (ya lo
+    cubre el post_delete de ``Task``) o al compactarlos, que no cambia las
+    estadísticas, y sin receptores ``delete()`` es un único DELETE.
+    """
+    if TaskEvent.task.is_cached(instance):
+        user_id = instance.task.user_id
+    else:
+        user_id = Task.objects.filter(pk=instance.task_id).values_list('user_id', flat=True).first()
+    if user_id:
+        invalidate_user_stats(user_id)
@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.pomodoro.models import PomodoroSession
+from apps.tasks.assistance import assistance_counters, evaluate_assistance
+from apps.tasks.models import Task
+from apps.tasks.utils import day_window
+
+logger = logging.getLogger(__name__)
+
+STATS_KEY = 'user-stats:v2:{}'
+INVALIDATED_KEY = 'user-stats:{}:invalidated'
+REFRESH_LOCK_KEY = 'user-stats:{}:refreshing'
+
+# Contadores de ``User.get_daily_task_summary``
+DAILY_SUMMARY_FIELDS = ('pending_tasks', 'completed_tasks', 'overdue_tasks')
+
+
+def stats_settings():
+    """Configuración de la caché, leída en cada llamada para respetar ``override_settings``"""
+    return {
+        'timeout': getattr(settings, 'USER_STATS_CACHE_TIMEOUT', 3600),
+        'max_age': getattr(settings, 'USER_STATS_MAX_AGE', 300),
+        'stale_while_revalidate': getattr(settings, 'USER_STATS_STALE_WHILE_REVALIDATE', True),
+    }
+
+
+def compute_user_stats(user_id, now=None):
+    """
+    Calcula los contadores de un usuario: una consulta agregada sobre sus
+    tareas, una agrupada por prioridad y una sobre las sesiones Pomodoro
+    del día.
+
+    Returns:
+        dict: estadísticas serializables a JSON
+    """
+    now = now or timezone.now()
+    today_start, tomorrow_start = day_window(timezone.localdate(now))
+    due_today = Q(due_date__gte=today_start, due_date__lt=tomorrow_start)
+    completed_today = Q(status='completed', completed_at__gte=today_start, completed_at__lt=tomorrow_start)
+
+    tasks = Task.objects.filter(user_id=user_id)
+    stats = tasks.aggregate(
+        pending_tasks=Count('id', filter=Q(due_today, status='pending')),
+        completed_tasks=Count('id', filter=completed_today),
+        completed_pomodoros=Coalesce(Sum('completed_pomodoros', filter=completed_today), 0),
+        **assistance_counters(now)
+    )
+    stats['assistance'] = evaluate_assistance(stats)
+    stats['completion_rate'] = stats['assistance']['task_completion_rate']
+    stats['tasks_by_priority'] = dict(
+        tasks.filter(due_today).values_list('priority').annotate(count=Count('id')).order_by()
+    )
+
+    completed_pomodoro = Q(status='completed', session_type='pomodoro')
+    stats['pomodoro'] = PomodoroSession.objects.filter(
+        user_id=user_id,
+        started_at__gte=today_start,
+        started_at__lt=tomorrow_start
+    ).aggregate(
+        completed_pomodoros=Count('id', filter=completed_pomodoro),
+        total_focus_time=Coalesce(Sum('actual_duration', filter=completed_pomodoro), 0),
+        interruption_count=Count('id', filter=Q(interruption_count__gt=0)),
+        pause_count=Coalesce(Sum('pause_count'), 0)
+    )
+    return stats
+
+
+def refresh_user_stats(user_id):
+    """Recalcula y guarda las estadísticas de un usuario"""
+    # La marca se toma antes de consultar: una invalidación concurrente
+    # deja la entrada obsoleta en lugar de perderse
+    computed_at = time.time()
+    stats = compute_user_stats(user_id)
+    cache.set(
+        STATS_KEY.format(user_id),
+        {'computed_at': computed_at, 'stats': stats},
+        stats_settings()['timeout']
+    )
+    return stats
+
+
+def _refresh_in_background(user_id, tz):
+    try:
+        # Los límites del día dependen de la zona activa, que es por hilo
+        with timezone.override(tz):
+            refresh_user_stats(user_id)
+    except Exception:
+        logger.exception('Error recalculando estadísticas del usuario %s', user_id)
+    finally:
+        cache.delete(REFRESH_LOCK_KEY.format(user_id))
+        connection.close()
+
+
+def schedule_refresh(user_id):
+    """
+    Recalcula las estadísticas en un hilo aparte, con la zona horaria activa
+    en la petición. El candado en caché evita que varias peticiones
+    simultáneas lancen el mismo recálculo.
+    """
+    if not cache.add(REFRESH_LOCK_KEY.format(user_id), True, stats_settings()['max_age']):
+        return
+    threading.Thread(
+        target=_refresh_in_background,
+        args=(user_id, timezone.get_current_timezone()),
+        name=f'user-stats-{user_id}',
+        daemon=True
+    ).start()
+
+
+def get_user_stats(user, allow_stale=None):
+    """
+    Estadísticas cacheadas de ``user``.
+
+    Una entrada queda obsoleta al invalidarse (señales de ``Task``,
+    ``TaskEvent`` y ``PomodoroSession``) o al superar ``USER_STATS_MAX_AGE``.
+    Con ``allow_stale`` (por defecto ``USER_STATS_STALE_WHILE_REVALIDATE``)
+    una entrada obsoleta se devuelve tal cual y se recalcula en segundo
+    plano; solo una caché vacía consulta la base de datos en la petición.
+    """
+    config = stats_settings()
+    if allow_stale is None:
+        allow_stale = config['stale_while_revalidate']
+
+    key = STATS_KEY.format(user.pk)
+    invalidated_key = INVALIDATED_KEY.format(user.pk)
+    cached = cache.get_many([key, invalidated_key])
+    entry = cached.get(key)
+
+    if entry is not None:
+        computed_at = entry['computed_at']
+        fresh = (
+            computed_at >= cached.get(invalidated_key, 0)
+            and time.time() - computed_at < config['max_age']
+        )
+        if fresh:
+            return entry['stats']
+        if allow_stale:
+            schedule_refresh(user.pk)
+            return entry['stats']
+
+    return refresh_user_stats(user.pk)
+
+
+def invalidate_user_stats(user_id):
+    """Marca como obsoletas las estadísticas cacheadas de un usuario"""
+    cache.set(INVALIDATED_KEY.format(user_id), time.time(), stats_settings()['timeout'])
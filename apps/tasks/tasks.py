@@ -0,0 +1,23 @@
+from celery import shared_task
+
+from apps.tasks import retention
+from apps.tasks.digests import DAILY, WEEKLY, dispatch_digests
+from apps.tasks.reminders import dispatch_due_reminders
+
+
+@shared_task(ignore_result=True)
+def send_due_reminders():
+    """Tarea periódica (Celery beat) que envía los recordatorios vencidos"""
+    return dispatch_due_reminders()
+
+
+@shared_task(ignore_result=True)
+def send_task_digests():
+    """Tarea periódica (Celery beat) que envía los resúmenes diarios y semanales"""
+    return {kind: dispatch_digests(kind) for kind in (DAILY, WEEKLY)}
+
+
+@shared_task(ignore_result=True)
+def compact_task_events():
+    """Tarea periódica (Celery beat) que compacta los eventos de tareas antiguos"""
+    return retention.compact_task_events()
@@ -1,3 +1,1087 @@
-from django.test import TestCase
+import io
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.notifications.models import Notification
+from apps.pomodoro.models import PomodoroSession
+from apps.security.models import User
+from apps.tasks.counters import count_session_pomodoro
+from apps.tasks.digests import DAILY, WEEKLY, dispatch_digests
+from apps.tasks.models import Task, TaskCategory, TaskEvent, TaskEventRollup
+from apps.tasks.pagination import encode_cursor
+from apps.tasks import recorder
+from apps.tasks.recorder import record_task_event
+from apps.tasks.reminders import claim_due_reminders, dispatch_due_reminders
+from apps.tasks.retention import compact_task_events, merge_into_rollup
+from apps.tasks.search import FTS_TABLE, search_tasks
+from apps.tasks.serializers import FIELD_SETS, serialize_row, serialize_rows, serialize_task, task_values
+from apps.tasks.stats import get_user_stats, schedule_refresh
+from apps.tasks.tree import rebuild_paths, subtree_rollup
+from apps.tasks.utils import day_window, in_day
+
+
+class TaskListPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.client.force_login(self.user)
+        self.url = reverse('tasks:task-json')
+
+    def create_tasks(self, due_dates, **kwargs):
+        return [
+            Task.objects.create(title=f'Tarea {index}', user=self.user, due_date=due_date, **kwargs)
+            for index, due_date in enumerate(due_dates)
+        ]
+
+    def collect(self, params, limit):
+        """Recorre todas las páginas y devuelve los ids en orden"""
+        ids, cursor = [], None
+        while True:
+            page = dict(params, limit=limit, **({'cursor': cursor} if cursor else {}))
+            data = self.client.get(self.url, page).json()
+            ids += [task['id'] for task in data['tasks']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_nullable_due_date_keeps_nulls_last_in_both_directions(self):
+        day = timezone.make_aware(datetime(2026, 3, 10, 9))
+        tasks = self.create_tasks([None, day + timedelta(days=1), None, day, day + timedelta(days=1), None])
+        dated = sorted((task for task in tasks if task.due_date), key=lambda task: (task.due_date, task.pk))
+        undated = [task.pk for task in tasks if task.due_date is None]
+
+        for limit in (1, 2, 4):
+            self.assertEqual(
+                self.collect({'order_by': 'due_date'}, limit),
+                [task.pk for task in dated] + undated
+            )
+            self.assertEqual(
+                self.collect({'order_by': '-due_date'}, limit),
+                [task.pk for task in reversed(dated)] + undated[::-1]
+            )
+
+    def test_duplicate_keys_across_page_boundary(self):
+        tasks = self.create_tasks([None] * 7, priority=2)
+
+        first = self.client.get(self.url, {'order_by': 'priority', 'limit': 3}).json()
+        self.assertEqual([task['id'] for task in first['tasks']], [task.pk for task in tasks[:3]])
+        # Todas comparten prioridad: la página siguiente la decide el id del cursor
+        self.assertEqual(self.collect({'order_by': 'priority'}, 3), [task.pk for task in tasks])
+        self.assertEqual(self.collect({'order_by': '-priority'}, 3), [task.pk for task in reversed(tasks)])
+
+    def test_invalid_cursors_are_rejected(self):
+        self.create_tasks([None] * 3)
+        cursors = [
+            'no-es-base64!',
+            encode_cursor('due_date', False, None, 1),
+            encode_cursor('priority', False, 'alta', 1),
+            encode_cursor('priority', False, 1, 'uno'),
+            encode_cursor('created_at', True, 'ayer', 1),
+            'W10',  # lista vacía
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {'order_by': 'priority', 'limit': 2, 'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_without_limit_streams_every_task(self):
+        tasks = self.create_tasks([None] * 5)
+
+        response = self.client.get(self.url, {'order_by': 'title'})
+
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([task['id'] for task in body['tasks']], [task.pk for task in tasks])
+        self.assertEqual(body['tasks'][0]['title'], 'Tarea 0')
+
+    async def test_asgi_stream_is_consumed_incrementally(self):
+        tasks = await sync_to_async(self.create_tasks)([None] * 5)
+        await self.async_client.aforce_login(self.user)
+
+        with mock.patch('apps.tasks.views.task_view.serialize_row', wraps=serialize_row) as serialize, \
+                mock.patch('apps.tasks.views.task_view.STREAM_CHUNK_SIZE', 2):
+            response = await self.async_client.get(self.url, {'order_by': 'title'})
+            self.assertTrue(response.is_async)
+            chunks = aiter(response.streaming_content)
+            body = [await anext(chunks), await anext(chunks)]
+            # Con un iterador síncrono Django habría serializado ya todas las filas
+            self.assertEqual(serialize.call_count, 1)
+            body += [chunk async for chunk in chunks]
+
+        body = json.loads(b''.join(body))
+        self.assertEqual([task['id'] for task in body['tasks']], [task.pk for task in tasks])
+
+
+class TaskSerializerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.category = TaskCategory.objects.create(name='Trabajo', color='#ff0000', user=self.user)
+        due_date = timezone.make_aware(datetime(2026, 3, 10, 9, 30))
+        self.tasks = [
+            Task.objects.create(
+                title='Con categoría', user=self.user, category=self.category, priority=3,
+                due_date=due_date, reminder_time=due_date - timedelta(hours=1)
+            ),
+            Task.objects.create(title='Sin categoría', user=self.user),
+        ]
+
+    def test_field_sets_select_only_their_columns(self):
+        for field_set, (columns, _) in FIELD_SETS.items():
+            with self.subTest(field_set=field_set):
+                row = task_values(Task.objects.filter(pk=self.tasks[0].pk), field_set).get()
+                self.assertEqual(tuple(row), columns)
+
+        task = Task.objects.get(pk=self.tasks[0].pk)
+        row = task_values(Task.objects.filter(pk=task.pk), 'list').get()
+        self.assertEqual(serialize_row(row), {
+            'id': task.pk,
+            'title': 'Con categoría',
+            'description': '',
+            'category': {'id': self.category.pk, 'name': 'Trabajo', 'color': '#ff0000'},
+            'priority': 'Alta',
+            'status': 'Pendiente',
+            'due_date': task.due_date.isoformat(),
+            'reminder_time': task.reminder_time.isoformat(),
+            'estimated_pomodoros': 1,
+            'completed_pomodoros': 0,
+            'created_at': task.created_at.isoformat(),
+            'updated_at': task.updated_at.isoformat(),
+            'completed_at': None,
+        })
+
+    def test_instances_and_rows_serialize_alike(self):
+        for task in self.tasks:
+            for field_set in FIELD_SETS:
+                with self.subTest(task=task.title, field_set=field_set):
+                    row = task_values(Task.objects.filter(pk=task.pk), field_set).get()
+                    instance = Task.objects.select_related('category').get(pk=task.pk)
+                    with self.assertNumQueries(0):
+                        self.assertEqual(serialize_task(instance, field_set), serialize_row(row, field_set))
+
+        summary = serialize_task(self.tasks[1], 'summary')
+        self.assertEqual(summary['category'], 'Sin categoría')
+        self.assertIsNone(summary['due_date'])
+
+    def test_rows_serialize_with_a_single_query(self):
+        Task.objects.bulk_create(
+            Task(title=f'Tarea {index}', user=self.user, category=self.category) for index in range(50)
+        )
+        with self.assertNumQueries(1):
+            data = serialize_rows(task_values(Task.objects.filter(user=self.user), 'list'))
+        self.assertEqual(len(data), 52)
+        self.assertEqual(data[-1]['category']['name'], 'Trabajo')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Usa el índice FTS5 de SQLite')
+class TaskSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.client.force_login(self.user)
+        self.url = reverse('tasks:task-json')
+
+    def search(self, text):
+        return list(
+            search_tasks(Task.objects.filter(user=self.user), self.user, text)
+            .order_by('relevance', 'id').values_list('title', flat=True)
+        )
+
+    def indexed_ids(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {FTS_TABLE} ORDER BY rowid')
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_index_follows_save_and_delete(self):
+        task = Task.objects.create(title='Informe trimestral', user=self.user)
+        self.assertEqual(self.search('informe'), ['Informe trimestral'])
+
+        task.title = 'Presupuesto anual'
+        task.save()
+        self.assertEqual(self.search('informe'), [])
+        self.assertEqual(self.search('presupuesto'), ['Presupuesto anual'])
+
+        task.delete()
+        self.assertEqual(self.indexed_ids(), [])
+
+    def test_prefix_and_accent_insensitive_matching(self):
+        Task.objects.create(title='Reunión con el café', description='Planificación', user=self.user)
+        Task.objects.create(title='Informe', user=User.objects.create(username='luis', email='luis@example.com'))
+
+        self.assertEqual(self.search('reu'), ['Reunión con el café'])
+        self.assertEqual(self.search('cafe planif'), ['Reunión con el café'])
+        # Las tareas de otro usuario no aparecen aunque coincidan
+        self.assertEqual(self.search('inform'), [])
+
+    def test_relevance_order_is_paginated_with_cursor(self):
+        Task.objects.create(title='Otra cosa', description='Menciona el informe al final', user=self.user)
+        Task.objects.create(title='Informe', description='Informe del informe mensual', user=self.user)
+        Task.objects.create(title='Informe mensual', user=self.user)
+        Task.objects.create(title='Sin relación', user=self.user)
+        expected = self.search('informe')
+        self.assertEqual(len(expected), 3)
+        self.assertEqual(expected[0], 'Informe')
+
+        titles, cursor = [], None
+        while True:
+            params = {'search': 'informe', 'limit': 1, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(self.url, params).json()
+            titles += [task['title'] for task in data['tasks']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(titles, expected)
+
+    def test_falls_back_to_icontains_without_fts(self):
+        Task.objects.create(title='Informe trimestral', user=self.user)
+
+        with mock.patch('apps.tasks.search.fts_available', return_value=False):
+            # Sin FTS la búsqueda es por subcadena y sin ranking
+            self.assertEqual(self.search('forme tri'), ['Informe trimestral'])
+            response = self.client.get(self.url, {'search': 'trimes', 'limit': 10})
+        self.assertEqual([task['title'] for task in response.json()['tasks']], ['Informe trimestral'])
+
+    def test_rebuild_command_restores_the_index(self):
+        tasks = [Task.objects.create(title=f'Informe {index}', user=self.user) for index in range(3)]
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.assertEqual(self.search('informe'), [])
+
+        out = io.StringIO()
+        call_command('rebuild_task_search', stdout=out)
+
+        self.assertIn('3 tareas', out.getvalue())
+        self.assertEqual(self.indexed_ids(), [task.pk for task in tasks])
+        self.assertEqual(len(self.search('informe')), 3)
+
+
+class TaskDirtyTrackingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        due_date = timezone.now() + timedelta(days=1)
+        task = Task.objects.create(title='Tarea', user=self.user, due_date=due_date, reminder_time=due_date)
+        Task.objects.filter(pk=task.pk).update(reminded_at=timezone.now())
+        self.task = Task.objects.get(pk=task.pk)
+
+    def writes(self, save, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            save(**kwargs)
+        return [query['sql'].split()[0] for query in queries]
+
+    def test_every_editable_field_is_tracked(self):
+        managed = {'id', 'path', 'created_at', 'updated_at'}
+        self.assertEqual(
+            {field.attname for field in Task._meta.concrete_fields} - managed,
+            set(Task.TRACKED_FIELDS)
+        )
+
+    def test_save_uses_loaded_values_without_select(self):
+        self.task.status = 'in_progress'
+        self.assertEqual(self.task.get_dirty_fields(), ['status'])
+
+        self.assertEqual(self.writes(self.task.save), ['UPDATE'])
+        self.assertEqual(self.task.get_dirty_fields(), [])
+        self.assertIsNotNone(Task.objects.get(pk=self.task.pk).reminded_at)
+
+        # Mover el vencimiento vuelve a programar el recordatorio en el mismo UPDATE
+        self.task.due_date += timedelta(hours=1)
+        self.assertEqual(self.writes(self.task.save), ['UPDATE'])
+        self.assertIsNone(Task.objects.get(pk=self.task.pk).reminded_at)
+
+    def test_update_fields_without_schedule_fields_skip_the_check(self):
+        self.task.due_date += timedelta(hours=1)
+        self.task.status = 'in_progress'
+        self.task.save(update_fields=['status'])
+
+        saved = Task.objects.get(pk=self.task.pk)
+        self.assertEqual(saved.status, 'in_progress')
+        self.assertIsNotNone(saved.reminded_at)
+        self.assertTrue(self.task.has_changed('due_date'))
+
+    def test_unchanged_save_keeps_model_semantics(self):
+        updated_at = self.task.updated_at
+        saved = []
+        post_save.connect(
+            lambda instance, **kwargs: saved.append(instance.pk),
+            sender=Task, weak=False, dispatch_uid='test_unchanged_save'
+        )
+        self.addCleanup(post_save.disconnect, sender=Task, dispatch_uid='test_unchanged_save')
+
+        # Un save() sin cambios sigue siendo un UPDATE con sus señales
+        self.assertEqual(self.writes(self.task.save), ['UPDATE'])
+        self.assertEqual(saved, [self.task.pk])
+        self.assertGreater(Task.objects.get(pk=self.task.pk).updated_at, updated_at)
+
+        # Y vuelve a insertar la fila si se borró con un queryset
+        Task.objects.filter(pk=self.task.pk).delete()
+        self.task.save()
+        self.assertTrue(Task.objects.filter(pk=self.task.pk, title='Tarea').exists())
+
+    def test_skip_if_unchanged_is_opt_in(self):
+        updated_at = Task.objects.get(pk=self.task.pk).updated_at
+
+        self.assertEqual(self.writes(self.task.save, skip_if_unchanged=True), [])
+        self.assertEqual(Task.objects.get(pk=self.task.pk).updated_at, updated_at)
+        # update_fields explícito o un cambio real siempre escriben
+        self.assertEqual(self.writes(self.task.save, skip_if_unchanged=True, update_fields=['status']), ['UPDATE'])
+        self.task.status = 'in_progress'
+        self.assertEqual(self.writes(self.task.save, skip_if_unchanged=True), ['UPDATE'])
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.now = timezone.now()
+
+    def create_task(self, **kwargs):
+        return Task.objects.create(title='Tarea', user=self.user, **kwargs)
+
+    def test_claims_due_tasks_once(self):
+        due_soon = self.create_task(due_date=self.now + timedelta(hours=2))
+        explicit = self.create_task(
+            due_date=self.now + timedelta(days=5),
+            reminder_time=self.now - timedelta(minutes=1)
+        )
+        self.create_task(due_date=self.now + timedelta(days=5))
+        self.create_task(due_date=self.now + timedelta(hours=2), status='completed')
+
+        claimed = claim_due_reminders(now=self.now)
+
+        self.assertCountEqual(claimed, [due_soon.id, explicit.id])
+        self.assertEqual(claim_due_reminders(now=self.now), [])
+
+    def test_batches_do_not_overlap(self):
+        for _ in range(5):
+            self.create_task(due_date=self.now + timedelta(hours=1))
+
+        first = claim_due_reminders(now=self.now, batch_size=3)
+        second = claim_due_reminders(now=self.now, batch_size=3)
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+
+    def test_changing_reminder_time_requeues_task(self):
+        task = self.create_task(
+            due_date=self.now + timedelta(days=5),
+            reminder_time=self.now - timedelta(minutes=1)
+        )
+        claim_due_reminders(now=self.now)
+
+        task.refresh_from_db()
+        task.reminder_time = self.now - timedelta(seconds=30)
+        task.save(update_fields=['reminder_time'])
+
+        task.refresh_from_db()
+        self.assertIsNone(task.reminded_at)
+        self.assertEqual(claim_due_reminders(now=self.now), [task.id])
+
+    def test_dispatch_sends_one_email_per_task(self):
+        self.create_task(due_date=self.now + timedelta(hours=3))
+        self.create_task(due_date=self.now + timedelta(hours=4))
+
+        sent = dispatch_due_reminders(now=self.now)
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(dispatch_due_reminders(now=self.now), 0)
+
+    def test_users_without_email_are_not_claimed(self):
+        silent = User.objects.create(username='luis', email='')
+        Task.objects.create(title='Sin correo', user=silent, due_date=self.now + timedelta(hours=3))
+        self.create_task(due_date=self.now + timedelta(hours=3))
+
+        self.assertEqual(dispatch_due_reminders(now=self.now), 1)
+        self.assertEqual([message.to for message in mail.outbox], [['ana@example.com']])
+        self.assertFalse(Task.objects.filter(user=silent, reminded_at__isnull=False).exists())
+
+    def test_failed_sender_releases_batch(self):
+        task = self.create_task(due_date=self.now + timedelta(hours=3))
+
+        def failing_sender(tasks):
+            raise ConnectionError('SMTP no disponible')
+
+        with self.assertLogs('apps.tasks.reminders', level='ERROR'):
+            self.assertEqual(dispatch_due_reminders(sender=failing_sender, now=self.now), 0)
+        task.refresh_from_db()
+        self.assertIsNone(task.reminded_at)
+
+
+class DigestTests(TestCase):
+    def setUp(self):
+        # Lunes a las 10:00 hora local
+        self.now = timezone.make_aware(datetime(2024, 6, 3, 10, 0))
+
+    def create_user(self, index, **kwargs):
+        kwargs.setdefault('preferred_notification_time', time(9, 0))
+        return User.objects.create(
+            username=f'usuario{index}', email=f'usuario{index}@example.com', **kwargs
+        )
+
+    def test_daily_digest_uses_constant_queries_per_batch(self):
+        for index in range(6):
+            user = self.create_user(index)
+            Task.objects.create(title='Hoy', user=user, due_date=self.now + timedelta(hours=2))
+            Task.objects.create(title='Semana', user=user, due_date=self.now + timedelta(days=3))
+            Task.objects.create(title='Vencida', user=user, due_date=self.now - timedelta(days=1))
+
+        # claim (savepoints, select, update), usuarios, hoy, semana,
+        # contadores y el claim vacío final: no depende del número de usuarios
+        with self.assertNumQueries(11):
+            self.assertEqual(dispatch_digests(DAILY, now=self.now), 6)
+
+        self.assertEqual(len(mail.outbox), 6)
+        html = mail.outbox[0].alternatives[0][0]
+        self.assertIn('Hoy', html)
+        self.assertIn('Semana', html)
+
+    def test_respects_preferences_and_sends_once(self):
+        self.create_user(1)
+        self.create_user(2, preferred_notification_time=time(18, 0))
+        self.create_user(3, notification_frequency='low')
+
+        self.assertEqual(dispatch_digests(DAILY, now=self.now), 1)
+        self.assertEqual(dispatch_digests(DAILY, now=self.now), 0)
+        self.assertEqual(dispatch_digests(WEEKLY, now=self.now), 1)
+        self.assertEqual(mail.outbox[0].to, ['usuario1@example.com'])
+        self.assertEqual(mail.outbox[1].to, ['usuario3@example.com'])
+
+        # Al día siguiente el resumen diario vuelve a salir
+        self.assertEqual(dispatch_digests(DAILY, now=self.now + timedelta(days=1)), 1)
+        self.assertEqual(dispatch_digests(WEEKLY, now=self.now + timedelta(days=1)), 0)
+
+
+class UserStatsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.task = Task.objects.create(
+            title='Vencida', user=self.user, priority=3,
+            due_date=timezone.now() - timedelta(hours=1)
+        )
+
+    def test_second_read_hits_cache(self):
+        with self.assertNumQueries(3):
+            stats = get_user_stats(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_stats(self.user), stats)
+
+        self.assertEqual(stats['overdue_tasks'], 1)
+        self.assertEqual(stats['high_priority_overdue'], 1)
+        self.assertEqual(stats['completion_rate'], 0)
+
+    def test_task_changes_invalidate_owner_only(self):
+        other = User.objects.create(username='luis', email='luis@example.com')
+        get_user_stats(self.user)
+        get_user_stats(other)
+
+        self.task.status = 'completed'
+        self.task.save()
+
+        with self.assertNumQueries(0):
+            get_user_stats(other, allow_stale=False)
+        stats = get_user_stats(self.user, allow_stale=False)
+        self.assertEqual(stats['overdue_tasks'], 0)
+        self.assertEqual(stats['completion_rate'], 100)
+
+    def test_task_event_invalidates_stats(self):
+        get_user_stats(self.user)
+        TaskEvent.objects.create(task=self.task, event_type='session_paused', description='Pausa')
+
+        with self.assertNumQueries(3):
+            get_user_stats(self.user, allow_stale=False)
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        get_user_stats(self.user)
+        Task.objects.create(title='Otra', user=self.user, due_date=timezone.now() - timedelta(hours=2))
+
+        with mock.patch('apps.tasks.stats.schedule_refresh') as schedule_refresh:
+            with self.assertNumQueries(0):
+                stats = get_user_stats(self.user, allow_stale=True)
+
+        self.assertEqual(stats['overdue_tasks'], 1)
+        schedule_refresh.assert_called_once_with(self.user.pk)
+
+
+    def test_background_refresh_uses_request_timezone(self):
+        zones = []
+
+        def compute(user_id):
+            zones.append(timezone.get_current_timezone_name())
+            return {}
+
+        with mock.patch('apps.tasks.stats.compute_user_stats', side_effect=compute):
+            with timezone.override('Europe/Madrid'):
+                schedule_refresh(self.user.pk)
+            for thread in threading.enumerate():
+                if thread.name == f'user-stats-{self.user.pk}':
+                    thread.join(timeout=5)
+
+        self.assertEqual(zones, ['Europe/Madrid'])
+
+class PomodoroCounterTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+
+    def completed_sessions(self, task, count):
+        return PomodoroSession.objects.bulk_create(
+            PomodoroSession(user=self.user, task=task, session_type='pomodoro', duration=25, status='completed')
+            for _ in range(count)
+        )
+
+    def test_session_is_counted_once(self):
+        task = Task.objects.create(title='Tarea', user=self.user, estimated_pomodoros=2)
+        session = PomodoroSession.objects.create(user=self.user, task=task, session_type='pomodoro', duration=25)
+
+        session.complete()
+        session.save()
+        self.assertFalse(count_session_pomodoro(session))
+
+        task.refresh_from_db()
+        self.assertEqual(task.completed_pomodoros, 1)
+        self.assertEqual(session.task.completed_pomodoros, 1)
+        self.assertEqual(task.status, 'pending')
+
+    def test_reaching_estimate_completes_task(self):
+        task = Task.objects.create(title='Tarea', user=self.user, estimated_pomodoros=1)
+        session = self.completed_sessions(task, 1)[0]
+
+        self.assertTrue(count_session_pomodoro(session))
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'completed')
+        self.assertIsNotNone(task.completed_at)
+
+    def test_manual_adjustments_are_clamped(self):
+        task = Task.objects.create(title='Tarea', user=self.user, estimated_pomodoros=1)
+        self.client.force_login(self.user)
+        url = reverse('tasks:task-pomodoro-update', args=[task.pk])
+
+        counts = [
+            self.client.post(url, {'action': action}).json()['completed_pomodoros']
+            for action in ('increment', 'increment', 'decrement', 'decrement')
+        ]
+        self.assertEqual(counts, [1, 1, 0, 0])
+
+    def test_concurrent_completions_are_not_lost(self):
+        tasks = [
+            Task.objects.create(title=f'Tarea {i}', user=self.user, estimated_pomodoros=40)
+            for i in range(5)
+        ]
+        sessions = [session for task in tasks for session in self.completed_sessions(task, 40)]
+
+        def count(session):
+            try:
+                return count_session_pomodoro(session)
+            finally:
+                connection.close()
+
+        # Cada sesión se cuenta dos veces a la vez: solo una debe sumar
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            counted = list(executor.map(count, sessions + sessions))
+
+        self.assertEqual(counted.count(True), 200)
+        for task in Task.objects.filter(user=self.user):
+            self.assertEqual(task.completed_pomodoros, 40)
+            self.assertEqual(task.status, 'completed')
+
+
+# Tabla que modifica una sentencia de escritura
+WRITE_RE = re.compile(r'^(?:INSERT INTO|UPDATE|DELETE FROM) "(\w+)"')
+
+
+class TaskEventRecorderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.tasks = [Task.objects.create(title=f'Tarea {i}', user=self.user) for i in range(2)]
+
+    def test_events_are_written_in_bulk_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(0):
+                for task in self.tasks:
+                    record_task_event(task, 'session_paused', 'Pausa', touch=True)
+                    record_task_event(task, 'session_resumed', 'Reanudada')
+
+        self.assertEqual(len(callbacks), 1)
+        with CaptureQueriesContext(connection) as queries:
+            callbacks[0]()
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(TaskEvent.objects.filter(task__user=self.user).count(), 4)
+
+    def test_session_transitions_cost_two_writes(self):
+        task = self.tasks[0]
+        task.status = 'in_progress'
+        task.save()
+        session = PomodoroSession.objects.create(user=self.user, task=task, session_type='pomodoro', duration=25)
+        self.client.force_login(self.user)
+        updated_at = Task.objects.get(pk=task.pk).updated_at
+
+        def resume():
+            self.client.post(
+                reverse('pomodoro:pomodoro_api'),
+                json.dumps({'action': 'resume', 'session_id': session.id}),
+                content_type='application/json'
+            )
+            session.refresh_from_db()
+
+        # UPDATE de la sesión e INSERT del evento; la tarea no se escribe
+        for transition in (session.pause, resume, session.interrupt):
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    transition()
+            tables = [WRITE_RE.match(q['sql']) for q in queries]
+            self.assertEqual(
+                [match[1] for match in tables if match and match[1] != 'django_session'],
+                ['pomodoro_pomodorosession', 'tasks_taskevent'],
+                transition
+            )
+
+        self.assertEqual(Task.objects.get(pk=task.pk).updated_at, updated_at)
+
+    def test_rolled_back_events_are_discarded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_task_event(self.tasks[0], 'session_paused', 'Pausa')
+            try:
+                with transaction.atomic():
+                    record_task_event(self.tasks[1], 'session_resumed', 'Reanudada')
+                    raise ValueError
+            except ValueError:
+                pass
+            # El buffer del savepoint revertido no queda retenido
+            self.assertEqual(len(recorder._buffers()), 1)
+
+        self.assertEqual(
+            list(TaskEvent.objects.values_list('task_id', 'event_type')),
+            [(self.tasks[0].pk, 'session_paused')]
+        )
+        self.assertEqual(len(recorder._buffers()), 0)
+
+
+class TaskEventRecorderRollbackTests(TransactionTestCase):
+    def test_rolled_back_transaction_buffer_is_not_reused(self):
+        user = User.objects.create(username='ana', email='ana@example.com')
+        task = Task.objects.create(title='Tarea', user=user)
+
+        for event_type in ('session_paused', 'session_resumed'):
+            try:
+                with transaction.atomic():
+                    record_task_event(task, event_type, 'Evento')
+                    if event_type == 'session_paused':
+                        raise ValueError
+            except ValueError:
+                self.assertEqual(len(recorder._buffers()), 0)
+
+        self.assertEqual(list(TaskEvent.objects.values_list('event_type', flat=True)), ['session_resumed'])
+
+
+class TaskEventRetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.task = Task.objects.create(title='Tarea', user=self.user)
+        self.today = timezone.localdate()
+
+    def create_events(self, days_ago, event_type, count):
+        created_at = timezone.make_aware(datetime.combine(self.today - timedelta(days=days_ago), time(12)))
+        events = TaskEvent.objects.bulk_create(
+            TaskEvent(task=self.task, event_type=event_type, description='') for _ in range(count)
+        )
+        TaskEvent.objects.filter(id__in=[event.id for event in events]).update(created_at=created_at)
+
+    def test_compaction_moves_old_events_to_rollup(self):
+        self.create_events(120, 'session_paused', 3)
+        self.create_events(120, 'session_resumed', 2)
+        self.create_events(100, 'session_paused', 1)
+        self.create_events(1, 'session_paused', 4)
+
+        result = compact_task_events(retention_days=90, batch_size=2)
+
+        self.assertEqual(result['compacted'], 6)
+        self.assertEqual(TaskEvent.objects.count(), 4)
+        self.assertEqual(
+            dict(TaskEventRollup.objects.filter(
+                day=self.today - timedelta(days=120)
+            ).values_list('event_type', 'count')),
+            {'session_paused': 3, 'session_resumed': 2}
+        )
+
+    def test_compaction_deletes_in_bulk(self):
+        self.create_events(120, 'session_paused', 50)
+        TaskEventRollup.objects.create(
+            task=self.task, day=self.today - timedelta(days=800), event_type='session_paused', count=7
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            result = compact_task_events(retention_days=90, batch_size=50)
+
+        self.assertEqual(result, {'compacted': 50, 'purged': 1})
+        # Un DELETE para el lote de eventos y otro para los conteos purgados,
+        # sin cargar los eventos ni consultar el dueño de cada uno
+        tables = [WRITE_RE.match(query['sql']) for query in queries]
+        self.assertEqual(
+            [match[1] for match in tables if match and match[0].startswith('DELETE')],
+            ['tasks_taskevent', 'tasks_taskeventrollup']
+        )
+        self.assertFalse(any('"tasks_task"' in query['sql'] for query in queries))
+        self.assertEqual(TaskEventRollup.objects.get().count, 50)
+
+    def test_concurrent_rollup_insert_is_merged(self):
+        day = self.today - timedelta(days=120)
+        bulk_update = TaskEventRollup.objects.bulk_update
+
+        def concurrent_insert(*args, **kwargs):
+            # Otra compactación crea la misma fila entre la lectura y el INSERT
+            if not TaskEventRollup.objects.exists():
+                TaskEventRollup.objects.create(task=self.task, day=day, event_type='session_paused', count=4)
+            return bulk_update(*args, **kwargs)
+
+        with mock.patch.object(TaskEventRollup.objects, 'bulk_update', side_effect=concurrent_insert):
+            merge_into_rollup({
+                (self.task.pk, day, 'session_paused'): 3,
+                (self.task.pk, day, 'session_resumed'): 2,
+            })
+
+        self.assertEqual(
+            dict(TaskEventRollup.objects.values_list('event_type', 'count')),
+            {'session_paused': 7, 'session_resumed': 2}
+        )
+
+    def test_history_combines_rollup_and_raw_events(self):
+        old_day = self.today - timedelta(days=120)
+        self.create_events(120, 'session_paused', 3)
+        compact_task_events(retention_days=90)
+        # Día a medio compactar: parte en el rollup y parte en crudo
+        self.create_events(120, 'session_paused', 2)
+        self.create_events(0, 'session_interrupted', 1)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('tasks:task-history', args=[self.task.pk]), {'days': 365})
+
+        self.assertEqual(response.json()['daily'], [
+            {'day': old_day.isoformat(), 'event_type': 'session_paused', 'count': 5},
+            {'day': self.today.isoformat(), 'event_type': 'session_interrupted', 'count': 1},
+        ])
+        self.assertEqual(len(response.json()['events']), 3)
+
+
+class CalendarRangeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.task = Task.objects.create(
+            title='Entrega', user=self.user,
+            due_date=timezone.make_aware(datetime(2026, 3, 10, 9))
+        )
+        Task.objects.create(
+            title='Otro mes', user=self.user,
+            due_date=timezone.make_aware(datetime(2026, 4, 1, 0))
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('tasks:task-calendar-range')
+        self.params = {'start': '2026-03-01', 'end': '2026-04-01'}
+
+    def test_returns_tasks_by_day_with_etag(self):
+        response = self.client.get(self.url, self.params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()['days']), ['2026-03-10'])
+        self.assertEqual(response.json()['days']['2026-03-10'][0]['title'], 'Entrega')
+        self.assertTrue(response['ETag'].startswith('"'))
+
+        page = self.client.get(reverse('tasks:task-calendar'), {'date': '2026-03-05'})
+        self.assertEqual(page.context['calendar_data']['range'], response.json())
+        self.assertEqual(page.context['calendar_data']['etag'], response['ETag'])
+
+        self.assertEqual(self.client.get(self.url, {'start': '2026-03-01', 'end': '2026-09-01'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': '2026-03-01'}).status_code, 400)
+
+    def test_unchanged_range_is_not_modified(self):
+        etag = self.client.get(self.url, self.params)['ETag']
+
+        # Sesión, usuario, ETag y actualización de la sesión
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.task.title = 'Entrega final'
+        self.task.save()
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_session_status_changes_change_etag(self):
+        etags = [self.client.get(self.url, self.params)['ETag']]
+
+        # Iniciar un pomodoro pasa la tarea a in_progress y cancelarlo la devuelve a pending
+        response = self.client.post(
+            reverse('pomodoro:pomodoro_api'),
+            json.dumps({'action': 'start', 'task_id': self.task.pk}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'in_progress')
+        etags.append(self.client.get(self.url, self.params)['ETag'])
+
+        PomodoroSession.objects.get(pk=response.json()['session_id']).cancel()
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'pending')
+        etags.append(self.client.get(self.url, self.params)['ETag'])
+
+        self.assertEqual(len(set(etags)), 3)
+
+
+# Paso de EXPLAIN QUERY PLAN que recorre una tabla entera (con o sin índice)
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Usa EXPLAIN QUERY PLAN de SQLite')
+class TaskTreeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.client.force_login(self.user)
+
+    def create(self, title, parent=None, **fields):
+        return Task.objects.create(title=title, user=self.user, parent_task=parent, **fields)
+
+    def test_paths_follow_moves_and_reject_cycles(self):
+        root = self.create('Proyecto')
+        child = self.create('Fase', root)
+        leaf = self.create('Paso', child)
+        other = self.create('Otro proyecto')
+        self.assertEqual(leaf.path, f'{root.pk}/{child.pk}/{leaf.pk}/')
+
+        stale_leaf = Task.objects.get(pk=leaf.pk)
+        response = self.client.post(reverse('tasks:task-move', args=[child.pk]), {'parent': other.pk})
+        self.assertEqual(response.status_code, 200)
+        leaf.refresh_from_db()
+        self.assertEqual(leaf.path, f'{other.pk}/{child.pk}/{leaf.pk}/')
+
+        # Una instancia leída antes del movimiento no devuelve la ruta anterior
+        stale_leaf.title = 'Paso editado'
+        stale_leaf.save()
+        leaf.refresh_from_db()
+        self.assertEqual(leaf.path, f'{other.pk}/{child.pk}/{leaf.pk}/')
+
+        response = self.client.post(reverse('tasks:task-move', args=[other.pk]), {'parent': leaf.pk})
+        self.assertEqual(response.status_code, 400)
+        other.refresh_from_db()
+        self.assertIsNone(other.parent_task_id)
+
+        Task.objects.update(path='')
+        self.assertEqual(rebuild_paths(), 4)
+        self.assertEqual(Task.objects.get(pk=leaf.pk).path, f'{other.pk}/{child.pk}/{leaf.pk}/')
+
+    def test_save_keeps_model_semantics(self):
+        root = self.create('Proyecto')
+        child = self.create('Fase', root, reminder_time=timezone.now())
+
+        # Instancia diferida: un único UPDATE, sin leer los campos que faltan
+        deferred = Task.objects.only('status', 'user').get(pk=child.pk)
+        deferred.status = 'in_progress'
+        with CaptureQueriesContext(connection) as queries:
+            deferred.save()
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['UPDATE'])
+        self.assertEqual(Task.objects.get(pk=child.pk).status, 'in_progress')
+
+        # Guardar tras borrar inserta de nuevo la fila, con su propia ruta
+        child.delete()
+        child.save()
+        self.assertEqual(Task.objects.get(pk=child.pk).path, f'{root.pk}/{child.pk}/')
+
+        Task.objects.filter(pk=child.pk).delete()
+        child.title = 'Fase restaurada'
+        child.save()
+        self.assertEqual(
+            Task.objects.filter(pk=child.pk).values_list('title', 'path').get(),
+            ('Fase restaurada', f'{root.pk}/{child.pk}/')
+        )
+
+    def test_tree_is_read_in_one_query_with_rollups(self):
+        root = self.create('Proyecto', estimated_pomodoros=2)
+        level = [root]
+        for depth in range(4):
+            level = [
+                self.create(f'Nivel {depth}', parent, estimated_pomodoros=1, completed_pomodoros=1,
+                            status='completed' if depth == 3 else 'pending')
+                for parent in level for _ in range(2)
+            ]
+
+        # Sesión y usuario (5 consultas con el guardado de la sesión), la raíz
+        # y el subárbol completo, sea cual sea su profundidad
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('tasks:task-tree', args=[root.pk]))
+        tree = response.json()['task']
+
+        self.assertEqual(tree['rollup'], {
+            'tasks': 31, 'completed_tasks': 16, 'estimated_pomodoros': 32,
+            'completed_pomodoros': 30, 'percent_complete': 51.6,
+        })
+        branch = tree['subtasks'][0]
+        self.assertEqual(branch['depth'], 1)
+        self.assertEqual(branch['rollup']['tasks'], 15)
+        self.assertEqual(subtree_rollup(Task.objects.get(pk=branch['id'])), branch['rollup'])
+
+
+class TaskBulkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        self.category = TaskCategory.objects.create(name='Trabajo', user=self.user)
+        self.client.force_login(self.user)
+
+    def bulk(self, operations):
+        with mock.patch('apps.tasks.bulk.mail_queue') as mail_queue, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('tasks:task-bulk'), json.dumps({'operations': operations}), content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.json(), mail_queue
+
+    def test_applies_operations_with_per_item_results(self):
+        past = timezone.now() - timedelta(days=1)
+        task = Task.objects.create(title='Informe', user=self.user, reminded_at=past)
+        Task.objects.filter(pk=task.pk).update(updated_at=past)
+        doomed = Task.objects.create(title='Borrar', user=self.user)
+        foreign = Task.objects.create(
+            title='Ajena', user=User.objects.create(username='luis', email='luis@example.com')
+        )
+
+        data, mail_queue = self.bulk([
+            {'op': 'create', 'data': {'title': 'Nueva', 'category': self.category.pk, 'due_date': '2026-11-02T09:00'}},
+            {'op': 'create', 'data': {'description': 'sin título'}},
+            {'op': 'update', 'id': task.pk, 'data': {'due_date': '2026-11-03T10:00', 'priority': 3}},
+            {'op': 'status', 'id': task.pk, 'status': 'completed'},
+            {'op': 'update', 'id': foreign.pk, 'data': {'title': 'Mía'}},
+            {'op': 'delete', 'id': doomed.pk},
+            {'op': 'status', 'id': doomed.pk, 'status': 'pending'},
+        ])
+
+        self.assertEqual((data['applied'], data['failed']), (4, 3))
+        self.assertEqual(
+            [(result['index'], result['status']) for result in data['results'] if result['status'] == 'error'],
+            [(1, 'error'), (4, 'error'), (6, 'error')]
+        )
+        created = Task.objects.get(pk=data['results'][0]['id'])
+        self.assertEqual((created.category_id, created.path), (self.category.pk, f'{created.pk}/'))
+
+        task.refresh_from_db()
+        self.assertEqual((task.priority, task.status), (3, 'completed'))
+        self.assertIsNotNone(task.completed_at)
+        self.assertIsNone(task.reminded_at)
+        self.assertGreater(task.updated_at, past)
+        self.assertEqual(Task.objects.get(pk=foreign.pk).title, 'Ajena')
+        self.assertFalse(Task.objects.filter(pk=doomed.pk).exists())
+        self.assertEqual(
+            Notification.objects.filter(type='task_due', task__in=[task, created]).count(), 2
+        )
+        mail_queue.enqueue.assert_called_once()
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def run(size):
+            tasks = Task.objects.bulk_create([Task(title=f'T{i}', user=self.user) for i in range(size)])
+            operations = [{'op': 'create', 'data': {'title': f'N{i}', 'due_date': '2026-11-02T09:00'}} for i in range(size)]
+            operations += [{'op': 'update', 'id': task.pk, 'data': {'title': 'Editada'}} for task in tasks]
+            operations += [{'op': 'status', 'id': task.pk, 'status': 'in_progress'} for task in tasks]
+            with CaptureQueriesContext(connection) as queries:
+                data, _ = self.bulk(operations)
+            self.assertEqual(data['failed'], 0)
+            return len(queries)
+
+        self.assertEqual(run(3), run(40))
+
+
+class DayWindowTests(TestCase):
+    def test_window_is_local_midnight_to_next_midnight(self):
+        start, end = day_window(date(2026, 10, 18))
+        self.assertEqual(start, datetime(2026, 10, 18, 5, tzinfo=dt_timezone.utc))
+        self.assertEqual(end, datetime(2026, 10, 19, 5, tzinfo=dt_timezone.utc))
+
+        # Con otra zona, el día del cambio de hora dura 25 horas
+        start, end = day_window(date(2026, 10, 25), tz='Europe/Madrid')
+        self.assertEqual(end.astimezone(dt_timezone.utc) - start.astimezone(dt_timezone.utc), timedelta(hours=25))
+
+    def test_summary_counts_by_local_day(self):
+        user = User.objects.create(username='ana', email='ana@example.com')
+        today = timezone.localdate()
+        # 23:30 local ya es mañana en UTC, pero sigue siendo hoy para el usuario
+        late = timezone.make_aware(datetime.combine(today, time(23, 30)))
+        Task.objects.create(title='Tarde', user=user, due_date=late, status='pending')
+        Task.objects.create(title='Mañana', user=user, due_date=late + timedelta(hours=1), status='pending')
+
+        self.assertEqual(user.get_daily_task_summary()['pending_tasks'], 1)
+        self.assertEqual(Task.objects.filter(in_day('due_date')).count(), 1)
+
+
+class QueryPlanTests(TestCase):
+    """
+    Planes de las consultas de las vistas más usadas: ninguna recorre una
+    tabla entera y los accesos por usuario usan los índices compuestos que
+    empiezan por ``user``.
+    """
+    # (vista, parámetros, índices que deben aparecer en los planes)
+    HOT_VIEWS = [
+        ('tasks:task-calendar', {}, ['task_user_due_date_idx']),
+        ('tasks:task-calendar-range', {'start': '2026-10-01', 'end': '2026-11-01'}, ['task_user_due_date_idx']),
+        ('tasks:task-json', {'status': 'pending', 'limit': 20}, ['task_user_status_created_idx']),
+        ('tasks:task-json', {'limit': 20}, []),
+        ('tasks:task-list', {'status': 'pending'}, ['task_user_status_created_idx']),
+        ('pomodoro:dashboard', {}, ['task_user_status_created_idx', 'task_user_due_date_idx', 'pomodoro_user_started_idx']),
+        ('security:task-summary', {}, ['task_user_due_date_idx']),
+        ('notifications:notification_feed', {}, []),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='ana', email='ana@example.com')
+        task = Task.objects.create(title='Tarea', user=self.user, due_date=timezone.now(), estimated_pomodoros=4)
+        PomodoroSession.objects.create(
+            user=self.user, task=task, session_type='pomodoro', duration=25, status='completed'
+        )
+        self.client.force_login(self.user)
+        self.tables = set(connection.introspection.table_names())
+
+    def explain(self, url, params):
+        """Planes de las SELECT ejecutadas al pedir ``url``: [(sql, [pasos])]"""
+        # Sin estadísticas cacheadas por la vista anterior
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if query['sql'].startswith('SELECT'):
+                    cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                    plans.append((query['sql'], [row[3] for row in cursor.fetchall()]))
+        return plans
+
+    def test_hot_views_use_index_searches(self):
+        for name, params, indexes in self.HOT_VIEWS:
+            with self.subTest(view=name, params=params):
+                plans = self.explain(reverse(name), params)
+                for sql, steps in plans:
+                    for step in steps:
+                        scan = FULL_SCAN_RE.match(step)
+                        if scan and scan[1] in self.tables:
+                            self.fail(f'Recorrido completo de {scan[1]}:\n{sql}\n' + '\n'.join(steps))
+
+                used = [step for _, steps in plans for step in steps]
+                for index in indexes:
+                    self.assertTrue(
+                        any(f'INDEX {index} (user_id=?' in step for step in used),
+                        f'{name} no usa {index}:\n' + '\n'.join(used)
+                    )
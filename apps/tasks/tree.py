@@ -0,0 +1,173 @@
+from django.db.models import CharField, Count, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Substr
+
+from apps.tasks.models import Task
+
+# Cada tarea guarda en ``path`` los ids de sus ancestros y el suyo, terminados
+# en el separador ("12/57/301/"). El subárbol de una tarea es el rango de
+# rutas que empiezan por la suya: como el carácter siguiente al separador es
+# "0", ese rango es ``[ruta, ruta sin separador + "0")`` y se resuelve con el
+# índice ``(user, path)`` sin LIKE. Ordenar por ``path`` da además el recorrido
+# en preorden (cada padre antes que sus subtareas). Un árbol pertenece a un
+# solo usuario.
+PATH_SEPARATOR = '/'
+PATH_END = chr(ord(PATH_SEPARATOR) + 1)
+# Segmento de una tarea en su propia ruta ("<id>/"), calculado en SQL
+OWN_PATH = Concat(Cast('id', CharField()), Value(PATH_SEPARATOR), output_field=CharField())
+
+# Columnas de cada nodo de ``task_tree``
+TREE_FIELDS = (
+    'id', 'parent_task_id', 'path', 'title', 'status', 'priority', 'due_date',
+    'estimated_pomodoros', 'completed_pomodoros',
+)
+
+
+def subtree_filter(task, path=None):
+    """``Q`` con ``task`` (o la tarea de ruta ``path``) y todos sus descendientes"""
+    path = path or task.path
+    return Q(user_id=task.user_id, path__gte=path, path__lt=path[:-1] + PATH_END)
+
+
+def descendants(task, include_self=True):
+    """Tareas del subárbol de ``task`` en una sola consulta, en preorden"""
+    queryset = Task.objects.filter(subtree_filter(task)).order_by('path')
+    return queryset if include_self else queryset.exclude(pk=task.pk)
+
+
+def depth(path):
+    """Profundidad de una ruta (0 para las tareas raíz)"""
+    return path.count(PATH_SEPARATOR) - 1
+
+
+def parent_path(task):
+    """
+    Ruta del padre de ``task`` ('' si es raíz). Si la tarea ya existe,
+    también relee su ruta actual, por si se movió un ancestro después de
+    cargarla.
+
+    Raises:
+        ValueError: el padre es de otro usuario, o es la propia tarea o una
+        de sus subtareas
+    """
+    ids = [pk for pk in (task.parent_task_id, task.pk) if pk]
+    rows = {
+        pk: (path, user_id)
+        for pk, path, user_id in Task.objects.filter(pk__in=ids).values_list('id', 'path', 'user_id')
+    }
+    if task.pk in rows:
+        task.path = rows[task.pk][0]
+    if not task.parent_task_id:
+        return ''
+    path, user_id = rows.get(task.parent_task_id, ('', task.user_id))
+    if user_id != task.user_id:
+        raise ValueError('La tarea padre pertenece a otro usuario')
+    if task.parent_task_id == task.pk or (task.path and path.startswith(task.path)):
+        raise ValueError('Una tarea no puede ser subtarea de sí misma ni de sus subtareas')
+    return path
+
+
+def place(task, parent):
+    """
+    Asigna la ruta de ``task`` bajo la ruta ``parent``. Si la tarea ya tenía
+    ruta (se movió), reescribe la de todo su subárbol con un único UPDATE
+    que cambia el prefijo, sin recorrer los niveles.
+    """
+    old = task.path
+    new = f'{parent}{task.pk}{PATH_SEPARATOR}'
+    if old == new:
+        return
+    if old:
+        Task.objects.filter(subtree_filter(task, old)).update(
+            path=Concat(Value(new), Substr('path', len(old) + 1), output_field=CharField())
+        )
+    else:
+        Task.objects.filter(pk=task.pk).update(path=new)
+    task.path = new
+
+
+def place_roots(task_ids):
+    """Asigna con un único UPDATE la ruta de tareas raíz recién creadas en bloque"""
+    Task.objects.filter(pk__in=task_ids).update(path=OWN_PATH)
+
+
+def rebuild_paths():
+    """
+    Recalcula las rutas de todas las tareas con un UPDATE por nivel. Las
+    tareas de un ciclo en ``parent_task`` (sin raíz) quedan sin ruta.
+
+    Returns:
+        int: tareas con ruta asignada
+    """
+    Task.objects.update(path='')
+    total = level = Task.objects.filter(parent_task__isnull=True).update(path=OWN_PATH)
+    parent = Subquery(Task.objects.filter(pk=OuterRef('parent_task_id')).values('path')[:1])
+    while level:
+        level = Task.objects.filter(path='').exclude(parent_task__path='').update(
+            path=Concat(parent, OWN_PATH, output_field=CharField())
+        )
+        total += level
+    return total
+
+
+def subtree_rollup(task):
+    """
+    Totales del subárbol de ``task`` (incluida) en una consulta agregada:
+    pomodoros estimados y completados, tareas y porcentaje completado.
+    """
+    totals = descendants(task).order_by().aggregate(
+        tasks=Count('id'),
+        completed_tasks=Count('id', filter=Q(status='completed')),
+        estimated_pomodoros=Coalesce(Sum('estimated_pomodoros'), 0),
+        completed_pomodoros=Coalesce(Sum('completed_pomodoros'), 0),
+    )
+    return _with_percent(totals)
+
+
+def _with_percent(totals):
+    tasks = totals['tasks']
+    totals['percent_complete'] = round(100 * totals['completed_tasks'] / tasks, 1) if tasks else 0.0
+    return totals
+
+
+def task_tree(task):
+    """
+    Subárbol completo de ``task`` leído con una sola consulta. Cada nodo
+    lleva sus subtareas y el resumen de su propio subárbol, calculado en
+    memoria recorriendo las filas en preorden inverso (los hijos antes que
+    su padre), de modo que el coste es lineal en el número de nodos.
+
+    Returns:
+        dict: nodo raíz con ``subtasks`` y ``rollup`` anidados
+    """
+    rows = list(descendants(task).values(*TREE_FIELDS))
+    nodes = {}
+    for row in rows:
+        node = nodes[row['id']] = {
+            'id': row['id'],
+            'title': row['title'],
+            'status': row['status'],
+            'priority': row['priority'],
+            'due_date': row['due_date'].isoformat() if row['due_date'] else None,
+            'depth': depth(row['path']) - depth(task.path),
+            'estimated_pomodoros': row['estimated_pomodoros'],
+            'completed_pomodoros': row['completed_pomodoros'],
+            'subtasks': [],
+            'rollup': {
+                'tasks': 1,
+                'completed_tasks': int(row['status'] == 'completed'),
+                'estimated_pomodoros': row['estimated_pomodoros'],
+                'completed_pomodoros': row['completed_pomodoros'],
+            },
+        }
+        parent = nodes.get(row['parent_task_id'])
+        if parent is not None and row['id'] != task.pk:
+            parent['subtasks'].append(node)
+
+    for row in reversed(rows):
+        node = nodes[row['id']]
+        _with_percent(node['rollup'])
+        parent = nodes.get(row['parent_task_id'])
+        if parent is not None and row['id'] != task.pk:
+            for key in ('tasks', 'completed_tasks', 'estimated_pomodoros', 'completed_pomodoros'):
+                parent['rollup'][key] += node['rollup'][key]
+    return nodes.get(task.pk)
@@ -1,7 +1,8 @@
 from django.urls import path
-from apps.tasks.views.calendar import CalendarView
+from apps.tasks.views.calendar import CalendarRangeView, CalendarView
 from apps.tasks.views.categories import CategoryCreateView, CategoryDeleteView, CategoryListView, CategoryUpdateView
 from apps.tasks.views.task_view import (
+    TaskBulkView,
     TaskDetailView,
     TaskListView,
     TaskCreateView,
@@ -9,6 +10,9 @@ from apps.tasks.views.task_view import (
     TaskDeleteView,
     TaskStatusUpdateView,
     TaskPomodoroUpdateView,
+    TaskHistoryView,
+    TaskMoveView,
+    TaskTreeView,
     list_tasks_json
 )
 
@@ -18,12 +22,17 @@ urlpatterns = [
     path('list/', TaskListView.as_view(), name='task-list'),  # Listar tareas
     path('list/json/', list_tasks_json, name='task-json'),  # lista_en_json
     path('create/', TaskCreateView.as_view(), name='task-create'),  # Crear tarea
+    path('bulk/', TaskBulkView.as_view(), name='task-bulk'),  # Lote de operaciones (JSON)
     path('<int:pk>/update/', TaskUpdateView.as_view(), name='task-update'),  # Actualizar tarea
     path('<int:pk>/delete/', TaskDeleteView.as_view(), name='task-delete'),  # Eliminar tarea
     path('<int:pk>/status/', TaskStatusUpdateView.as_view(), name='task-status-update'),  # Actualizar estado
     path('<int:pk>/pomodoro/', TaskPomodoroUpdateView.as_view(), name='task-pomodoro-update'),# Actualizar pomodoros
     path('<int:pk>/detail/', TaskDetailView.as_view(), name='task-detail'),
+    path('<int:pk>/history/', TaskHistoryView.as_view(), name='task-history'),  # Historial de eventos
+    path('<int:pk>/tree/', TaskTreeView.as_view(), name='task-tree'),  # Subárbol de subtareas
+    path('<int:pk>/move/', TaskMoveView.as_view(), name='task-move'),  # Cambiar tarea padre
     path('calendar/', CalendarView.as_view(), name='task-calendar'),
+    path('calendar/range/', CalendarRangeView.as_view(), name='task-calendar-range'),  # Tareas por día (JSON)
     
     
     # Rutas para categorías
@@ -1,6 +1,44 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.db.models import Q
 from django.utils import timezone
 from apps.notifications.models import Notification
 
+
+def start_of_day(day, tz=None):
+    """Medianoche local de ``day`` (en ``tz`` o la zona activa) como datetime con zona horaria"""
+    return timezone.make_aware(datetime.combine(day, time.min), tz)
+
+
+def day_window(day=None, tz=None):
+    """
+    Rango semiabierto ``[inicio, fin)`` del día local ``day`` (hoy por
+    defecto). La zona es ``tz`` (nombre o ``tzinfo``) o, sin ella, la zona
+    activa: ``TIME_ZONE`` (America/Guayaquil) o la del usuario si se activó
+    con ``timezone.activate``. El fin es la medianoche siguiente, no
+    inicio + 24 h, así que los días con cambio de hora también cuadran.
+
+    Returns:
+        tuple: (inicio, fin) con zona horaria
+    """
+    if isinstance(tz, str):
+        tz = ZoneInfo(tz)
+    if day is None:
+        day = timezone.localdate(timezone=tz)
+    return start_of_day(day, tz), start_of_day(day + timedelta(days=1), tz)
+
+
+def in_day(field, day=None, tz=None):
+    """
+    ``Q`` equivalente a ``<field>__date=day`` pero como rango sobre la
+    columna (``>= inicio AND < fin``), que la base de datos resuelve con el
+    índice en lugar de convertir cada fila de zona horaria.
+    """
+    start, end = day_window(day, tz)
+    return Q(**{f'{field}__gte': start, f'{field}__lt': end})
+
+
 def create_task_notification(user, task, notification_type, scheduled_for=None):
     """
     Crea una notificación relacionada a una tarea.
@@ -11,6 +49,16 @@ def create_task_notification(user, task, notification_type, scheduled_for=None):
         notification_type: Tipo de notificación (debe ser uno válido de NOTIFICATION_TYPES)
         scheduled_for: Fecha y hora programada para la notificación
     """
+    notification = build_task_notification(user, task, notification_type, scheduled_for)
+    notification.save()
+    return notification
+
+
+def build_task_notification(user, task, notification_type, scheduled_for=None):
+    """
+    Construye sin guardar la notificación de ``create_task_notification``,
+    para crear varias con ``bulk_create``.
+    """
     notification_messages = {
         'task_due': {
             'title': f'Tarea próxima a vencer: {task.title}',
@@ -35,7 +83,7 @@ def create_task_notification(user, task, notification_type, scheduled_for=None):
         
     message_data = notification_messages[notification_type]
     
-    Notification.objects.create(
+    return Notification(
         user=user,
         task=task,
         type=notification_type,
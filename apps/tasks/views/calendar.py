@@ -1,18 +1,26 @@
+from django.views import View
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
 from datetime import datetime
-from apps.tasks.models import Task, TaskCategory
+from apps.tasks.calendar import calendar_range, month_range, parse_range, range_etag
+from apps.tasks.models import TaskCategory
 
 class CalendarView(LoginRequiredMixin, TemplateView):
     template_name = 'tasks/calendar.html'
-    
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
+
         # Get the requested date from query params
         requested_date = self.request.GET.get('date')
-        
+
         # Initialize start_date
         if requested_date:
             try:
@@ -20,26 +28,55 @@ class CalendarView(LoginRequiredMixin, TemplateView):
                 start_date = datetime.fromisoformat(requested_date).date()
             except (TypeError, ValueError):
                 # If parsing fails, use current date
-                start_date = timezone.now().date()
+                start_date = timezone.localdate()
         else:
             # If no date provided, use current date
-            start_date = timezone.now().date()
-        
-        # Always start from the first day of the month
-        start_date = start_date.replace(day=1)
-        
-        # Calculate end date (45 days from start_date)
-        end_date = (start_date + timezone.timedelta(days=45)).replace(day=1)
-        
-        # Get tasks
-        context['tasks'] = Task.objects.filter(
-            user=self.request.user,
-            due_date__range=[start_date, end_date]
-        ).select_related('category')
-        
+            start_date = timezone.localdate()
+
+        # Solo el mes inicial va en la página; el resto lo pide calendar.js
+        # a ``CalendarRangeView``
+        start_date, end_date = month_range(start_date)
+        user_id = self.request.user.pk
+
         # Get categories
-        context['categories'] = TaskCategory.objects.filter(
+        categories = TaskCategory.objects.filter(
             user=self.request.user
-        )
-        
-        return context
\ No newline at end of file
+        ).values('id', 'name', 'color')
+
+        context['calendar_data'] = {
+            'range': calendar_range(user_id, start_date, end_date),
+            'etag': quote_etag(range_etag(user_id, start_date, end_date)),
+            'range_url': reverse('tasks:task-calendar-range'),
+            'categories': list(categories),
+        }
+
+        return context
+
+
+def calendar_range_etag(request, *args, **kwargs):
+    """ETag de ``CalendarRangeView``; None si el rango no es válido"""
+    try:
+        start, end = parse_range(request.GET.get('start'), request.GET.get('end'))
+    except ValueError:
+        return None
+    return range_etag(request.user.pk, start, end)
+
+
+class CalendarRangeView(LoginRequiredMixin, View):
+    """
+    Tareas de los días ``[start, end)`` (``?start=AAAA-MM-DD&end=AAAA-MM-DD``)
+    agrupadas por día. Lleva un ETag fuerte: si el rango no cambió, un
+    ``If-None-Match`` se responde con 304 tras una sola consulta agregada.
+    """
+
+    @method_decorator(condition(etag_func=calendar_range_etag))
+    def get(self, request, *args, **kwargs):
+        try:
+            start, end = parse_range(request.GET.get('start'), request.GET.get('end'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        response = JsonResponse(calendar_range(request.user.pk, start, end))
+        # El navegador debe revalidar siempre: el ETag hace barata la comprobación
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -1,35 +1,72 @@
-from datetime import datetime
-from django.core.mail import EmailMultiAlternatives
-from django.utils.html import strip_tags
-from django.conf import settings
-from apps.tasks.models import Task
+import json
+from datetime import datetime, timedelta
 from django.utils import timezone
-from pathlib import Path
-from email.mime.image import MIMEImage
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
 from django.core.serializers.json import DjangoJSONEncoder
-from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.views import View
-from django.db.models import Q
 from apps.tasks.models import Task, TaskCategory
 from apps.notifications.models import Notification
-from apps.tasks.forms.tasksform import MobileTaskForm
 from apps.tasks.utils import create_task_notification
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from django.conf import settings
-from threading import Thread
+from apps.tasks.counters import adjust_completed_pomodoros
+from apps.tasks.retention import recent_task_events, task_event_history
+from apps.tasks.serializers import serialize_row, serialize_rows, serialize_task, task_values
+from apps.tasks.search import search_tasks
+from apps.tasks.tree import task_tree
+from apps.tasks.bulk import apply_operations, parse_operations
+from apps.tasks.pagination import (
+    RELEVANCE_ORDER,
+    InvalidCursor,
+    apply_keyset,
+    decode_cursor,
+    encode_cursor,
+    order_expressions,
+    parse_order,
+)
+from apps.core.mail import build_email, mail_queue
+
+STREAM_CHUNK_SIZE = 500
+MAX_PAGE_SIZE = 500
+
+def stream_tasks_json(tasks):
+    """
+    Genera el cuerpo ``{"tasks": [...]}`` fila a fila a partir de un cursor
+    de base de datos, sin materializar la lista completa en memoria.
+    """
+    yield '{"tasks": ['
+    separator = ''
+    for row in tasks.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield separator + json.dumps(serialize_row(row), cls=DjangoJSONEncoder)
+        separator = ','
+    yield ']}'
+
+async def astream_tasks_json(tasks):
+    """
+    Versión asíncrona de ``stream_tasks_json`` para ASGI. Django consume un
+    iterador síncrono con ``sync_to_async(list)`` antes de enviar nada, así
+    que bajo ASGI el cuerpo entero acabaría en memoria; ``aiterator`` trae
+    cada bloque de ``STREAM_CHUNK_SIZE`` filas en un hilo y la respuesta se
+    envía a medida que llegan.
+    """
+    yield '{"tasks": ['
+    separator = ''
+    async for row in tasks.aiterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield separator + json.dumps(serialize_row(row), cls=DjangoJSONEncoder)
+        separator = ','
+    yield ']}'
 
 def list_tasks_json(request):
     """
-    Vista para obtener todas las tareas del usuario en formato JSON con filtros.
+    Vista para obtener las tareas del usuario en formato JSON con filtros.
+
+    Sin ``limit`` la respuesta se transmite en streaming con todas las tareas.
+    Con ``limit`` se devuelve una página y un ``next_cursor`` opaco que se
+    envía en el parámetro ``cursor`` para pedir la siguiente.
     """
-    queryset = Task.objects.filter(user=request.user).select_related('category')
+    queryset = Task.objects.filter(user=request.user)
     
     # Aplicar filtros
     status = request.GET.get('status')
@@ -44,40 +81,50 @@ def list_tasks_json(request):
     if priority:
         queryset = queryset.filter(priority=priority)
         
+    tasks = task_values(queryset, 'list')
+
+    # Con búsqueda, el orden por defecto es la relevancia
     search = request.GET.get('search')
     if search:
-        queryset = queryset.filter(
-            Q(title__icontains=search) | 
-            Q(description__icontains=search)
-        )
-    
-    # Ordenamiento
-    order_by = request.GET.get('order_by', '-created_at')
-    tasks = queryset.order_by(order_by)
+        tasks = search_tasks(tasks, request.user, search)
+        field, descending = parse_order(request.GET.get('order_by'), default=RELEVANCE_ORDER)
+    else:
+        field, descending = parse_order(request.GET.get('order_by'))
+
+    # Ordenamiento (campo + id para que el cursor sea estable)
+    tasks = tasks.order_by(*order_expressions(field, descending))
+
+    limit = request.GET.get('limit')
+    if not limit:
+        stream = astream_tasks_json if isinstance(request, ASGIRequest) else stream_tasks_json
+        return StreamingHttpResponse(stream(tasks), content_type='application/json')
+
+    try:
+        limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'Límite inválido'}, status=400)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            value, pk = decode_cursor(cursor, field, descending)
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        tasks = apply_keyset(tasks, field, descending, value, pk)
+
+    # Se pide una fila extra para saber si existe una página siguiente
+    page = list(tasks[:limit + 1])
+    has_next = len(page) > limit
+    page = page[:limit]
+
+    next_cursor = None
+    if has_next:
+        last = page[-1]
+        next_cursor = encode_cursor(field, descending, last[field], last['id'])
 
     data = {
-        'tasks': [
-            {
-                "id": task.id,
-                "title": task.title,
-                "description": task.description,
-                "category": {
-                    "id": task.category.id if task.category else None,
-                    "name": task.category.name if task.category else None,
-                    "color": task.category.color if task.category else None,
-                },
-                "priority": dict(Task.PRIORITY_CHOICES).get(task.priority),
-                "status": dict(Task.STATUS_CHOICES).get(task.status),
-                "due_date": task.due_date.isoformat() if task.due_date else None,
-                "reminder_time": task.reminder_time.isoformat() if task.reminder_time else None,
-                "estimated_pomodoros": task.estimated_pomodoros,
-                "completed_pomodoros": task.completed_pomodoros,
-                "created_at": task.created_at.isoformat(),
-                "updated_at": task.updated_at.isoformat(),
-                "completed_at": task.completed_at.isoformat() if task.completed_at else None,
-            }
-            for task in tasks
-        ]
+        'tasks': serialize_rows(page),
+        'next_cursor': next_cursor,
     }
 
     return JsonResponse(data, safe=False, encoder=DjangoJSONEncoder)
@@ -105,10 +152,8 @@ class TaskListView(LoginRequiredMixin, ListView):
             
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search)
-            )
+            queryset = search_tasks(queryset, self.request.user, search)
+            return queryset.order_by(self.request.GET.get('order_by', RELEVANCE_ORDER), '-id')
             
         order_by = self.request.GET.get('order_by', '-created_at')
         return queryset.order_by(order_by)
@@ -120,12 +165,6 @@ class TaskListView(LoginRequiredMixin, ListView):
         context['priority_choices'] = Task.PRIORITY_CHOICES
         return context
 
-def send_email_async(email):
-    try:
-        email.send()
-    except Exception as e:
-        print(f"Error enviando correo: {str(e)}")
-
 class TaskCreateView(LoginRequiredMixin, View):
     def post(self, request):
         # Recogemos los datos del formulario directamente desde request.POST
@@ -159,36 +198,19 @@ class TaskCreateView(LoginRequiredMixin, View):
 
         # Preparar el correo en segundo plano
         context = {'user': request.user, 'task': task}
-        html_content = render_to_string('email/task_created.html', context)
-        text_content = strip_tags(html_content)
-        email = EmailMultiAlternatives(
+        email = build_email(
             f'Nueva tarea creada: {task.title}',
-            text_content,
-            settings.DEFAULT_FROM_EMAIL,
+            'email/task_created.html',
+            context,
             [request.user.email]
         )
-        email.attach_alternative(html_content, "text/html")
-        logo_path = Path(settings.BASE_DIR) / 'static' / 'img' / 'mindhelper-logo.png'
-        if logo_path.exists():
-            with open(logo_path, 'rb') as logo_file:
-                logo = MIMEImage(logo_file.read())
-                logo.add_header('Content-ID', '<logo>')  # Definir el CID del logo
-                email.attach(logo)
-
-        # Usar un hilo para enviar el correo
-        Thread(target=send_email_async, args=(email,)).start()
+
+        # Encolar el correo para el pool de envío
+        mail_queue.enqueue(email)
         
         return JsonResponse({
             'message': 'Tarea creada exitosamente',
-            'task': {
-                'title': task.title,
-                'description': task.description,
-                'category': task.category.name if task.category else 'Sin categoría',
-                'priority': task.get_priority_display(),
-                'status': task.status,
-                'due_date': task.due_date.strftime('%Y-%m-%d %H:%M:%S') if task.due_date else None,
-                'estimated_pomodoros': task.estimated_pomodoros,
-            }
+            'task': serialize_task(task, 'summary')
         })
 
 class TaskDetailView(LoginRequiredMixin, UserPassesTestMixin, View):
@@ -198,27 +220,94 @@ class TaskDetailView(LoginRequiredMixin, UserPassesTestMixin, View):
         return task.user == self.request.user
 
     def get(self, request, pk):
-        task = get_object_or_404(Task, pk=pk, user=request.user)
+        row = task_values(Task.objects.filter(pk=pk, user=request.user), 'detail').first()
+        if row is None:
+            raise Http404
         
         return JsonResponse({
-            'task': {
-                'id': task.id,
-                'title': task.title,
-                'description': task.description,
-                'category': {
-                    'id': task.category.id if task.category else None,
-                    'name': task.category.name if task.category else None,
-                    'color': task.category.color if task.category else None,
-                },
-                'priority': task.priority,
-                'status': task.status,
-                'due_date': task.due_date.isoformat() if task.due_date else None,
-                'estimated_pomodoros': task.estimated_pomodoros,
-                'completed_pomodoros': task.completed_pomodoros,
-            }
+            'task': serialize_row(row, 'detail')
         })
 
 
+class TaskHistoryView(LoginRequiredMixin, View):
+    """
+    Historial de eventos de una tarea: los últimos eventos en crudo y los
+    conteos diarios de los últimos ``days`` días, combinando eventos y
+    conteos ya compactados (``apps.tasks.retention``).
+    """
+    default_days = 30
+    max_days = 730
+
+    def get(self, request, pk):
+        task = get_object_or_404(Task.objects.only('id'), pk=pk, user=request.user)
+        try:
+            days = min(int(request.GET.get('days', self.default_days)), self.max_days)
+        except ValueError:
+            return JsonResponse({'error': 'Número de días inválido'}, status=400)
+
+        today = timezone.localdate()
+        return JsonResponse({
+            'events': recent_task_events(task.pk),
+            'daily': task_event_history(task.pk, start=today - timedelta(days=max(days, 1) - 1), end=today),
+        }, encoder=DjangoJSONEncoder)
+
+
+class TaskBulkView(LoginRequiredMixin, View):
+    """
+    Aplica un lote JSON ``{"operations": [...]}`` de altas, ediciones,
+    cambios de estado y borrados en una sola transacción
+    (ver ``apps.tasks.bulk``). Responde con un resultado por operación.
+    """
+
+    def post(self, request):
+        try:
+            operations = parse_operations(json.loads(request.body or '{}'))
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'JSON inválido'}, status=400)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        results = apply_operations(request.user, operations)
+        failed = sum(result['status'] == 'error' for result in results)
+        return JsonResponse({'results': results, 'applied': len(results) - failed, 'failed': failed})
+
+
+class TaskTreeView(LoginRequiredMixin, View):
+    """
+    Subárbol de subtareas de una tarea con el resumen de cada nodo
+    (pomodoros estimados y completados, porcentaje completado). Se lee con
+    una sola consulta por rango de ruta, sea cual sea la profundidad.
+    """
+
+    def get(self, request, pk):
+        task = get_object_or_404(Task.objects.only('id', 'user_id', 'path'), pk=pk, user=request.user)
+        return JsonResponse({'task': task_tree(task)})
+
+
+class TaskMoveView(LoginRequiredMixin, View):
+    """
+    Cambia el padre de una tarea (``parent`` vacío la convierte en raíz).
+    Todo su subárbol se mueve con ella.
+    """
+
+    def post(self, request, pk):
+        task = get_object_or_404(Task, pk=pk, user=request.user)
+        try:
+            parent_id = int(request.POST['parent']) if request.POST.get('parent') else None
+        except ValueError:
+            return JsonResponse({'error': 'Tarea padre inválida'}, status=400)
+        if parent_id is not None and not Task.objects.filter(pk=parent_id, user=request.user).exists():
+            return JsonResponse({'error': 'Tarea padre no encontrada'}, status=404)
+
+        task.parent_task_id = parent_id
+        try:
+            task.save(update_fields=['parent_task', 'updated_at'])
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        return JsonResponse({'status': 'success', 'path': task.path})
+
+
 class TaskUpdateView(LoginRequiredMixin, UserPassesTestMixin, View):
     def test_func(self):
         task_id = self.kwargs.get('pk')
@@ -253,7 +342,7 @@ class TaskUpdateView(LoginRequiredMixin, UserPassesTestMixin, View):
         task.status = status
         task.due_date = due_date
         task.estimated_pomodoros = estimated_pomodoros
-        task.save()
+        task.save(skip_if_unchanged=True)
 
         # Manejar las notificaciones de fecha límite
         if task.due_date:
@@ -271,36 +360,19 @@ class TaskUpdateView(LoginRequiredMixin, UserPassesTestMixin, View):
 
         # Preparar el correo en segundo plano
         context = {'user': request.user, 'task': task}
-        html_content = render_to_string('email/task_updated.html', context)
-        text_content = strip_tags(html_content)
-        email = EmailMultiAlternatives(
+        email = build_email(
             f'Tarea actualizada: {task.title}',
-            text_content,
-            settings.DEFAULT_FROM_EMAIL,
+            'email/task_updated.html',
+            context,
             [request.user.email]
         )
-        email.attach_alternative(html_content, "text/html")
-        logo_path = Path(settings.BASE_DIR) / 'static' / 'img' / 'mindhelper-logo.png'
-        if logo_path.exists():
-            with open(logo_path, 'rb') as logo_file:
-                logo = MIMEImage(logo_file.read())
-                logo.add_header('Content-ID', '<logo>')
-                email.attach(logo)
 
-        # Usar un hilo para enviar el correo
-        Thread(target=send_email_async, args=(email,)).start()
+        # Encolar el correo para el pool de envío
+        mail_queue.enqueue(email)
 
         return JsonResponse({
             'message': 'Tarea actualizada exitosamente',
-            'task': {
-                'title': task.title,
-                'description': task.description,
-                'category': task.category.name if task.category else 'Sin categoría',
-                'priority': task.get_priority_display(),
-                'status': task.status,
-                'due_date': task.due_date.strftime('%Y-%m-%d %H:%M:%S') if task.due_date else None,
-                'estimated_pomodoros': task.estimated_pomodoros,
-            }
+            'task': serialize_task(task, 'summary')
         })
 
 class TaskDeleteView(LoginRequiredMixin, UserPassesTestMixin, View):
@@ -331,7 +403,7 @@ class TaskStatusUpdateView(LoginRequiredMixin, View):
         if status == 'completed':
             task.completed_at = timezone.now()
             
-        task.save()
+        task.save(skip_if_unchanged=True)
         
         return JsonResponse({
             'status': 'success',
@@ -344,18 +416,17 @@ class TaskPomodoroUpdateView(LoginRequiredMixin, View):
         action = request.POST.get('action')
         
         if action == 'increment':
-            task.completed_pomodoros = min(
-                task.completed_pomodoros + 1,
-                task.estimated_pomodoros
-            )
+            delta = 1
         elif action == 'decrement':
-            task.completed_pomodoros = max(task.completed_pomodoros - 1, 0)
+            delta = -1
         else:
             return JsonResponse({'error': 'Acción inválida'}, status=400)
-            
-        task.save()
         
-        if task.completed_pomodoros == task.estimated_pomodoros:
+        # Incremento atómico acotado entre 0 y los pomodoros estimados
+        counters = adjust_completed_pomodoros(task.pk, delta, clamp_to_estimate=True)
+        task.completed_pomodoros = counters['completed_pomodoros']
+        
+        if task.completed_pomodoros == counters['estimated_pomodoros']:
             create_task_notification(
                 user=request.user,
                 task=task,
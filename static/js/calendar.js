@@ -1,14 +1,87 @@
 // tasks_calendar.js
+// Segundos durante los que un mes ya cargado se usa sin revalidarlo
+const MONTH_FRESHNESS = 60;
+
 class TaskCalendar {
     constructor(taskData) {
-        this.currentDate = new Date();
-        this.selectedDate = new Date();
-        this.tasks = taskData.tasks || [];
         this.categories = taskData.categories || [];
+        this.rangeUrl = taskData.range_url;
+        // Meses cargados: inicio del mes -> {etag, fetchedAt, days}
+        this.months = new Map();
+        // Tareas por día local (AAAA-MM-DD) de todos los meses cargados
+        this.days = {};
+        this.storeMonth(taskData.range, taskData.etag);
+
+        const [year, month] = taskData.range.start.split('-').map(Number);
+        this.currentDate = new Date(year, month - 1, 1);
+        this.selectedDate = new Date();
         this.view = 'month';
         this.init();
     }
 
+    dateKey(date) {
+        const pad = value => String(value).padStart(2, '0');
+        return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`;
+    }
+
+    monthStart(date, offset = 0) {
+        return new Date(date.getFullYear(), date.getMonth() + offset, 1);
+    }
+
+    storeMonth(range, etag) {
+        // Sustituye los días del mes: las tareas movidas o borradas desaparecen
+        Object.keys(this.days)
+            .filter(day => day >= range.start && day < range.end)
+            .forEach(day => delete this.days[day]);
+        Object.assign(this.days, range.days);
+        this.months.set(range.start, { etag, fetchedAt: Date.now(), days: range.days });
+    }
+
+    // Carga un mes de CalendarRangeView. Con ETag, un mes sin cambios
+    // vuelve como 304 sin cuerpo
+    async fetchMonth(start) {
+        const key = this.dateKey(start);
+        const cached = this.months.get(key);
+        if (cached && Date.now() - cached.fetchedAt < MONTH_FRESHNESS * 1000) {
+            return false;
+        }
+
+        const params = new URLSearchParams({
+            start: key,
+            end: this.dateKey(this.monthStart(start, 1))
+        });
+        const headers = cached ? { 'If-None-Match': cached.etag } : {};
+        const response = await fetch(`${this.rangeUrl}?${params}`, { headers, credentials: 'same-origin' });
+
+        if (response.status === 304) {
+            cached.fetchedAt = Date.now();
+            return false;
+        }
+        if (!response.ok) {
+            throw new Error(`Error cargando el calendario (${response.status})`);
+        }
+        this.storeMonth(await response.json(), response.headers.get('ETag'));
+        return true;
+    }
+
+    // Mes visible y, en segundo plano, los adyacentes
+    async loadVisibleMonths() {
+        try {
+            if (await this.fetchMonth(this.monthStart(this.currentDate))) {
+                this.renderTasks();
+            }
+            const adjacent = await Promise.all([-1, 1].map(
+                offset => this.fetchMonth(this.monthStart(this.currentDate, offset))
+            ));
+            if (adjacent.some(Boolean)) {
+                // Los días de otros meses de la cuadrícula
+                this.renderTasks();
+            }
+        } catch (error) {
+            console.error(error);
+        }
+    }
+
     init() {
         this.container = document.querySelector('.calendar-container');
         if (!this.container) {
@@ -17,8 +90,8 @@ class TaskCalendar {
         }
         this.renderCalendar();
         this.setupEventListeners();
-        this.renderTasks();
         this.setupGestures();
+        this.loadVisibleMonths();
     }
 
     setupGestures() {
@@ -78,6 +151,7 @@ class TaskCalendar {
                 this.renderDayView(grid);
                 break;
         }
+        this.renderTasks();
     }
 
     renderMonthView(grid) {
@@ -126,19 +200,8 @@ class TaskCalendar {
     }
 
     renderTasks() {
-        const taskIndicators = {};
-        
-        this.tasks.forEach(task => {
-            const dateKey = new Date(task.due_date).toISOString().split('T')[0];
-            if (!taskIndicators[dateKey]) {
-                taskIndicators[dateKey] = [];
-            }
-            taskIndicators[dateKey].push(task);
-        });
-
         document.querySelectorAll('.calendar-cell').forEach(cell => {
-            const dateKey = new Date(cell.dataset.date).toISOString().split('T')[0];
-            const cellTasks = taskIndicators[dateKey] || [];
+            const cellTasks = this.days[this.dateKey(new Date(cell.dataset.date))] || [];
             
             const indicators = cell.querySelector('.task-indicators');
             indicators.innerHTML = cellTasks.slice(0, 3).map(task => {
@@ -210,10 +273,7 @@ class TaskCalendar {
 
     showTaskDetails(dateString) {
         const date = new Date(dateString);
-        const tasks = this.tasks.filter(task => {
-            const taskDate = new Date(task.due_date);
-            return taskDate.toDateString() === date.toDateString();
-        });
+        const tasks = this.days[this.dateKey(date)] || [];
 
         const modal = this.container.querySelector('.task-details-modal');
         const modalContent = `
@@ -310,6 +370,7 @@ class TaskCalendar {
                 break;
         }
         this.updateCalendarGrid();
+        this.loadVisibleMonths();
     }
 
     isToday(date) {
@@ -337,7 +398,7 @@ document.addEventListener('DOMContentLoaded', function() {
         if ('Notification' in window) {
             Notification.requestPermission().then(permission => {
                 if (permission === 'granted') {
-                    setupReminders(taskData.tasks);
+                    setupReminders(Object.values(taskData.range.days).flat());
                 }
             });
         }
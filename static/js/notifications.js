@@ -48,5 +48,61 @@ class NotificationSystem {
     }
 }
 
+// Bandeja de notificaciones del servidor (/notifications/)
+class NotificationFeed {
+    constructor(baseUrl = '/notifications/') {
+        this.baseUrl = baseUrl;
+        this.nextCursor = null;
+    }
+
+    // Siguiente página de la bandeja; null cuando no quedan más
+    async fetchPage({ unread = false, limit = 20 } = {}) {
+        if (this.nextCursor === undefined) {
+            return null;
+        }
+        const params = new URLSearchParams({ limit });
+        if (unread) params.set('unread', '1');
+        if (this.nextCursor) params.set('cursor', this.nextCursor);
+
+        const response = await fetch(`${this.baseUrl}?${params}`, { credentials: 'same-origin' });
+        const data = await response.json();
+        // undefined marca el final de la bandeja
+        this.nextCursor = data.next_cursor || undefined;
+        this.updateBadge(data.unread_count);
+        return data.results;
+    }
+
+    async markRead(ids = null) {
+        const response = await fetch(`${this.baseUrl}read/`, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this.getCookie('csrftoken')
+            },
+            body: JSON.stringify(ids === null ? { all: true } : { ids })
+        });
+        const data = await response.json();
+        this.updateBadge(data.unread_count);
+        return data;
+    }
+
+    updateBadge(count) {
+        const badge = document.querySelector('[data-unread-count]');
+        if (badge) {
+            badge.textContent = count;
+            badge.hidden = !count;
+        }
+    }
+
+    getCookie(name) {
+        const cookie = document.cookie.split(';')
+            .map(value => value.trim())
+            .find(value => value.startsWith(`${name}=`));
+        return cookie ? decodeURIComponent(cookie.substring(name.length + 1)) : null;
+    }
+}
+
 // Crear una instancia global
-window.notifications = new NotificationSystem();
\ No newline at end of file
+window.notifications = new NotificationSystem();
+window.notificationFeed = new NotificationFeed();
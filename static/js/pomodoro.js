@@ -9,8 +9,11 @@ const CONFIG = {
     Gymnopedie: '/static/audio/gymnopedie.mp3'
   },
   API_ENDPOINTS: {
-    pomodoro: '/pomodoro/api/'
-  }
+    pomodoro: '/pomodoro/api/',
+    events: '/pomodoro/events/'
+  },
+  // Consulta periódica del estado mientras el canal de eventos no está disponible
+  SESSION_POLL_INTERVAL: 15000
 };
 
 class PomodoroAudioManager {
@@ -169,6 +172,7 @@ class PomodoroApp {
     this.initializeAudio();
     this.setupEventListeners();
     this.initializeActiveSession();
+    this.connectSessionEvents();
     this.audioManager = new PomodoroAudioManager();
   }
 
@@ -181,6 +185,8 @@ class PomodoroApp {
     this.currentAudio = null;
     this.audioTracks = {};
     this.deferredPrompt = null;
+    this.eventSource = null;
+    this.sessionPollId = null;
   }
 
   // DOM elements initialization
@@ -282,6 +288,8 @@ class PomodoroApp {
   }
 
   startTimerCountdown() {
+    // El canal de eventos puede reanudar el temporizador antes que la respuesta
+    clearInterval(this.timerId);
     this.updateMainActionButton('pause');
     // Reanudar audio si existe
     this.audioManager.resumeAudio();
@@ -349,6 +357,10 @@ class PomodoroApp {
   }
 
   async checkActiveSession() {
+    // Con el canal de eventos abierto el estado local ya está sincronizado
+    if (this.eventSource && this.eventSource.readyState === EventSource.OPEN) {
+      return this.activeSession;
+    }
     try {
       const response = await this.makeRequest('GET');
       return response.active_session || null;
@@ -478,6 +490,51 @@ class PomodoroApp {
   }
 
   // Session persistence
+  connectSessionEvents() {
+    // El estado inicial lo trae initializeActiveSession; el canal solo
+    // sincroniza los cambios posteriores. Sin EventSource se consulta
+    // periódicamente
+    if (!('EventSource' in window)) {
+      this.startSessionPolling();
+      return;
+    }
+
+    // El servidor envía el estado actual al conectar (y al reconectar) y
+    // después cada cambio: pausa, reanudación, fin, cancelación...
+    this.eventSource = new EventSource(CONFIG.API_ENDPOINTS.events);
+    this.eventSource.addEventListener('session', (event) => {
+      this.stopSessionPolling();
+      this.applyServerSession(JSON.parse(event.data).session);
+    });
+    this.eventSource.addEventListener('error', () => {
+      // Mientras el navegador reintenta se consulta el estado; si el
+      // servidor rechazó el canal (p. ej. sin ASGI) no habrá reintentos
+      if (this.eventSource.readyState === EventSource.CLOSED) {
+        this.eventSource = null;
+      }
+      this.startSessionPolling();
+    });
+  }
+
+  startSessionPolling() {
+    if (this.sessionPollId) {
+      return;
+    }
+    this.sessionPollId = setInterval(async () => {
+      try {
+        const response = await this.makeRequest('GET');
+        this.applyServerSession(response.active_session || null);
+      } catch (error) {
+        console.error('Error polling session:', error);
+      }
+    }, CONFIG.SESSION_POLL_INTERVAL);
+  }
+
+  stopSessionPolling() {
+    clearInterval(this.sessionPollId);
+    this.sessionPollId = null;
+  }
+
   async initializeActiveSession() {
     try {
       // Check server for active session first
@@ -485,31 +542,7 @@ class PomodoroApp {
       const serverSession = response.active_session;
 
       if (serverSession) {
-        this.activeSession = serverSession;
-
-        // Calculate remaining time based on server session
-        const startTime = new Date(serverSession.started_at);
-        const currentTime = new Date();
-        const elapsedSeconds = Math.floor((currentTime - startTime) / 1000);
-        const pauseDuration = serverSession.total_pause_duration || 0;
-
-        // Adjust for pauses
-        const adjustedElapsedSeconds = elapsedSeconds - pauseDuration;
-        this.timeLeft = Math.max(0, (serverSession.duration * 60) - adjustedElapsedSeconds);
-        this.totalTime = serverSession.duration * 60;
-
-        // Update UI
-        this.updateUIForActiveSession();
-
-        // If session is in progress, start countdown
-        if (serverSession.status === 'in_progress') {
-          this.startTimerCountdown();
-        } else if (serverSession.status === 'paused') {
-          this.updateMainActionButton('play');
-        }
-
-        // Store session data in localStorage for redundancy
-        this.saveSessionToLocalStorage();
+        this.applyServerSession(serverSession);
       } else {
         // If no server session, try to recover from localStorage
         this.recoverSessionFromLocalStorage();
@@ -521,6 +554,56 @@ class PomodoroApp {
     }
   }
 
+  applyServerSession(serverSession) {
+    const isActive = serverSession && ['in_progress', 'paused'].includes(serverSession.status);
+
+    if (!isActive) {
+      // Sesión terminada (quizá desde otra pestaña o dispositivo)
+      if (this.activeSession && (!serverSession || serverSession.session_id === this.activeSession.session_id)) {
+        this.audioManager.pauseAudio();
+        this.resetTimer();
+        this.activeSession = null;
+        this.updateUIForNoSession();
+        localStorage.removeItem('pomodoroSession');
+      }
+      return;
+    }
+
+    const unchanged = this.activeSession &&
+      this.activeSession.session_id === serverSession.session_id &&
+      this.activeSession.status === serverSession.status;
+    this.activeSession = serverSession;
+    if (unchanged) {
+      return;
+    }
+
+    // Calculate remaining time based on server session
+    const startTime = new Date(serverSession.started_at);
+    const currentTime = new Date();
+    const elapsedSeconds = Math.floor((currentTime - startTime) / 1000);
+    const pauseDuration = serverSession.total_pause_duration || 0;
+
+    // Adjust for pauses
+    const adjustedElapsedSeconds = elapsedSeconds - pauseDuration;
+    this.timeLeft = Math.max(0, (serverSession.duration * 60) - adjustedElapsedSeconds);
+    this.totalTime = serverSession.duration * 60;
+
+    // Update UI
+    clearInterval(this.timerId);
+    this.updateUIForActiveSession();
+
+    // If session is in progress, start countdown
+    if (serverSession.status === 'in_progress') {
+      this.startTimerCountdown();
+    } else {
+      this.audioManager.pauseAudio();
+      this.updateMainActionButton('play');
+    }
+
+    // Store session data in localStorage for redundancy
+    this.saveSessionToLocalStorage();
+  }
+
   saveSessionToLocalStorage() {
     if (this.activeSession) {
       const sessionData = {
@@ -101,6 +101,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'tasks_manager.sqlite3',
+        'OPTIONS': {
+            # Varias peticiones escriben a la vez (contadores, sesiones):
+            # IMMEDIATE toma el bloqueo de escritura al abrir la transacción,
+            # de modo que las demás esperan ``timeout`` segundos en lugar de
+            # fallar con "database is locked" al pasar de leer a escribir
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # En fichero y no en memoria: las pruebas de concurrencia abren una
+        # conexión por hilo y todas deben ver la misma base de datos
+        'TEST': {
+            'NAME': BASE_DIR / 'test_tasks_manager.sqlite3',
+        },
     }
 }
 
@@ -211,3 +224,89 @@ EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 465
 EMAIL_USE_SSL = True  # Para SSL directo
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER 
+
+# Cola de envío de correo (apps.core.mail)
+EMAIL_QUEUE_WORKERS = 2
+EMAIL_QUEUE_MAXSIZE = 1000
+EMAIL_QUEUE_BATCH_SIZE = 50
+EMAIL_QUEUE_MAX_RETRIES = 3
+EMAIL_QUEUE_RETRY_BACKOFF = 2.0
+
+#CELERY / RECORDATORIOS
+# Worker y beat: celery -A task_manager.celery worker -B
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_BEAT_SCHEDULE = {
+    'send-due-reminders': {
+        'task': 'apps.tasks.tasks.send_due_reminders',
+        'schedule': 60.0,
+    },
+    'send-task-digests': {
+        'task': 'apps.tasks.tasks.send_task_digests',
+        'schedule': 300.0,
+    },
+    'compact-task-events': {
+        'task': 'apps.tasks.tasks.compact_task_events',
+        'schedule': 86400.0,
+    },
+    'send-due-notifications': {
+        'task': 'apps.notifications.tasks.send_due_notifications',
+        'schedule': 30.0,
+    },
+}
+SITE_URL = os.getenv('SITE_URL', '')
+TASK_REMINDER_LEAD_HOURS = 24
+TASK_REMINDER_BATCH_SIZE = 500
+TASK_DIGEST_BATCH_SIZE = 500
+TASK_DIGEST_MAX_TASKS = 10
+TASK_WEEKLY_DIGEST_WEEKDAY = 0
+TASK_EVENT_RETENTION_DAYS = 90
+TASK_EVENT_ROLLUP_RETENTION_DAYS = 730
+TASK_EVENT_COMPACTION_BATCH_SIZE = 5000
+TASK_BULK_MAX_OPERATIONS = 500
+NOTIFICATION_BATCH_SIZE = 500
+NOTIFICATION_CHUNK_SIZE = 50
+NOTIFICATION_CHANNEL_WORKERS = {'in_app': 1, 'email': 4, 'push': 8}
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_BACKOFF_SECONDS = 60
+NOTIFICATION_CLAIM_LEASE_SECONDS = 600
+NOTIFICATION_EXPIRE_AFTER_HOURS = 24
+# Web Push (opcional, requiere pywebpush)
+WEBPUSH_VAPID_PRIVATE_KEY = os.getenv('WEBPUSH_VAPID_PRIVATE_KEY', '')
+WEBPUSH_VAPID_CLAIMS_EMAIL = os.getenv('WEBPUSH_VAPID_CLAIMS_EMAIL', '')
+
+# CACHÉ
+# Con REDIS_URL se usa django-redis; en desarrollo y tests, LocMem. LocMem es
+# por proceso: con varios workers, una invalidación (estadísticas de
+# apps.tasks.stats, preferencias Pomodoro) solo llega al proceso que la hizo y
+# los demás sirven datos antiguos hasta que caduquen. En producción con más de
+# un worker hay que definir REDIS_URL
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Estadísticas por usuario (apps.tasks.stats)
+USER_STATS_CACHE_TIMEOUT = 3600
+USER_STATS_MAX_AGE = 300
+USER_STATS_STALE_WHILE_REVALIDATE = True
+POMODORO_SETTINGS_CACHE_TIMEOUT = 3600
+
+# Canal de eventos Pomodoro (apps.pomodoro.events): en proceso por defecto,
+# Redis pub/sub cuando hay varios procesos ASGI
+POMODORO_EVENTS_BROKER = (
+    'apps.pomodoro.events.RedisBroker' if REDIS_URL else 'apps.pomodoro.events.InProcessBroker'
+)
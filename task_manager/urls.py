@@ -28,6 +28,7 @@ urlpatterns = [
     path('tasks/', include('apps.tasks.urls', namespace='task_manager')),
     path('accounts/', include('allauth.urls')),
     path('pomodoro/', include('apps.pomodoro.urls', namespace='pomodoro')),
+    path('notifications/', include('apps.notifications.urls', namespace='notifications')),
 ] 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)